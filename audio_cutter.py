@@ -1,7 +1,11 @@
 import os
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from pydub import AudioSegment
+
+from engine import cutter, peaks
+from engine.tasks import FunctionTask
+from task_panel import TaskPanel
+from waveform_view import WaveformView
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -11,7 +15,7 @@ class AudioCutterApp(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("✂️ 音频剪切工具")
-        self.geometry("640x500")
+        self.geometry("720x780")
         self.resizable(False, False)
 
         self.audio_path = None
@@ -22,15 +26,39 @@ class AudioCutterApp(ctk.CTk):
         # 新增：模式选择和分段数
         self.mode = ctk.StringVar(value="自由选择时间")
         self.n_segments = ctk.IntVar(value=2)
+        # 流式模式：不把整个文件解码进内存，只读取要剪切的时间段
+        self.streaming = ctk.BooleanVar(value=False)
+        # 保留源格式：WAV 字节复制，MP3 / FLAC 按帧复制，不重新编码
+        self.keep_format = ctk.BooleanVar(value=False)
+        # 平均分段并行导出：进程数与导出格式
+        self.workers = ctk.IntVar(value=os.cpu_count() or 1)
+        self.out_format = ctk.StringVar(value="wav")
+        # 自动分段：在静音处或起音前切分
+        self.auto_mode = ctk.StringVar(value="静音")
+        self.min_len = ctk.DoubleVar(value=1.0)
+        self.max_len = ctk.StringVar(value="")
+        self.threshold = ctk.DoubleVar(value=-40.0)
 
         # 状态文本
         self.status_text = ctk.StringVar(value="未加载音频")
 
         # --- 界面部分 ---
-        ctk.CTkButton(self, text="📂 选择音频文件", command=self.load_audio).pack(
-            pady=10
+        self.load_button = ctk.CTkButton(
+            self, text="📂 选择音频文件", command=self.load_audio
         )
+        self.load_button.pack(pady=10)
         ctk.CTkLabel(self, textvariable=self.status_text, wraplength=500).pack(pady=5)
+        # 波形预览：拖动选区即可填入开始 / 结束时间
+        self.waveform = WaveformView(self, width=680, height=120, on_select=self.on_waveform_select)
+        self.waveform.pack(padx=10, pady=5, fill="x")
+        ctk.CTkCheckBox(
+            self, text="低内存流式模式（适合超长音频）", variable=self.streaming
+        ).pack(pady=5)
+        ctk.CTkCheckBox(
+            self,
+            text="保留原格式（WAV / MP3 / FLAC 直接复制，不重新编码）",
+            variable=self.keep_format,
+        ).pack(pady=5)
 
         # 模式选择
         mode_frame = ctk.CTkFrame(self)
@@ -50,6 +78,13 @@ class AudioCutterApp(ctk.CTk):
             value="平均分段",
             command=self.update_mode,
         ).pack(side="left")
+        ctk.CTkRadioButton(
+            mode_frame,
+            text="自动分段",
+            variable=self.mode,
+            value="自动分段",
+            command=self.update_mode,
+        ).pack(side="left")
 
         # 平均分段输入框
         self.n_frame = ctk.CTkFrame(self)
@@ -58,9 +93,35 @@ class AudioCutterApp(ctk.CTk):
             self.n_frame, textvariable=self.n_segments, width=60
         )
         self.n_entry.pack(side="left")
+        ctk.CTkLabel(self.n_frame, text="  并行进程数：").pack(side="left")
+        ctk.CTkEntry(self.n_frame, textvariable=self.workers, width=50).pack(
+            side="left"
+        )
+        ctk.CTkLabel(self.n_frame, text="  格式：").pack(side="left")
+        ctk.CTkOptionMenu(
+            self.n_frame,
+            values=["wav", "mp3", "flac"],
+            variable=self.out_format,
+            width=80,
+        ).pack(side="left")
         # 默认隐藏
         self.n_frame.pack_forget()
 
+        # 自动分段参数
+        self.auto_frame = ctk.CTkFrame(self)
+        ctk.CTkOptionMenu(
+            self.auto_frame, values=["静音", "起音"], variable=self.auto_mode, width=70
+        ).pack(side="left", padx=5)
+        ctk.CTkLabel(self.auto_frame, text="最短（秒）").pack(side="left")
+        ctk.CTkEntry(self.auto_frame, textvariable=self.min_len, width=45).pack(side="left")
+        ctk.CTkLabel(self.auto_frame, text=" 最长（秒）").pack(side="left")
+        ctk.CTkEntry(
+            self.auto_frame, textvariable=self.max_len, width=45, placeholder_text="不限"
+        ).pack(side="left")
+        ctk.CTkLabel(self.auto_frame, text=" 静音阈值 dB").pack(side="left")
+        ctk.CTkEntry(self.auto_frame, textvariable=self.threshold, width=45).pack(side="left")
+        self.auto_frame.pack_forget()
+
         # 起始/结束时间输入框（替换滑块）
         self.time_frame = ctk.CTkFrame(self)
         self.time_frame.pack()
@@ -80,23 +141,37 @@ class AudioCutterApp(ctk.CTk):
         self.time_frame.pack_forget()  # 默认隐藏
 
         # 输出目录选择
-        ctk.CTkButton(
+        self.output_button = ctk.CTkButton(
             self, text="📁 设置输出目录（可选）", command=self.select_output_dir
-        ).pack(pady=10)
+        )
+        self.output_button.pack(pady=10)
 
         # 剪切操作
-        ctk.CTkButton(self, text="✂️ 剪切并保存", command=self.cut_audio).pack(pady=20)
+        self.cut_button = ctk.CTkButton(
+            self, text="✂️ 剪切并保存", command=self.cut_audio
+        )
+        self.cut_button.pack(pady=(20, 5))
+        self.task_panel = TaskPanel(self, unit="段")
+        self.task_panel.pack(pady=5)
 
         self.update_mode()
 
     def update_mode(self):
         mode = self.mode.get()
-        if mode == "自由选择时间":
-            self.n_frame.pack_forget()
-            self.time_frame.pack(pady=5)
-        else:
-            self.time_frame.pack_forget()
-            self.n_frame.pack(pady=5)
+        frames = {
+            "自由选择时间": self.time_frame,
+            "平均分段": self.n_frame,
+            "自动分段": self.auto_frame,
+        }
+        for name, frame in frames.items():
+            if name != mode:
+                frame.pack_forget()
+        frames[mode].pack(pady=5, before=self.output_button)
+
+    def set_busy(self, busy):
+        state = "disabled" if busy else "normal"
+        self.load_button.configure(state=state)
+        self.cut_button.configure(state=state)
 
     def load_audio(self):
         path = filedialog.askopenfilename(
@@ -104,20 +179,65 @@ class AudioCutterApp(ctk.CTk):
         )
         if not path:
             return
+        streaming = self.streaming.get()
+        # 时长只读文件头（有缓存），选中文件后立即显示，不必等解码
         try:
-            self.audio = AudioSegment.from_file(path)
-            self.audio_path = path
-            self.duration_sec = round(len(self.audio) / 1000, 2)
-            self.label_duration.configure(text=f"音频时长：{self.duration_sec} 秒")
-            self.status_text.set(
-                f"✅ 加载成功：{os.path.basename(path)}\n音频时长：{self.duration_sec} 秒"
+            probed = cutter.audio_duration(path)
+        except Exception:
+            probed = None
+        if probed is not None:
+            self.label_duration.configure(text=f"音频时长：{probed:.3f} 秒")
+
+        def load(task):
+            # 解码长音频可能需要数秒，放到后台线程执行；波形索引已缓存时直接 memmap
+            if streaming:
+                # 探测失败时在这里重试一次，让错误信息显示在加载结果中
+                audio, duration = None, probed if probed is not None else cutter.audio_duration(path)
+            else:
+                audio = cutter.load_audio(path)
+                duration = len(audio) / 1000
+            index = peaks.load_or_build(
+                path, audio, progress=lambda done, total: task.check_cancelled()
             )
-            self.entry_start.delete(0, "end")
-            self.entry_start.insert(0, "0")
-            self.entry_end.delete(0, "end")
-            self.entry_end.insert(0, str(self.duration_sec))
-        except Exception as e:
-            messagebox.showerror("加载失败", str(e))
+            return audio, duration, index
+
+        self.set_busy(True)
+        length = f"（{probed:.3f} 秒）" if probed is not None else ""
+        self.status_text.set(f"🔄 正在加载：{os.path.basename(path)}{length}")
+        self.task_panel.run(
+            FunctionTask(load), on_done=lambda job: self.on_audio_loaded(job, path)
+        )
+
+    def on_audio_loaded(self, job, path):
+        self.set_busy(False)
+        if job.error:
+            self.status_text.set("未加载音频")
+            messagebox.showerror("加载失败", job.error)
+            return
+        if job.cancelled:
+            self.status_text.set("已取消加载")
+            return
+        self.audio, duration, index = job.result
+        self.waveform.set_index(index)
+        self.duration_sec = round(duration, 2)
+        self.audio_path = path
+        self.label_duration.configure(text=f"音频时长：{self.duration_sec} 秒")
+        self.status_text.set(
+            f"✅ 加载成功：{os.path.basename(path)}\n音频时长：{self.duration_sec} 秒"
+        )
+        self.entry_start.delete(0, "end")
+        self.entry_start.insert(0, "0")
+        self.entry_end.delete(0, "end")
+        self.entry_end.insert(0, str(self.duration_sec))
+
+    def on_waveform_select(self, start, end):
+        if self.mode.get() != "自由选择时间":
+            self.mode.set("自由选择时间")
+            self.update_mode()
+        self.entry_start.delete(0, "end")
+        self.entry_start.insert(0, f"{start:.2f}")
+        self.entry_end.delete(0, "end")
+        self.entry_end.insert(0, f"{min(end, self.duration_sec):.2f}")
 
     def select_output_dir(self):
         folder = filedialog.askdirectory(title="选择输出目录")
@@ -126,7 +246,7 @@ class AudioCutterApp(ctk.CTk):
             messagebox.showinfo("输出目录设置成功", f"保存路径：\n{folder}")
 
     def cut_audio(self):
-        if not self.audio:
+        if not self.audio_path:
             messagebox.showwarning("⚠️", "请先加载音频文件")
             return
         mode = self.mode.get()
@@ -143,51 +263,114 @@ class AudioCutterApp(ctk.CTk):
                     f"请确认开始 < 结束，且在 0~{self.duration_sec} 秒之间",
                 )
                 return
-            cut_audio = self.audio[start * 1000 : end * 1000]
-            duration = int(end - start)
-            base_name = os.path.splitext(os.path.basename(self.audio_path))[0]
-            output_name = f"{base_name}_{duration}s.wav"
-            output_path = os.path.join(
-                self.output_dir or os.path.dirname(self.audio_path), output_name
-            )
+            streaming, audio_path, audio = self.streaming.get(), self.audio_path, self.audio
+            output_dir, keep_format = self.output_dir, self.keep_format.get()
+
+            def cut(task):
+                if keep_format:
+                    return cutter.lossless_cut_range(audio_path, start, end, output_dir)
+                if streaming:
+                    return cutter.stream_cut_range(audio_path, start, end, output_dir)
+                return cutter.cut_range(audio_path, start, end, output_dir, audio=audio)
+
+            self.set_busy(True)
+            self.task_panel.run(FunctionTask(cut), on_done=self.on_cut_done)
+        elif mode == "自动分段":
             try:
-                cut_audio.export(output_path, format="wav")
-                messagebox.showinfo("剪切成功", f"已保存为：\n{output_name}")
-            except Exception as e:
-                messagebox.showerror("保存失败", str(e))
+                min_len = float(self.min_len.get())
+                max_len = float(self.max_len.get()) if self.max_len.get().strip() else None
+                threshold = float(self.threshold.get())
+                if min_len < 0 or (max_len is not None and max_len < min_len):
+                    raise ValueError
+            except Exception:
+                messagebox.showerror("输入错误", "请输入有效的最短 / 最长分段时长和静音阈值")
+                return
+            streaming, audio_path, audio = self.streaming.get(), self.audio_path, self.audio
+            output_dir = self.output_dir
+            auto_mode = "onset" if self.auto_mode.get() == "起音" else "silence"
+
+            def split_auto(task):
+                return cutter.split_auto(
+                    audio_path,
+                    output_dir,
+                    mode=auto_mode,
+                    min_len=min_len,
+                    max_len=max_len,
+                    threshold_db=threshold,
+                    streaming=streaming,
+                    audio=audio,
+                    progress=task.report,
+                )
+
+            self.set_busy(True)
+            self.task_panel.run(FunctionTask(split_auto), on_done=self.on_split_done)
         else:
             # 平均分段
             try:
                 n = int(self.n_segments.get())
-                if n < 1:
+                workers = int(self.workers.get())
+                if n < 1 or workers < 1:
                     raise ValueError
             except Exception:
-                messagebox.showerror("输入错误", "请输入有效的分段数（正整数）")
+                messagebox.showerror("输入错误", "请输入有效的分段数和进程数（正整数）")
                 return
-            total_ms = len(self.audio)
-            seg_ms = total_ms // n
-            base_name = os.path.splitext(os.path.basename(self.audio_path))[0]
-            output_dir = self.output_dir or os.path.dirname(self.audio_path)
-            saved_files = []
-            for i in range(n):
-                start_ms = i * seg_ms
-                end_ms = (i + 1) * seg_ms if i < n - 1 else total_ms
-                seg_audio = self.audio[start_ms:end_ms]
-                output_name = (
-                    f"{base_name}_part{i+1}_{start_ms//1000}_{end_ms//1000}s.wav"
-                )
-                output_path = os.path.join(output_dir, output_name)
-                try:
-                    seg_audio.export(output_path, format="wav")
-                    saved_files.append(output_name)
-                except Exception as e:
-                    messagebox.showerror("保存失败", f"第{i+1}段导出失败：{e}")
-            if saved_files:
-                messagebox.showinfo(
-                    "分段剪切完成",
-                    f"已保存 {len(saved_files)} 段：\n" + "\n".join(saved_files),
+            streaming, audio_path, audio = self.streaming.get(), self.audio_path, self.audio
+            output_dir, out_format = self.output_dir, self.out_format.get()
+            keep_format = self.keep_format.get()
+
+            def split(task):
+                if keep_format:
+                    return cutter.lossless_split_even(
+                        audio_path, n, output_dir, progress=task.report
+                    )
+                if workers > 1 or out_format != "wav":
+                    stats = cutter.parallel_split_even(
+                        audio_path,
+                        n,
+                        output_dir,
+                        workers=workers,
+                        out_format=out_format,
+                        audio=audio,
+                        progress=task.report,
+                    )
+                    return stats.saved, stats.errors
+                if streaming:
+                    return cutter.stream_split_even(
+                        audio_path, n, output_dir, progress=task.report
+                    )
+                return cutter.split_even(
+                    audio_path, n, output_dir, audio=audio, progress=task.report
                 )
 
+            self.set_busy(True)
+            self.task_panel.run(FunctionTask(split, total=n), on_done=self.on_split_done)
+
+    def on_cut_done(self, job):
+        self.set_busy(False)
+        if job.error:
+            messagebox.showerror("保存失败", job.error)
+        elif not job.cancelled:
+            messagebox.showinfo(
+                "剪切成功", f"已保存为：\n{os.path.basename(job.result)}"
+            )
+
+    def on_split_done(self, job):
+        self.set_busy(False)
+        if job.error:
+            messagebox.showerror("保存失败", job.error)
+            return
+        if job.cancelled:
+            self.status_text.set(f"⏹ 已取消，已导出 {job.completed} 段")
+            return
+        saved_files, errors = job.result
+        for i, msg in errors:
+            messagebox.showerror("保存失败", f"第{i}段导出失败：{msg}")
+        if saved_files:
+            speed = f"（{len(saved_files) / job.elapsed:.1f} 段/秒）" if job.elapsed else ""
+            messagebox.showinfo(
+                "分段剪切完成",
+                f"已保存 {len(saved_files)} 段{speed}：\n" + "\n".join(saved_files),
+            )
 
 if __name__ == "__main__":
     app = AudioCutterApp()
@@ -0,0 +1,105 @@
+"""对比 pydub overlay、NumPy 混音引擎与流式混音的耗时与峰值内存。
+
+    python benchmarks/bench_mix.py --seconds 600
+
+每种实现都在独立子进程中运行：进程峰值取 ru_maxrss，
+混音阶段（不含伴奏加载）的峰值分配由 tracemalloc 统计。
+流式混音不预先加载伴奏，两项峰值都应与 --seconds 无关。
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+METHODS = ("pydub", "numpy", "stream")
+
+
+def make_stems(tmp_dir, seconds):
+    import numpy as np
+
+    from engine import wavfile
+
+    rng = np.random.default_rng(0)
+    paths = []
+    frames = int(seconds * 44100)
+    block = 1 << 20
+    # 分块生成：子进程的 ru_maxrss 会继承父进程 fork 时的峰值
+    for name in ("instr", "vocal"):
+        path = os.path.join(tmp_dir, f"{name}.wav")
+        with wavfile.WavWriter(path, 2, 44100, np.dtype(np.int16)) as writer:
+            for start in range(0, frames, block):
+                n = min(block, frames - start)
+                writer.write((rng.standard_normal((n, 2)) * 8000).astype(np.int16))
+        paths.append(path)
+    return paths
+
+
+def run_worker(method, instr, vocal, out_dir):
+    from engine import mixer
+
+    tracemalloc.start()
+    if method != "stream":
+        instr_audio = mixer.load_normalized(instr)
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    if method == "stream":
+        mixer.stream_mix_paths([instr, vocal], [-2.0, 2.0], os.path.join(out_dir, "stream_mix.wav"))
+    elif method == "numpy":
+        mixer.mix_file(vocal, mixer.segment_to_array(instr_audio), 2.0, -2.0, out_dir)
+    else:
+        v = mixer.load_normalized(vocal)
+        min_len = min(len(v), len(instr_audio))
+        mixed = (instr_audio[:min_len] - 2.0).overlay(v[:min_len] + 2.0)
+        mixed.export(os.path.join(out_dir, "ref_mix.wav"), format="wav")
+    elapsed = time.perf_counter() - t0
+    mix_peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    # Linux 上 ru_maxrss 单位为 KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"method": method, "seconds": elapsed, "peak_rss_mb": peak_mb,
+                      "mix_peak_mb": mix_peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=300, help="合成音频时长（秒）")
+    parser.add_argument("--worker", choices=METHODS)
+    parser.add_argument("--instr")
+    parser.add_argument("--vocal")
+    parser.add_argument("--out-dir")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.instr, args.vocal, args.out_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        instr, vocal = make_stems(tmp_dir, args.seconds)
+        results = {}
+        for method in METHODS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", method,
+                 "--instr", instr, "--vocal", vocal, "--out-dir", tmp_dir],
+                stdout=subprocess.PIPE,
+                check=True,
+            )
+            results[method] = json.loads(out.stdout.decode().strip().splitlines()[-1])
+            r = results[method]
+            print(
+                f"{method:>6}: {r['seconds']:.3f} 秒, 混音阶段峰值 {r['mix_peak_mb']:.0f} MB, "
+                f"进程峰值 {r['peak_rss_mb']:.0f} MB"
+            )
+        speedup = results["pydub"]["seconds"] / results["numpy"]["seconds"]
+        print(f"加速比：{speedup:.1f}x（音频时长 {args.seconds:.0f} 秒）")
+
+
+if __name__ == "__main__":
+    main()
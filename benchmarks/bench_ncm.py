@@ -0,0 +1,72 @@
+"""对比内置 NCM 解密与外部 ncmdump 的转换速度。
+
+    python benchmarks/bench_ncm.py --files 200 --size-mb 8
+
+合成的 .ncm 由 engine.ncmcrypt.encode_ncm 生成；PATH 中没有 ncmdump 时跳过该项。
+内置解密输出的音频部分会与原始数据逐字节比对。
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import ncm, ncmcrypt  # noqa: E402
+
+
+def make_library(src_dir, files, size_mb):
+    # 以 MP3 帧头开头的随机数据，外部工具也会按 mp3 输出
+    audio = b"\xff\xfb\x90\x00" + os.urandom(int(size_mb * 2**20) - 4)
+    data = ncmcrypt.encode_ncm(audio, {"musicName": "bench", "format": "mp3"})
+    paths = []
+    for i in range(files):
+        path = os.path.join(src_dir, f"track{i:05d}.ncm")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths, audio
+
+
+def run(paths, out_dir, backend, concurrency):
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    stats = asyncio.run(ncm.convert_many(paths, out_dir, concurrency, backend=backend))
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{backend:>8} x{concurrency:<3}: {elapsed:.2f} 秒, {stats.files_per_sec:.1f} 个/秒, "
+        f"{stats.mb_per_sec:.1f} MB/秒, 失败 {stats.failed}"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src_dir = os.path.join(tmp_dir, "src")
+        os.makedirs(src_dir)
+        paths, audio = make_library(src_dir, args.files, args.size_mb)
+
+        native = run(paths, os.path.join(tmp_dir, "native"), "native", args.jobs)
+        with open(os.path.join(tmp_dir, "native", "track00000.mp3"), "rb") as f:
+            # 安装了 mutagen 时文件头部会多出 ID3 标签，只比对音频部分
+            assert f.read().endswith(audio), "内置解密输出与原始音频不一致"
+
+        if shutil.which("ncmdump"):
+            external = run(paths, os.path.join(tmp_dir, "ncmdump"), "ncmdump", args.jobs)
+            print(f"加速比：{external / native:.1f}x")
+        else:
+            print("未找到 ncmdump，跳过对比")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""对比“提取 -> 剪切 -> 混音”三步各自落盘与 engine.pipeline 内存流水线的耗时和磁盘写入量。
+
+    python benchmarks/bench_pipeline.py --clips 8 --seconds 120 --window 30
+
+素材由 benchmarks/corpus.py 生成：MP4（AAC 音轨）作为视频源，同时长的 WAV 作为伴奏。
+三步流程即原先 GUI 的做法：extract_audio 写 WAV，cut_range 再解码写 WAV，mix_paths 第三次解码后写混音。
+两种方式都单进程顺序执行，只比较每个实例本身的开销。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import corpus  # noqa: E402
+from engine import cutter, extractor, mixer, pipeline  # noqa: E402
+
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def run_steps(videos, backing, window, out_dir):
+    written = 0
+    for video in videos:
+        extracted = extractor.extract_audio(video, out_dir, "wav", copy=False)
+        cut = os.path.join(out_dir, cutter.cut_range(extracted, window[0], window[1], out_dir))
+        mixed = mixer.mix_paths([backing, cut], [-4.0, 2.0], os.path.join(out_dir, "mix.wav"))
+        written += sum(os.path.getsize(p) for p in (extracted, cut, mixed))
+    return written
+
+
+def run_pipeline(videos, backing, window, out_dir):
+    spec = {
+        "input": os.path.join(os.path.dirname(videos[0]), "*.mp4"),
+        "stages": [
+            {"cut": {"start": window[0], "end": window[1]}},
+            {"mix": {"with": backing, "db": 2, "with_db": -4}},
+        ],
+        "output": os.path.join(out_dir, "{name}_mix.wav"),
+    }
+    fmt = pipeline.parse_format(None)
+    backings = {backing: (mixer.load_array(backing, fmt), None)}
+    for inst in pipeline.expand(spec):
+        pipeline.run_instance(inst, fmt, "fast", backings)
+    return dir_bytes(out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=8, help="视频源个数")
+    parser.add_argument("--seconds", type=float, default=120, help="每个视频源的时长（秒）")
+    parser.add_argument("--window", type=float, default=30, help="剪切区间长度（秒），取自源的中段")
+    parser.add_argument("--corpus-dir", default=corpus.DEFAULT_DIR)
+    args = parser.parse_args()
+
+    fixtures = corpus.build(args.corpus_dir, args.seconds, kinds=("wav", "mp4"))
+    start = (args.seconds - args.window) / 2
+    window = (start, start + args.window)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir = os.path.join(tmp, "videos")
+        os.makedirs(src_dir)
+        videos = []
+        for i in range(args.clips):
+            videos.append(os.path.join(src_dir, f"clip{i:03d}.mp4"))
+            shutil.copyfile(fixtures["mp4"].path, videos[-1])
+
+        results = {}
+        for name, fn in (("三步落盘", run_steps), ("内存流水线", run_pipeline)):
+            out_dir = os.path.join(tmp, name)
+            os.makedirs(out_dir)
+            t0 = time.perf_counter()
+            written = fn(videos, fixtures["wav"].path, window, out_dir)
+            elapsed = time.perf_counter() - t0
+            results[name] = elapsed
+            print(
+                f"{name}：{elapsed:.2f} 秒（{args.clips / elapsed:.1f} 个/秒），"
+                f"写入 {written / 2**20:.1f} MB"
+            )
+        print(f"加速比：{results['三步落盘'] / results['内存流水线']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""校验按帧复制的精确剪切：随机剪切若干段，解码后与完整解码中的同一区间逐采样比较。
+
+    python benchmarks/check_cut.py --cuts 25 --seconds 60
+
+MP3 覆盖常见码率、低码率 / 低采样率（比特池跨多帧）和 VBR，约三分之一为一两帧以内的短范围；
+长度不一致或最大误差超过 --tolerance 即记为失败（退出码 1），起止在同一帧内而被拒绝的范围
+单独计数。需要 ffmpeg（带 libmp3lame）。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import corpus  # noqa: E402  与本文件同目录
+
+from engine import ffmpeg, mp3frames  # noqa: E402
+
+# (名称, 采样率, 声道数, 编码参数)
+MP3_VARIANTS = (
+    ("128k", 44100, 2, ["-b:a", "128k"]),
+    ("32k", 44100, 2, ["-b:a", "32k"]),
+    ("vbr_22k", 22050, 2, ["-q:a", "9"]),
+    ("8k_8khz", 8000, 1, ["-b:a", "8k"]),
+)
+
+
+def decode(path, channels):
+    raw = ffmpeg.run_ffmpeg(["-i", path, "-f", "f32le", "-"])
+    return np.frombuffer(raw, dtype=np.float32).reshape(-1, channels)
+
+
+def check_mp3(wav, tmp_dir, name, rate, channels, args, cuts, tolerance, rng):
+    src = os.path.join(tmp_dir, f"{name}.mp3")
+    ffmpeg.run_ffmpeg(["-i", wav, "-ar", str(rate), "-ac", str(channels), "-c:a", "libmp3lame", *args, src])
+    stream = mp3frames.Mp3Stream(src)
+    full = decode(src, channels)
+    out = os.path.join(tmp_dir, "cut.mp3")
+    failed = rejected = 0
+    worst = 0.0
+    for _ in range(cuts):
+        a = rng.randrange(0, len(full) - 1)
+        longest = 2 * stream.frame_samples if rng.random() < 1 / 3 else 10 * rate
+        b = rng.randrange(a + 1, min(len(full), a + longest) + 1)
+        try:
+            start, end = stream.cut(out, a, b)
+        except ValueError:
+            rejected += 1
+            continue
+        got = decode(out, channels)
+        ref = full[start:end]
+        if (start, end) != (a, b) and a >= stream.frame_samples:
+            print(f"  {name} [{a}, {b})：实际覆盖 [{start}, {end})")
+            failed += 1
+        elif got.shape != ref.shape:
+            print(f"  {name} [{a}, {b})：长度 {len(got)}，应为 {len(ref)}")
+            failed += 1
+        else:
+            err = float(np.abs(got - ref).max()) if len(ref) else 0.0
+            worst = max(worst, err)
+            if err > tolerance:
+                print(f"  {name} [{a}, {b})：最大误差 {err:.3g}")
+                failed += 1
+    passed = cuts - failed - rejected
+    print(f"mp3 {name:<8} {passed}/{cuts} 通过，{rejected} 个被拒绝，最大误差 {worst:.3g}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60, help="源素材时长（秒）")
+    parser.add_argument("--cuts", type=int, default=25, help="每种格式的随机剪切次数")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="允许的最大采样误差")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        wav = corpus.write_wav(os.path.join(tmp_dir, "src.wav"), args.seconds, 44100, 2, args.seed)
+        for name, rate, channels, enc in MP3_VARIANTS:
+            failed += check_mp3(wav, tmp_dir, name, rate, channels, enc, args.cuts, args.tolerance, rng)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""生成基准 / 测试用的合成素材：WAV、MP3、FLAC、MP4（带视频轨）和 NCM，全部本地生成，不联网。
+
+    python benchmarks/corpus.py --seconds 600 --rate 48000 --channels 2 -o /tmp/corpus
+
+WAV 由 NumPy 分块合成（和弦 + 噪声 + 每 10 秒一段静音，便于自动分段等功能有东西可测），
+其余格式由 ffmpeg 从同一个 WAV 编码，NCM 用 engine.ncmcrypt.encode_ncm 封装 MP3。
+文件名包含全部参数，已存在的素材直接复用。
+"""
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import ffmpeg, ncmcrypt, wavfile  # noqa: E402
+
+KINDS = ("wav", "mp3", "flac", "mp4", "ncm")
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "audio_tools", "corpus")
+BLOCK_FRAMES = 1 << 18
+TONES = (220.0, 277.18, 329.63, 440.0)  # A 大三和弦 + 八度
+SILENCE_EVERY, SILENCE_LEN = 10.0, 0.5
+
+_ENCODE_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "192k"],
+    "flac": ["-c:a", "flac"],
+}
+
+Fixture = namedtuple("Fixture", "kind path seconds rate channels")
+
+
+def synth_block(start, frames, rate, channels, seed=0):
+    """第 start 帧起的 frames 帧 float32 信号；只依赖绝对帧号，分块生成结果与一次生成相同。"""
+    t = (start + np.arange(frames)) / rate
+    mono = np.zeros(frames)
+    for k, f in enumerate(TONES):
+        # 各声部缓慢起伏，频谱和响度随时间变化
+        mono += 0.15 * (1 + 0.5 * np.sin(2 * np.pi * 0.1 * (k + 1) * t)) * np.sin(2 * np.pi * f * t)
+    rng = np.random.default_rng((seed, start))
+    out = mono[:, None] + 0.02 * rng.standard_normal((frames, channels))
+    out *= (t % SILENCE_EVERY < SILENCE_EVERY - SILENCE_LEN)[:, None]
+    return out.astype(np.float32)
+
+
+def write_wav(path, seconds, rate, channels, seed=0):
+    frames = int(seconds * rate)
+    with wavfile.WavWriter(path, channels, rate, np.dtype(np.int16)) as writer:
+        for start in range(0, frames, BLOCK_FRAMES):
+            block = synth_block(start, min(BLOCK_FRAMES, frames - start), rate, channels, seed)
+            writer.write(np.rint(block * 32767).astype(np.int16))
+    return path
+
+
+def _encode(wav_path, out_path, kind):
+    if kind == "mp4":
+        # 1 fps 的小尺寸黑屏视频轨，音轨编码为 AAC
+        args = [
+            "-f", "lavfi", "-i", "color=c=black:s=160x120:r=1", "-i", wav_path,
+            "-map", "0:v", "-map", "1:a", "-shortest",
+            "-c:v", "mpeg4", "-c:a", "aac", "-b:a", "160k",
+        ]
+    else:
+        args = ["-i", wav_path, *_ENCODE_ARGS[kind]]
+    ffmpeg.run_ffmpeg([*args, out_path])
+    return out_path
+
+
+def _make_ncm(mp3_path, out_path):
+    with open(mp3_path, "rb") as f:
+        audio = f.read()
+    meta = {"musicName": "synthetic", "artist": [["audio_tools", 0]], "format": "mp3"}
+    data = ncmcrypt.encode_ncm(audio, meta)
+    with open(out_path, "wb") as f:
+        f.write(data)
+    return out_path
+
+
+def fixture_path(out_dir, kind, seconds, rate, channels, seed=0):
+    stem = f"synth_{seconds:g}s_{rate}hz_{channels}ch_s{seed}"
+    return os.path.join(out_dir, f"{stem}.{kind}")
+
+
+def build(out_dir=DEFAULT_DIR, seconds=60, rate=44100, channels=2, kinds=KINDS, seed=0):
+    """生成（或复用）各格式素材，返回 {格式: Fixture}。"""
+    os.makedirs(out_dir, exist_ok=True)
+
+    def ensure(kind, make):
+        path = fixture_path(out_dir, kind, seconds, rate, channels, seed)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.part.{kind}"  # 保留扩展名，ffmpeg 据此选择封装格式
+            try:
+                make(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return path
+
+    wav = ensure("wav", lambda p: write_wav(p, seconds, rate, channels, seed))
+    fixtures = {"wav": Fixture("wav", wav, seconds, rate, channels)}
+    for kind in kinds:
+        if kind == "wav":
+            continue
+        if kind == "ncm":
+            mp3 = ensure("mp3", lambda p: _encode(wav, p, "mp3"))
+            path = ensure("ncm", lambda p: _make_ncm(mp3, p))
+        else:
+            path = ensure(kind, lambda p, k=kind: _encode(wav, p, k))
+        fixtures[kind] = Fixture(kind, path, seconds, rate, channels)
+    return {k: fixtures[k] for k in kinds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成音视频素材")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", default=",".join(KINDS), help="逗号分隔，可选 " + ",".join(KINDS))
+    parser.add_argument("-o", "--output-dir", default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    kinds = [k for k in args.kinds.split(",") if k]
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"未知格式：{', '.join(sorted(unknown))}")
+    for fx in build(args.output_dir, args.seconds, args.rate, args.channels, kinds, args.seed).values():
+        print(f"{fx.kind:>4}: {fx.path}（{os.path.getsize(fx.path) / 2**20:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""基准测试套件：覆盖剪切、混音、提取、NCM 转换等处理路径，测量墙钟时间、CPU 时间、
+峰值 RSS 和吞吐（每秒处理的音频秒数），结果按提交保存并与之前的提交对比。
+
+    python benchmarks/suite.py                          # 60 秒素材，全部用例各跑 3 次
+    python benchmarks/suite.py -k cut -k mix --seconds 600
+    python benchmarks/suite.py --compare HEAD~3         # 与指定提交的结果对比
+    python benchmarks/suite.py --list
+
+每次运行都在独立子进程中进行；CPU 时间包含 ffmpeg、进程池等子进程，峰值 RSS 取主进程与
+子进程中较大的一个。结果写入 benchmarks/results/<机器名>/<提交>.json；未指定 --compare 时
+与当前分支历史上最近一个有结果的提交对比，耗时超过 --threshold 倍记为回退（退出码 1）。
+素材由 benchmarks/corpus.py 生成并缓存。
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import corpus  # noqa: E402  与本文件同目录
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+# --- 用例：fn(素材 {格式: 路径}, 素材时长, 输出目录) ---
+
+
+def _cut_range(fx, seconds, out):
+    from engine import cutter
+
+    cutter.cut_range(fx["wav"], seconds * 0.25, seconds * 0.75, out)
+
+
+def _cut_stream_range(fx, seconds, out):
+    from engine import cutter
+
+    cutter.stream_cut_range(fx["wav"], seconds * 0.25, seconds * 0.75, out)
+
+
+def _cut_copy(kind):
+    def run(fx, seconds, out):
+        from engine import cutter
+
+        cutter.lossless_cut_range(fx[kind], seconds * 0.25, seconds * 0.75, out)
+
+    return run
+
+
+def _cut_split_parallel(fx, seconds, out):
+    from engine import cutter
+
+    cutter.parallel_split_even(fx["wav"], 10, out, out_format="wav")
+
+
+def _cut_auto(fx, seconds, out):
+    from engine import cutter
+
+    saved, errors = cutter.split_auto(fx["wav"], out, mode="silence", streaming=True)
+    if errors:
+        raise RuntimeError(errors[0][1])
+
+
+def _mix_memory(fx, seconds, out):
+    from engine import mixer
+
+    mixer.mix_paths([fx["wav"], fx["wav"]], [2.0, -2.0], os.path.join(out, "mix.wav"))
+
+
+def _mix_stream(fx, seconds, out):
+    from engine import mixer
+
+    mixer.stream_mix_paths([fx["wav"], fx["flac"]], [2.0, -2.0], os.path.join(out, "mix.wav"))
+
+
+def _resample(quality):
+    def run(fx, seconds, out):
+        from engine import mixer, resample
+
+        data, rate = mixer._map_wav(fx["wav"])
+        target = 48000 if rate != 48000 else 44100
+        resample.convert(data, rate, resample.AudioFormat(target), quality)
+
+    return run
+
+
+def _loudness(fx, seconds, out):
+    from engine import loudness, mixer
+
+    data, rate = mixer._map_wav(fx["wav"])
+    loudness.integrated_loudness(data, rate)
+
+
+def _peaks_build(fx, seconds, out):
+    from engine import peaks
+
+    peaks.PeakIndex.build(fx["wav"])
+
+
+def _extract(out_format, copy):
+    def run(fx, seconds, out):
+        from engine import extractor
+
+        extractor.extract_audio(fx["mp4"], out, out_format, copy)
+
+    return run
+
+
+def _ncm_convert(fx, seconds, out):
+    from engine import ncm
+
+    ok, msg = ncm.convert_ncm_file(fx["ncm"], out)
+    if not ok:
+        raise RuntimeError(msg)
+
+
+def _pipeline_chain(fx, seconds, out):
+    from engine import pipeline
+
+    spec = {
+        "input": fx["mp4"],
+        "stages": [
+            {"cut": {"start": seconds * 0.25, "end": seconds * 0.75}},
+            {"mix": {"with": fx["wav"], "db": 2, "with_db": -2}},
+        ],
+        "output": os.path.join(out, "{name}.mp3"),
+    }
+    pipeline.PipelineJob(pipeline.expand(spec), workers=1).run()
+
+
+def _probe_headers(fx, seconds, out):
+    from engine import probe
+
+    for kind in ("wav", "mp3", "flac"):
+        probe.probe_headers(fx[kind])
+
+
+# 名称 -> (所需素材格式, 函数)
+CASES = {
+    "cut.range": (("wav",), _cut_range),
+    "cut.stream_range": (("wav",), _cut_stream_range),
+    "cut.copy_mp3": (("mp3",), _cut_copy("mp3")),
+    "cut.copy_flac": (("flac",), _cut_copy("flac")),
+    "cut.split_parallel": (("wav",), _cut_split_parallel),
+    "cut.auto_silence": (("wav",), _cut_auto),
+    "mix.memory": (("wav",), _mix_memory),
+    "mix.stream": (("wav", "flac"), _mix_stream),
+    "resample.fast": (("wav",), _resample("fast")),
+    "resample.hq": (("wav",), _resample("hq")),
+    "loudness.integrated": (("wav",), _loudness),
+    "peaks.build": (("wav",), _peaks_build),
+    "extract.copy": (("mp4",), _extract("m4a", True)),
+    "extract.transcode": (("mp4",), _extract("mp3", False)),
+    "ncm.convert": (("ncm",), _ncm_convert),
+    "pipeline.chain": (("wav", "mp4"), _pipeline_chain),
+    "probe.headers": (("wav", "mp3", "flac"), _probe_headers),
+}
+
+
+# --- 子进程：运行单个用例并输出一行 JSON ---
+
+
+def _maxrss_mb(kb):
+    # ru_maxrss 在 Linux 上以 KB 为单位，macOS 上以字节为单位
+    return kb / (2**20 if sys.platform == "darwin" else 1024)
+
+
+def run_worker(name, fixtures, seconds, out_dir):
+    _, fn = CASES[name]
+    self0 = resource.getrusage(resource.RUSAGE_SELF)
+    child0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    t0 = time.perf_counter()
+    fn(fixtures, seconds, out_dir)
+    wall = time.perf_counter() - t0
+    self1 = resource.getrusage(resource.RUSAGE_SELF)
+    child1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = sum(
+        getattr(b, f) - getattr(a, f)
+        for a, b in ((self0, self1), (child0, child1))
+        for f in ("ru_utime", "ru_stime")
+    )
+    print(
+        json.dumps(
+            {
+                "wall": wall,
+                "cpu": cpu,
+                "rss_mb": max(_maxrss_mb(self1.ru_maxrss), _maxrss_mb(child1.ru_maxrss)),
+            }
+        )
+    )
+
+
+def run_case(name, fixtures, seconds, repeat):
+    """重复运行 repeat 次，返回汇总结果；任何一次失败时返回 {"error": ...}。"""
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as out_dir:
+            proc = subprocess.run(
+                [
+                    sys.executable, __file__, "--worker", name,
+                    "--fixtures", json.dumps(fixtures), "--seconds", str(seconds),
+                    "--out-dir", out_dir,
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        if proc.returncode != 0:
+            lines = proc.stderr.decode(errors="replace").strip().splitlines()
+            return {"error": lines[-1] if lines else f"退出码 {proc.returncode}"}
+        runs.append(json.loads(proc.stdout.decode().strip().splitlines()[-1]))
+    wall = statistics.median(r["wall"] for r in runs)
+    return {
+        "wall": wall,
+        "wall_min": min(r["wall"] for r in runs),
+        "cpu": statistics.median(r["cpu"] for r in runs),
+        "rss_mb": max(r["rss_mb"] for r in runs),
+        "throughput": seconds / wall if wall else None,  # 每秒处理的音频秒数
+        "repeat": repeat,
+    }
+
+
+# --- 结果存取与对比 ---
+
+
+def _git(*args):
+    try:
+        out = subprocess.run(
+            ["git", *args], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.decode().strip()
+
+
+def machine_dir():
+    return os.path.join(RESULTS_DIR, platform.node() or "unknown")
+
+
+def current_commit():
+    return _git("rev-parse", "--short=10", "HEAD") or "nogit"
+
+
+def load_result(commit):
+    full = _git("rev-parse", "--short=10", commit) or commit
+    path = os.path.join(machine_dir(), f"{full}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def previous_result(params):
+    """沿当前分支历史向前查找最近一个参数相同的结果（跳过当前提交）。"""
+    history = (_git("rev-list", "--abbrev-commit", "--abbrev=10", "--max-count=200", "HEAD") or "").split()
+    for commit in history[1:]:
+        result = load_result(commit)
+        if result and result.get("params") == params:
+            return result
+    return None
+
+
+def save_result(result):
+    os.makedirs(machine_dir(), exist_ok=True)
+    path = os.path.join(machine_dir(), f"{result['commit']}.json")
+    # 同一提交多次运行时合并，只覆盖本次跑过的用例
+    old = load_result(result["commit"])
+    if old and old.get("params") == result["params"]:
+        old["results"].update(result["results"])
+        result = {**result, "results": old["results"]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def compare(result, baseline, threshold):
+    """打印对比表，返回回退的用例名列表。"""
+    print(f"\n对比基准：{baseline['commit']}（{baseline['date']}）")
+    regressions = []
+    for name, now in result["results"].items():
+        before = baseline["results"].get(name)
+        if not before or "error" in now or "error" in before:
+            continue
+        ratio = now["wall"] / before["wall"] if before["wall"] else float("inf")
+        mark = ""
+        if ratio > threshold:
+            mark = "  ⚠️ 回退"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            mark = "  ✅ 提升"
+        print(f"  {name:<22} {before['wall']:8.3f}s -> {now['wall']:8.3f}s  {ratio:5.2f}x{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="audio_tools 基准测试套件")
+    parser.add_argument("-k", "--filter", action="append", help="只运行名称包含该字符串的用例，可多次指定")
+    parser.add_argument("--seconds", type=float, default=60, help="素材时长（秒）")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例运行次数，取中位数")
+    parser.add_argument("--corpus-dir", default=corpus.DEFAULT_DIR)
+    parser.add_argument("--compare", metavar="REV", help="与该提交的结果对比（默认为最近一个有结果的祖先提交）")
+    parser.add_argument("--threshold", type=float, default=1.2, help="耗时超过基准的该倍数时记为回退")
+    parser.add_argument("--no-save", action="store_true", help="不保存本次结果")
+    parser.add_argument("--list", action="store_true", help="列出全部用例")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--fixtures", help=argparse.SUPPRESS)
+    parser.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, json.loads(args.fixtures), args.seconds, args.out_dir)
+        return 0
+    if args.list:
+        for name, (kinds, _) in CASES.items():
+            print(f"{name:<22} 素材：{', '.join(kinds)}")
+        return 0
+
+    names = [n for n in CASES if not args.filter or any(f in n for f in args.filter)]
+    kinds = sorted({k for n in names for k in CASES[n][0]}, key=corpus.KINDS.index)
+    print(f"准备素材（{args.seconds:g} 秒，{args.rate} Hz，{args.channels} 声道）：{', '.join(kinds)}")
+    fixtures = {
+        k: fx.path
+        for k, fx in corpus.build(args.corpus_dir, args.seconds, args.rate, args.channels, kinds).items()
+    }
+
+    params = {"seconds": args.seconds, "rate": args.rate, "channels": args.channels}
+    result = {
+        "commit": current_commit(),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "node": platform.node(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "platform": platform.platform(),
+        },
+        "params": params,
+        "results": {},
+    }
+    print(f"{'用例':<22} {'墙钟':>9} {'CPU':>9} {'峰值RSS':>9} {'吞吐':>12}")
+    for name in names:
+        r = run_case(name, fixtures, args.seconds, args.repeat)
+        result["results"][name] = r
+        if "error" in r:
+            print(f"{name:<22} ❌ {r['error']}")
+        else:
+            print(
+                f"{name:<22} {r['wall']:8.3f}s {r['cpu']:8.3f}s {r['rss_mb']:7.0f}MB "
+                f"{r['throughput']:9.1f}x实时"
+            )
+
+    if not args.no_save:
+        print(f"\n结果已保存：{save_result(result)}")
+    baseline = load_result(args.compare) if args.compare else previous_result(params)
+    if args.compare and baseline is None:
+        print(f"\n未找到提交 {args.compare} 的结果", file=sys.stderr)
+        return 2
+    if baseline:
+        return 1 if compare(result, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,601 @@
+"""audio-tools 命令行入口：python cli.py cut|mix|extract|ncm|pipeline|probe|watch ...
+
+各子命令只在执行时才导入对应的处理模块，不会加载 tkinter / customtkinter / moviepy。
+"""
+import argparse
+import os
+import sys
+
+
+def cmd_cut(args):
+    from engine import cutter
+
+    if args.auto:
+        saved, errors = cutter.split_auto(
+            args.input,
+            args.output_dir,
+            mode=args.auto,
+            min_len=args.min_len,
+            max_len=args.max_len,
+            threshold_db=args.threshold,
+            min_silence=args.min_silence,
+            streaming=args.stream,
+        )
+        for name in saved:
+            print(name)
+        for i, msg in errors:
+            print(f"第{i}段导出失败：{msg}", file=sys.stderr)
+        return 1 if errors else 0
+
+    if args.copy:
+        if args.split:
+            saved, errors = cutter.lossless_split_even(
+                args.input, args.split, args.output_dir, accurate=not args.frame_aligned
+            )
+            for name in saved:
+                print(name)
+            for i, msg in errors:
+                print(f"第{i}段导出失败：{msg}", file=sys.stderr)
+            return 1 if errors else 0
+        if args.start is None or args.end is None:
+            print("自由选择时间模式需要 --start 和 --end", file=sys.stderr)
+            return 2
+        print(
+            cutter.lossless_cut_range(
+                args.input,
+                args.start,
+                args.end,
+                args.output_dir,
+                samples=args.samples,
+                accurate=not args.frame_aligned,
+            )
+        )
+        return 0
+
+    if args.split:
+        if args.workers > 1 or args.format != "wav":
+            stats = cutter.parallel_split_even(
+                args.input, args.split, args.output_dir, args.workers, args.format
+            )
+            saved, errors = stats.saved, stats.errors
+            print(
+                f"导出 {len(saved)} 段，用时 {stats.elapsed:.2f} 秒，"
+                f"{stats.segments_per_sec:.1f} 段/秒",
+                file=sys.stderr,
+            )
+        else:
+            split = cutter.stream_split_even if args.stream else cutter.split_even
+            saved, errors = split(args.input, args.split, args.output_dir)
+        for name in saved:
+            print(name)
+        for i, msg in errors:
+            print(f"第{i}段导出失败：{msg}", file=sys.stderr)
+        return 1 if errors else 0
+
+    if args.start is None or args.end is None:
+        print("自由选择时间模式需要 --start 和 --end", file=sys.stderr)
+        return 2
+    cut = cutter.stream_cut_range if args.stream else cutter.cut_range
+    print(cut(args.input, args.start, args.end, args.output_dir))
+    return 0
+
+
+def _fingerprint_index(args):
+    if not args.dedup:
+        return None
+    from engine.fingerprint import DEFAULT_INDEX, FingerprintIndex
+
+    return FingerprintIndex(args.fp_index or DEFAULT_INDEX)
+
+
+def cmd_mix(args):
+    from engine import mixer, resample
+    from engine.cache import PCMCache
+
+    cache = None if args.no_cache else PCMCache(args.cache_dir, args.cache_size << 20)
+    if os.path.isfile(args.vocal):
+        files = [args.vocal]
+        base_folder = os.path.dirname(args.vocal)
+    elif os.path.isdir(args.vocal):
+        files = mixer.collect_vocal_files(args.vocal)
+        base_folder = args.vocal
+    else:
+        print(f"无效的人声路径：{args.vocal}", file=sys.stderr)
+        return 2
+    base_folder = args.output_dir or base_folder
+
+    job = mixer.BatchMixJob(
+        files,
+        args.instr,
+        args.vocal_db,
+        args.instr_db,
+        base_folder,
+        limiter=args.limiter,
+        cache=cache,
+        workers=args.workers,
+        resume=args.resume,
+        target_lufs=args.lufs,
+        fmt=resample.AudioFormat(
+            args.rate,
+            args.channels,
+            resample.SAMPLE_FORMATS[args.sample_format] if args.sample_format else None,
+        ),
+        quality=args.resample,
+        streaming=args.stream,
+        pad=args.pad,
+        dedup=_fingerprint_index(args),
+    ).start()
+    success = fail = skipped = 0
+    try:
+        while True:
+            finished = job.done  # 先读状态再取事件，保证不会漏掉最后一批
+            for ev in job.poll(timeout=0.5):
+                if ev.error:
+                    fail += 1
+                    print(f"[{ev.index}/{ev.total}] ❌ {ev.path}：{ev.error}", file=sys.stderr)
+                elif ev.duplicate_of:
+                    skipped += 1
+                    print(f"[{ev.index}/{ev.total}] ♻️ {ev.output}（与 {ev.duplicate_of} 相同）")
+                elif ev.skipped:
+                    skipped += 1
+                    print(f"[{ev.index}/{ev.total}] ⏭️ {ev.output}")
+                else:
+                    success += 1
+                    print(f"[{ev.index}/{ev.total}] ✅ {ev.output}")
+            if finished:
+                break
+    except KeyboardInterrupt:
+        job.cancel()
+        job.wait()
+        print("已取消", file=sys.stderr)
+        return 130
+    if job.error:
+        print(f"❌ {job.error}", file=sys.stderr)
+        return 1
+    print(f"处理完成，成功：{success} 个，跳过：{skipped} 个，失败：{fail} 个")
+    return 1 if fail else 0
+
+
+def cmd_extract(args):
+    from engine import extractor
+
+    if not os.path.isdir(args.video):
+        if args.list_tracks:
+            for k, st in enumerate(extractor.probe_audio_streams(args.video)):
+                print(
+                    f"a{k}: 流 #{st.index} {st.codec} {st.channels} 声道 {st.sample_rate} Hz "
+                    f"语言 {st.language or '未知'}"
+                )
+            return 0
+        if args.tracks or args.range:
+            tracks = extractor.parse_tracks(args.tracks) if args.tracks else None
+            ranges = extractor.parse_ranges(",".join(args.range)) if args.range else None
+            for out in extractor.extract_tracks(
+                args.video, args.output_dir, args.format, tracks, ranges, not args.no_copy
+            ):
+                print(out)
+            return 0
+        print(extractor.extract_audio(args.video, args.output_dir, args.format, not args.no_copy))
+        return 0
+
+    files = extractor.find_videos(args.video, recursive=not args.no_recursive)
+    job = extractor.BatchExtractJob(
+        files,
+        args.output_dir,
+        args.format,
+        copy=not args.no_copy,
+        workers=args.workers,
+        resume=not args.force,
+        root=args.video,
+    ).start()
+    try:
+        while True:
+            finished = job.done
+            for ev in job.poll(timeout=0.5):
+                if ev.error:
+                    print(f"[{ev.index}/{ev.total}] ❌ {ev.path}：{ev.error}", file=sys.stderr)
+                elif ev.skipped:
+                    print(f"[{ev.index}/{ev.total}] ⏭️ {ev.output}")
+                else:
+                    print(f"[{ev.index}/{ev.total}] ✅ {ev.output}（{ev.elapsed:.2f} 秒）")
+            if finished:
+                break
+    except KeyboardInterrupt:
+        job.cancel()
+        job.wait()
+        print("已取消", file=sys.stderr)
+        return 130
+
+    stats = job.stats
+    print(
+        f"提取完成！成功：{stats.success} 个，跳过：{stats.skipped} 个，失败：{stats.failed} 个。"
+        f"用时 {stats.elapsed:.1f} 秒，{stats.files_per_sec:.2f} 个/秒"
+    )
+    return 1 if stats.failed or job.error else 0
+
+
+def cmd_ncm(args):
+    from engine import ncm
+
+    ncm_files = ncm.find_ncm_files(args.src)
+    if ncm_files is None:
+        print("请选择 .ncm 文件或包含 .ncm 的目录", file=sys.stderr)
+        return 2
+
+    sync = None
+    if args.sync:
+        from engine.ncmsync import NcmSync
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        sync = NcmSync(args.src, args.output_dir, args.index, retry_failed=not args.no_retry)
+        plan = sync.plan()
+        ncm_files = plan.todo
+        print(
+            f"增量同步：待转换 {len(plan.todo)} 个，未变化 {plan.unchanged} 个，"
+            f"孤立输出 {len(plan.orphans)} 个"
+        )
+        if args.prune and plan.orphans:
+            print(f"已清理 {sync.prune(plan.orphans)} 个孤立输出")
+
+    backend = "ncmdump" if args.ncmdump else "native"
+    job = ncm.NcmBatchJob(
+        ncm_files, args.output_dir, args.jobs, backend=backend, dedup=_fingerprint_index(args)
+    ).start()
+    try:
+        while True:
+            finished = job.done
+            for ev in job.poll(timeout=0.5):
+                if sync:
+                    sync.record(ev)
+                if ev.success:
+                    print(f"[{ev.index}/{ev.total}] ✅ {ev.path}")
+                else:
+                    print(f"[{ev.index}/{ev.total}] ❌ {ev.path}：{ev.message}", file=sys.stderr)
+            if sync:
+                sync.commit()
+            if finished:
+                break
+    except KeyboardInterrupt:
+        job.cancel()
+        job.wait()
+        print("已取消", file=sys.stderr)
+        return 130
+    finally:
+        if sync:
+            sync.commit()
+            sync.close()
+
+    if job.error:
+        print(f"❌ {job.error}", file=sys.stderr)
+        return 1
+    stats = job.stats
+    print(
+        f"转换完成！成功：{stats.success} 个，失败：{stats.failed} 个。"
+        f"用时 {stats.elapsed:.1f} 秒，{stats.files_per_sec:.1f} 个/秒，{stats.mb_per_sec:.1f} MB/秒"
+    )
+    if job.duplicates:
+        print(f"其中 {job.duplicates} 个与其他文件是同一首歌，已复用其输出")
+    return 1 if stats.failed else 0
+
+
+def cmd_pipeline(args):
+    from engine import pipeline
+    from engine.cache import PCMCache
+
+    spec, base_dir = pipeline.load_spec(args.spec)
+    instances = pipeline.expand(spec, base_dir)
+    job = pipeline.PipelineJob(
+        instances,
+        pipeline.parse_format(spec.get("format")),
+        spec.get("quality", "fast"),
+        workers=args.workers,
+        cache=None if args.no_cache else PCMCache(args.cache_dir),
+        resume=args.resume,
+    ).start()
+    success = fail = skipped = 0
+    try:
+        while True:
+            finished = job.done
+            for ev in job.poll(timeout=0.5):
+                if ev.error:
+                    fail += 1
+                    print(f"[{ev.index}/{ev.total}] ❌ {ev.source}：{ev.error}", file=sys.stderr)
+                elif ev.skipped:
+                    skipped += 1
+                    print(f"[{ev.index}/{ev.total}] ⏭️ {ev.output}")
+                else:
+                    success += 1
+                    print(f"[{ev.index}/{ev.total}] ✅ {ev.output}（{ev.elapsed:.2f} 秒）")
+            if finished:
+                break
+    except KeyboardInterrupt:
+        job.cancel()
+        job.wait()
+        print("已取消", file=sys.stderr)
+        return 130
+    if job.error:
+        print(f"❌ {job.error}", file=sys.stderr)
+        return 1
+    print(
+        f"处理完成，成功：{success} 个，跳过：{skipped} 个，失败：{fail} 个。用时 {job.elapsed:.1f} 秒"
+    )
+    return 1 if fail else 0
+
+
+def cmd_probe(args):
+    import json
+
+    from engine import probe
+
+    code = 0
+    for path in args.files:
+        try:
+            info = probe.probe(path, cache=False if args.no_cache else None)
+        except Exception as e:
+            print(f"❌ {path}：{e}", file=sys.stderr)
+            code = 1
+            continue
+        if args.json:
+            d = {"path": path, **info._asdict(), "streams": [s._asdict() for s in info.streams]}
+            print(json.dumps(d, ensure_ascii=False))
+            continue
+        frames = f"，{info.frames} 帧" if info.frames is not None else ""
+        print(
+            f"{path}：{info.duration:.3f} 秒{frames}，{info.codec or '无音轨'}，"
+            f"{info.sample_rate} Hz，{info.channels} 声道"
+        )
+        if len(info.streams) > 1:
+            for st in info.streams:
+                detail = f" {st.channels} 声道 {st.sample_rate} Hz" if st.kind == "audio" else ""
+                print(f"  #{st.index} {st.kind} {st.codec}{detail} {st.language}".rstrip())
+    return code
+
+
+def cmd_watch(args):
+    from engine import pipeline, watch
+    from engine.jobqueue import DEFAULT_QUEUE, JobQueue
+
+    spec, base_dir = pipeline.load_spec(args.config)
+    rules = watch.parse_rules(spec, base_dir)
+    if args.queue:
+        queue_path = args.queue
+    elif spec.get("queue"):
+        queue_path = os.path.join(base_dir, os.path.expanduser(spec["queue"]))
+    else:
+        queue_path = DEFAULT_QUEUE
+    queue = JobQueue(queue_path)
+    daemon = watch.WatchDaemon(
+        rules,
+        queue,
+        workers=args.workers or spec.get("workers"),
+        poll=float(spec.get("poll", watch.POLL_SECONDS)),
+        settle=float(spec.get("settle", watch.SETTLE_SECONDS)),
+    ).start()
+    server = None
+    if not args.no_api:
+        server = watch.serve_api(daemon, args.host, args.port, args.socket)
+        where = args.socket or f"http://{args.host}:{args.port}"
+        print(f"API：{where}（/jobs /stats /metrics）")
+    for rule in rules:
+        print(f"监视 {rule.dir} -> {rule.kind}")
+    try:
+        while True:
+            finished = daemon.done
+            for ev in daemon.poll(timeout=0.5):
+                if ev.status == "queued":
+                    print(f"➕ {ev.kind} {ev.source}")
+                elif ev.error:
+                    print(f"#{ev.id} ❌ {ev.source}：{ev.error}", file=sys.stderr)
+                else:
+                    print(f"#{ev.id} ✅ {ev.output}（{ev.elapsed:.2f} 秒）")
+            if finished:
+                break
+    except KeyboardInterrupt:
+        print("正在等待运行中的任务结束…", file=sys.stderr)
+        daemon.cancel()
+        daemon.wait()
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+        queue.close()
+    if daemon.error:
+        print(f"❌ {daemon.error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _add_dedup_args(p):
+    p.add_argument(
+        "--dedup", action="store_true", help="按声学指纹识别重复录音：每组只处理一次，其余复用其输出"
+    )
+    p.add_argument("--fp-index", metavar="PATH", help="指纹索引路径（默认在缓存目录下）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="audio-tools", description="音频/视频处理工具集")
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="把各阶段耗时和计数写入 PATH：.prom 结尾为 Prometheus 文本格式，否则追加为 JSON lines",
+    )
+    parser.add_argument("--report", action="store_true", help="结束时在 stderr 打印各阶段耗时汇总")
+    parser.add_argument(
+        "--profile", choices=["cpu", "memory", "all"], help="用 cProfile（cpu）/ tracemalloc（memory）分析"
+    )
+    parser.add_argument(
+        "--profile-out", default="audio_tools_profile", metavar="PREFIX", help="分析结果文件名前缀"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("cut", help="剪切音频")
+    p.add_argument("input")
+    p.add_argument("--start", type=float, help="开始时间（秒；配合 --samples 时为采样序号）")
+    p.add_argument("--end", type=float, help="结束时间（秒；配合 --samples 时为采样序号）")
+    p.add_argument("--split", type=int, metavar="N", help="平均分成 N 段")
+    p.add_argument(
+        "--auto", choices=["silence", "onset"], help="自动分段：在静音处或起音前切分"
+    )
+    p.add_argument("--min-len", type=float, default=1.0, help="自动分段的最短分段时长（秒）")
+    p.add_argument("--max-len", type=float, help="自动分段的最长分段时长（秒），超出时强制切分")
+    p.add_argument("--threshold", type=float, default=-40.0, help="静音阈值（dBFS）")
+    p.add_argument("--min-silence", type=float, default=0.3, help="最短静音时长（秒）")
+    p.add_argument("-o", "--output-dir")
+    p.add_argument(
+        "--stream", action="store_true", help="流式剪切，只读取需要的时间段（低内存）"
+    )
+    p.add_argument(
+        "-j", "--workers", type=int, default=1, help="平均分段时的并行导出进程数"
+    )
+    p.add_argument(
+        "-f", "--format", default="wav", choices=["wav", "mp3", "flac"], help="分段导出格式"
+    )
+    p.add_argument(
+        "--copy",
+        action="store_true",
+        help="保留源格式，不重新编码（WAV 字节复制，MP3 / FLAC 按帧复制）",
+    )
+    p.add_argument("--samples", action="store_true", help="--start / --end 以采样为单位")
+    p.add_argument(
+        "--frame-aligned",
+        action="store_true",
+        help="配合 --copy：剪切点取整到帧边界，不写 MP3 无缝信息、不重新编码 FLAC 首尾帧",
+    )
+    p.set_defaults(func=cmd_cut)
+
+    p = sub.add_parser("mix", help="人声与伴奏批量混音")
+    p.add_argument("vocal", help="人声音频文件或文件夹")
+    p.add_argument("--instr", required=True, help="伴奏音频文件")
+    p.add_argument("--vocal-db", type=float, default=2.0)
+    p.add_argument("--instr-db", type=float, default=-2.0)
+    p.add_argument("--limiter", action="store_true", help="使用软限幅代替硬削波")
+    p.add_argument(
+        "--lufs",
+        type=float,
+        metavar="TARGET",
+        help="先把人声和伴奏各自归一到该响度（EBU R128，如 -16），--vocal-db / --instr-db 作为偏移",
+    )
+    p.add_argument("--rate", type=int, default=44100, help="输出采样率")
+    p.add_argument("--channels", type=int, default=2, choices=[1, 2], help="输出声道数")
+    p.add_argument(
+        "--sample-format", choices=["s16", "s32", "f32"], help="输出采样格式（默认取各分轨中最宽的）"
+    )
+    p.add_argument(
+        "--resample", default="fast", choices=["fast", "hq"], help="重采样质量：fast 更快，hq 阻带衰减更高"
+    )
+    p.add_argument(
+        "--stream", action="store_true", help="流式混音：按块读取和写出，内存占用与音频时长无关"
+    )
+    p.add_argument("--pad", action="store_true", help="以较长的分轨为准，较短的补静音（默认截断）")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="并发进程数")
+    p.add_argument("--resume", action="store_true", help="跳过已是最新的输出文件")
+    p.add_argument("--no-cache", action="store_true", help="不使用伴奏解码缓存")
+    p.add_argument("--cache-dir", help="伴奏解码缓存目录")
+    p.add_argument("--cache-size", type=int, default=4096, metavar="MB", help="缓存容量上限")
+    p.add_argument("-o", "--output-dir")
+    _add_dedup_args(p)
+    p.set_defaults(func=cmd_mix)
+
+    p = sub.add_parser("extract", help="从视频中提取音频")
+    p.add_argument("video", help="视频文件或目录（目录模式会递归批量提取）")
+    p.add_argument("-o", "--output-dir")
+    p.add_argument("-f", "--format", default="mp3", choices=["mp3", "wav", "m4a"])
+    p.add_argument("--no-copy", action="store_true", help="总是重新编码，不直接复制音轨")
+    p.add_argument("--list-tracks", action="store_true", help="列出所有音轨后退出")
+    p.add_argument("--tracks", help="要提取的音轨序号，如 0,1（从 0 开始，只计音轨）")
+    p.add_argument(
+        "--range", action="append", metavar="START-END", help="只提取该时间段（秒），可重复指定"
+    )
+    p.add_argument("-j", "--workers", type=int, default=min(4, os.cpu_count() or 1), help="同时运行的 ffmpeg 进程数")
+    p.add_argument("--force", action="store_true", help="目录模式下不跳过已是最新的输出")
+    p.add_argument("--no-recursive", action="store_true", help="目录模式下不进入子目录")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("ncm", help="转换 .ncm 文件")
+    p.add_argument("src", help=".ncm 文件或目录")
+    p.add_argument("-o", "--output-dir", required=True)
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4, help="并发转换数")
+    p.add_argument("--ncmdump", action="store_true", help="使用外部 ncmdump 代替内置解密")
+    p.add_argument("--sync", action="store_true", help="增量同步：只转换新增或变更的文件")
+    p.add_argument("--index", help="同步索引路径（默认为输出目录下的 .ncm_index.sqlite3）")
+    p.add_argument("--no-retry", action="store_true", help="同步时不重试之前失败的文件")
+    p.add_argument("--prune", action="store_true", help="同步时删除源文件已不存在的输出")
+    _add_dedup_args(p)
+    p.set_defaults(func=cmd_ncm)
+
+    p = sub.add_parser("pipeline", help="按 JSON / YAML 描述执行 提取 -> 剪切 -> 混音 流水线")
+    p.add_argument("spec", help="描述文件（.json / .yaml），格式见 engine/pipeline.py")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="并发进程数")
+    p.add_argument("--resume", action="store_true", help="跳过已是最新的输出文件")
+    p.add_argument("--no-cache", action="store_true", help="不使用伴奏解码缓存")
+    p.add_argument("--cache-dir", help="伴奏解码缓存目录")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("probe", help="只读文件头显示时长、采样率、声道、编码和流列表")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--json", action="store_true", help="每个文件输出一行 JSON")
+    p.add_argument("--no-cache", action="store_true", help="不读写探测缓存")
+    p.set_defaults(func=cmd_probe)
+
+    p = sub.add_parser("watch", help="监视文件夹，自动混音 / 提取 / 转换新文件（附带本机 HTTP API）")
+    p.add_argument("config", help="配置文件（.json / .yaml），格式见 engine/watch.py")
+    p.add_argument("-j", "--workers", type=int, help="常驻工作进程数（默认 CPU 核数）")
+    p.add_argument("--queue", help="任务队列数据库路径（默认在缓存目录下）")
+    p.add_argument("--host", default="127.0.0.1", help="API 监听地址")
+    p.add_argument("--port", type=int, default=8765, help="API 端口")
+    p.add_argument("--socket", metavar="PATH", help="改用 Unix 套接字提供 API")
+    p.add_argument("--no-api", action="store_true", help="不启动 API")
+    p.set_defaults(func=cmd_watch)
+    return parser
+
+
+def run(args):
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+
+def run_instrumented(args):
+    """在收集器（和可选的分析器）下运行子命令，结束后按参数输出指标、汇总和分析结果。"""
+    import contextlib
+    import time
+
+    from engine import metrics
+
+    collector = metrics.Metrics()
+    profiler = None
+    if args.profile:
+        profiler = metrics.Profiler(
+            cpu=args.profile in ("cpu", "all"), memory=args.profile in ("memory", "all")
+        )
+    t0 = time.perf_counter()
+    with metrics.collecting(collector, profiler), profiler or contextlib.nullcontext():
+        code = run(args)
+    collector.set("command_seconds", time.perf_counter() - t0)
+    if profiler and profiler.peak_bytes is not None:
+        collector.set("tracemalloc_peak_bytes", profiler.peak_bytes)
+
+    if args.metrics:
+        collector.write(args.metrics, command=args.command)
+        print(f"指标已写入：{args.metrics}", file=sys.stderr)
+    if args.report:
+        print("\n".join(["", *collector.summary_lines()]), file=sys.stderr)
+    if profiler:
+        for path in profiler.save(args.profile_out):
+            print(f"分析结果已写入：{path}", file=sys.stderr)
+        if args.report:
+            print("\n".join(["", *profiler.top_functions(), *profiler.top_allocations()]), file=sys.stderr)
+    return code
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics or args.report or args.profile:
+        return run_instrumented(args)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# 无界面的处理核心：GUI 与命令行共用。
+# 子模块按需导入，重量级依赖（pydub、moviepy 等）只在实际调用时加载。
@@ -0,0 +1,144 @@
+# 纯 Python 的 AES-128 ECB，仅用于 NCM 头部的密钥块与元数据块（均不超过几 KB），
+# 省去对 pycryptodome / cryptography 的依赖。
+
+
+def _rotl8(x, shift):
+    return ((x << shift) | (x >> (8 - shift))) & 0xFF
+
+
+def _build_sbox():
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p 乘以 3，q 除以 3，遍历 GF(2^8) 的乘法群
+        p = p ^ ((p << 1) & 0xFF) ^ (0x1B if p & 0x80 else 0)
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        x = q ^ _rotl8(q, 1) ^ _rotl8(q, 2) ^ _rotl8(q, 3) ^ _rotl8(q, 4)
+        sbox[p] = x ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    inv = [0] * 256
+    for i, v in enumerate(sbox):
+        inv[v] = i
+    return sbox, inv
+
+
+def _gmul(a, b):
+    r = 0
+    while b:
+        if b & 1:
+            r ^= a
+        a = ((a << 1) ^ 0x1B) & 0xFF if a & 0x80 else a << 1
+        b >>= 1
+    return r
+
+
+SBOX, INV_SBOX = _build_sbox()
+_MUL = {n: [_gmul(i, n) for i in range(256)] for n in (2, 3, 9, 11, 13, 14)}
+_RCON = (0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36)
+
+
+def _expand_key(key):
+    if len(key) != 16:
+        raise ValueError("仅支持 AES-128（16 字节密钥）")
+    words = [list(key[i : i + 4]) for i in range(0, 16, 4)]
+    for i in range(4, 44):
+        t = list(words[i - 1])
+        if i % 4 == 0:
+            t = t[1:] + t[:1]
+            t = [SBOX[b] for b in t]
+            t[0] ^= _RCON[i // 4 - 1]
+        words.append([a ^ b for a, b in zip(words[i - 4], t)])
+    return [sum(words[4 * r : 4 * r + 4], []) for r in range(11)]
+
+
+def _shift_rows(s):
+    return [s[r + 4 * ((c + r) % 4)] for c in range(4) for r in range(4)]
+
+
+def _inv_shift_rows(s):
+    return [s[r + 4 * ((c - r) % 4)] for c in range(4) for r in range(4)]
+
+
+def _mix_columns(s):
+    m2, m3 = _MUL[2], _MUL[3]
+    out = []
+    for c in range(0, 16, 4):
+        a0, a1, a2, a3 = s[c : c + 4]
+        out += (
+            m2[a0] ^ m3[a1] ^ a2 ^ a3,
+            a0 ^ m2[a1] ^ m3[a2] ^ a3,
+            a0 ^ a1 ^ m2[a2] ^ m3[a3],
+            m3[a0] ^ a1 ^ a2 ^ m2[a3],
+        )
+    return out
+
+
+def _inv_mix_columns(s):
+    m9, m11, m13, m14 = _MUL[9], _MUL[11], _MUL[13], _MUL[14]
+    out = []
+    for c in range(0, 16, 4):
+        a0, a1, a2, a3 = s[c : c + 4]
+        out += (
+            m14[a0] ^ m11[a1] ^ m13[a2] ^ m9[a3],
+            m9[a0] ^ m14[a1] ^ m11[a2] ^ m13[a3],
+            m13[a0] ^ m9[a1] ^ m14[a2] ^ m11[a3],
+            m11[a0] ^ m13[a1] ^ m9[a2] ^ m14[a3],
+        )
+    return out
+
+
+def _add(s, k):
+    return [a ^ b for a, b in zip(s, k)]
+
+
+def _encrypt_block(block, round_keys):
+    s = _add(block, round_keys[0])
+    for rnd in range(1, 10):
+        s = _add(_mix_columns(_shift_rows([SBOX[b] for b in s])), round_keys[rnd])
+    return _add(_shift_rows([SBOX[b] for b in s]), round_keys[10])
+
+
+def _decrypt_block(block, round_keys):
+    s = _add(block, round_keys[10])
+    for rnd in range(9, 0, -1):
+        s = _inv_mix_columns(_add([INV_SBOX[b] for b in _inv_shift_rows(s)], round_keys[rnd]))
+    return _add([INV_SBOX[b] for b in _inv_shift_rows(s)], round_keys[0])
+
+
+def ecb_encrypt(key, data):
+    if len(data) % 16:
+        raise ValueError("数据长度必须是 16 的倍数")
+    round_keys = _expand_key(key)
+    out = bytearray()
+    for i in range(0, len(data), 16):
+        out += bytes(_encrypt_block(list(data[i : i + 16]), round_keys))
+    return bytes(out)
+
+
+def ecb_decrypt(key, data):
+    if len(data) % 16:
+        raise ValueError("数据长度必须是 16 的倍数")
+    round_keys = _expand_key(key)
+    out = bytearray()
+    for i in range(0, len(data), 16):
+        out += bytes(_decrypt_block(list(data[i : i + 16]), round_keys))
+    return bytes(out)
+
+
+def pkcs7_pad(data, block_size=16):
+    n = block_size - len(data) % block_size
+    return data + bytes([n]) * n
+
+
+def pkcs7_unpad(data):
+    n = data[-1] if data else 0
+    if not 1 <= n <= 16 or data[-n:] != bytes([n]) * n:
+        raise ValueError("填充无效，密钥或数据可能已损坏")
+    return data[:-n]
@@ -0,0 +1,146 @@
+# 自动分段：按帧计算 RMS 能量（NumPy 向量化，分块流式读取），
+# 在静音处或起音（onset）前切分，并满足最短 / 最长分段时长约束。
+from collections import namedtuple
+
+import numpy as np
+
+from . import pcmstream
+
+MODES = ("silence", "onset")
+FRAME_MS = 10
+CHUNK_SEC = 30
+SILENCE_FLOOR_DB = -120.0
+
+# db: 每帧 RMS 电平 (dBFS)；frame_sec: 帧长（秒）；duration: 总时长（秒）
+EnergyProfile = namedtuple("EnergyProfile", "db frame_sec duration")
+
+
+def _frame_power(block, frame_len):
+    """block 为 (采样数, 声道) 的 float32 数组（已归一化到 ±1），返回每帧均方值。"""
+    frames = len(block) // frame_len
+    x = block[: frames * frame_len].reshape(frames, -1)
+    return np.einsum("ij,ij->i", x, x) / x.shape[1]
+
+
+def energy_profile(path, frame_ms=FRAME_MS, audio=None, chunk_sec=CHUNK_SEC):
+    """逐块计算每帧 RMS 电平。已解码的 AudioSegment 直接使用；WAV 源通过 memmap 读取；
+    其余格式由 ffmpeg 解码为单声道 PCM 流。整段音频不会被同时转换为浮点数组。"""
+    source = pcmstream.open_source(path, audio)
+    rate = source.sample_rate
+    frame_len = max(1, round(rate * frame_ms / 1000))
+    # 块长取帧长的整数倍，帧不会跨块
+    chunk_frames = max(1, round(rate * chunk_sec) // frame_len) * frame_len
+    powers = []
+    samples = 0
+    for block in source.blocks(chunk_frames):
+        samples += len(block)
+        if len(block) >= frame_len:
+            powers.append(_frame_power(block, frame_len))
+        if len(block) % frame_len:
+            # 末尾不足一帧的部分单独成帧
+            tail = block[len(block) - len(block) % frame_len :]
+            powers.append(_frame_power(tail, len(tail)))
+    power = np.concatenate(powers) if powers else np.zeros(0, dtype=np.float32)
+    with np.errstate(divide="ignore"):
+        db = 10 * np.log10(power)
+    db = np.maximum(db, SILENCE_FLOOR_DB).astype(np.float32)
+    return EnergyProfile(db, frame_len / rate, samples / rate)
+
+
+def _runs(mask):
+    """布尔数组中连续 True 的区间，返回 (起点数组, 终点数组)，终点不含。"""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_silences(profile, threshold_db=-40.0, min_silence=0.3):
+    """返回 [(开始秒, 结束秒), ...]：电平低于 threshold_db 且持续至少 min_silence 秒的区间。"""
+    starts, ends = _runs(profile.db < threshold_db)
+    keep = (ends - starts) * profile.frame_sec >= min_silence
+    fs = profile.frame_sec
+    return [(s * fs, min(e * fs, profile.duration)) for s, e in zip(starts[keep], ends[keep])]
+
+
+def detect_onsets(profile, delta_db=6.0, min_gap=0.1, window=0.5):
+    """基于对数能量的正向差分检测起音点，返回秒数列表。
+
+    当前帧能量较前一帧的上升量超过 (window 秒滑动平均 + delta_db) 且为局部最大值时记为起音。
+    """
+    db = profile.db
+    if len(db) < 3:
+        return []
+    flux = np.maximum(np.diff(db, prepend=db[0]), 0)
+    win = max(1, int(window / profile.frame_sec))
+    kernel = np.ones(win, dtype=np.float32) / win
+    threshold = np.convolve(flux, kernel, mode="same") + delta_db
+    peak = (flux > threshold) & (flux >= np.roll(flux, 1)) & (flux >= np.roll(flux, -1))
+    candidates = np.flatnonzero(peak)
+
+    min_frames = max(1, int(min_gap / profile.frame_sec))
+    onsets = []
+    last = -min_frames
+    for i in candidates:
+        if i - last >= min_frames:
+            onsets.append(int(i))
+            last = i
+    return [i * profile.frame_sec for i in onsets]
+
+
+def _cut_candidates(profile, mode, threshold_db, min_silence, delta_db):
+    if mode == "silence":
+        # 在每段静音的中点切分，前后两段各保留一半静音
+        return [(s + e) / 2 for s, e in detect_silences(profile, threshold_db, min_silence)]
+    if mode == "onset":
+        # 在起音前一帧切分，保留音头
+        return [max(0.0, t - profile.frame_sec) for t in detect_onsets(profile, delta_db)]
+    raise ValueError(f"不支持的自动分段模式：{mode}（可选：{', '.join(MODES)}）")
+
+
+def plan_segments(
+    profile,
+    mode="silence",
+    min_len=1.0,
+    max_len=None,
+    threshold_db=-40.0,
+    min_silence=0.3,
+    delta_db=6.0,
+):
+    """计算分段区间 [(开始秒, 结束秒), ...]。
+
+    从当前起点开始，取第一个使分段长度 >= min_len 的切点；若在 max_len 内没有切点，
+    则在 [min_len, max_len] 范围内最安静的帧处强制切分。末段过短时并入前一段。
+    """
+    duration = profile.duration
+    if duration <= 0:
+        return []
+    if max_len is not None and max_len < min_len:
+        raise ValueError("最长分段时长不能小于最短分段时长")
+
+    points = np.asarray(_cut_candidates(profile, mode, threshold_db, min_silence, delta_db))
+    fs = profile.frame_sec
+    step = max(min_len, fs)  # 保证每次切分都向前推进
+    cuts = []
+    start = 0.0
+    while True:
+        limit = duration if max_len is None else min(duration, start + max_len)
+        i = np.searchsorted(points, start + step)
+        if i < len(points) and points[i] < limit:
+            cut = float(points[i])
+        elif max_len is None or duration - start <= max_len:
+            break
+        else:
+            lo = round(start / fs) + max(1, int(np.ceil(step / fs - 1e-9)))
+            hi = max(lo + 1, int(limit / fs))
+            cut = (lo + int(np.argmin(profile.db[lo:hi]))) * fs
+        if duration - cut <= 0:
+            break
+        cuts.append(cut)
+        start = cut
+
+    if cuts and duration - cuts[-1] < min_len:
+        prev = cuts[-2] if len(cuts) > 1 else 0.0
+        if max_len is None or duration - prev <= max_len:
+            cuts.pop()
+
+    bounds = [0.0] + cuts + [duration]
+    return list(zip(bounds[:-1], bounds[1:]))
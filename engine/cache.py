@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "AUDIO_TOOLS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "audio_tools")
+)
+DEFAULT_MAX_BYTES = 4 << 30
+
+_NPY_HEADER_SIZE = 128  # 固定长度的 .npy 头部，逐块写入时可原位回填形状
+
+# (路径, 大小, mtime) -> 内容哈希，避免同一进程里重复读整个文件
+_hash_memo = {}
+
+
+def _npy_header(dtype, shape):
+    desc = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+        np.lib.format.dtype_to_descr(dtype),
+        shape,
+    )
+    header = desc.ljust(_NPY_HEADER_SIZE - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def content_hasher():
+    """file_hash 使用的哈希对象；边读文件边计算时用它，结果再经 remember_hash 登记。"""
+    return hashlib.blake2b(digest_size=16)
+
+
+def remember_hash(path, st, digest):
+    """登记在别处顺带算出的内容哈希（st 为读取时的 stat），之后 file_hash 不必再读一遍文件。"""
+    _hash_memo[(os.path.abspath(path), st.st_size, st.st_mtime_ns)] = digest
+
+
+def file_hash(path, chunk_size=1 << 20):
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = content_hasher()
+        with open(path, "rb") as f:
+            while True:
+                buf = f.read(chunk_size)
+                if not buf:
+                    break
+                h.update(buf)
+        digest = _hash_memo[memo_key] = h.hexdigest()
+    return digest
+
+
+class PCMCache:
+    """已解码、已统一格式的 PCM 磁盘缓存。
+
+    以 (内容哈希, 采样率, 声道数, 其他转换参数) 为键存成 .npy，读取时内存映射；
+    与数组相关的测量值（如响度）存在同名 .json 里，随数组一起淘汰。
+    总大小超过 max_bytes 时按最近使用时间淘汰。
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, "pcm")
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, path, frame_rate, channels, *variant):
+        return "_".join([file_hash(path), str(frame_rate), str(channels), *map(str, variant)])
+
+    def path(self, key, suffix=".npy"):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            data = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # 记录最近使用时间，供 LRU 淘汰
+        return data
+
+    def put(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(data))
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict(keep=key)
+        return np.load(self.path(key), mmap_mode="r")
+
+    def put_blocks(self, key, blocks):
+        """逐块写入 (帧数, 声道) 数组，总长度事先未知也可以；内存占用只与单块大小有关。"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(bytes(_NPY_HEADER_SIZE))
+                frames = 0
+                dtype = channels = None
+                for block in blocks:
+                    if dtype is None:
+                        dtype, channels = block.dtype, block.shape[1]
+                    f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+                    frames += len(block)
+                if dtype is None:
+                    raise ValueError("没有可写入的数据")
+                f.seek(0)
+                f.write(_npy_header(dtype, (frames, channels)))
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict(keep=key)
+        return np.load(self.path(key), mmap_mode="r")
+
+    def get_meta(self, key):
+        try:
+            with open(self.path(key, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def set_meta(self, key, **values):
+        meta = self.get_meta(key)
+        meta.update(values)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self.path(key, ".json"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return meta
+
+    def get_or_create(self, key, create):
+        data = self.get(key)
+        if data is None:
+            data = self.put(key, create())
+        return data
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            total += st.st_size
+            entries.append((st.st_mtime, st.st_size, name[:-4], path))
+        entries.sort()
+        for _, size, key, path in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+            try:
+                os.remove(self.path(key, ".json"))
+            except OSError:
+                pass
+        return total
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((".npy", ".json")):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,371 @@
+import mmap
+import os
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import ffmpeg, probe, wavfile
+
+ExportStats = namedtuple("ExportStats", "saved errors elapsed segments_per_sec")
+
+
+def load_audio(path):
+    from pydub import AudioSegment
+
+    return AudioSegment.from_file(path)
+
+
+def _base_name(audio_path):
+    return os.path.splitext(os.path.basename(audio_path))[0]
+
+
+def _range_name(audio_path, start, end, ext="wav"):
+    return f"{_base_name(audio_path)}_{int(end - start)}s.{ext}"
+
+
+def _part_name(audio_path, i, start_sec, end_sec, ext="wav"):
+    return f"{_base_name(audio_path)}_part{i}_{start_sec}_{end_sec}s.{ext}"
+
+
+def audio_duration(path):
+    """不解码获取时长（秒）：WAV / FLAC / MP3 只读头部，其余格式交给 ffprobe；结果有持久化缓存。"""
+    return probe.probe(path).duration
+
+
+def cut_range(audio_path, start, end, output_dir=None, audio=None):
+    """剪切 [start, end) 秒区间并导出为 wav，返回输出路径。"""
+    if audio is None:
+        audio = load_audio(audio_path)
+    duration_sec = round(len(audio) / 1000, 2)
+    if start < 0 or end <= start or end > duration_sec:
+        raise ValueError(f"请确认开始 < 结束，且在 0~{duration_sec} 秒之间")
+
+    cut = audio[start * 1000 : end * 1000]
+    output_name = _range_name(audio_path, start, end)
+    output_path = os.path.join(output_dir or os.path.dirname(audio_path), output_name)
+    cut.export(output_path, format="wav")
+    return output_path
+
+
+def split_even(audio_path, n, output_dir=None, audio=None, progress=None):
+    """平均分成 n 段导出，返回 (已保存的文件名列表, [(段号, 错误信息), ...])。"""
+    if n < 1:
+        raise ValueError("分段数必须为正整数")
+    if audio is None:
+        audio = load_audio(audio_path)
+
+    total_ms = len(audio)
+    seg_ms = total_ms // n
+    output_dir = output_dir or os.path.dirname(audio_path)
+    saved_files = []
+    errors = []
+    for i in range(n):
+        start_ms = i * seg_ms
+        end_ms = (i + 1) * seg_ms if i < n - 1 else total_ms
+        seg_audio = audio[start_ms:end_ms]
+        output_name = _part_name(audio_path, i + 1, start_ms // 1000, end_ms // 1000)
+        try:
+            seg_audio.export(os.path.join(output_dir, output_name), format="wav")
+            saved_files.append(output_name)
+        except Exception as e:
+            errors.append((i + 1, str(e)))
+        if progress:
+            progress(i + 1, n)
+    return saved_files, errors
+
+
+# --- 流式剪切：只读取需要的时间段，内存占用与文件长度无关 ---
+
+
+def _stream_segment(audio_path, out_path, start, end, info=None):
+    if info is not None:
+        wavfile.copy_wav_range(
+            audio_path,
+            out_path,
+            round(start * info.sample_rate),
+            round(end * info.sample_rate),
+            info,
+        )
+    else:
+        ffmpeg.decode_window(audio_path, out_path, start, end - start)
+
+
+def stream_cut_range(audio_path, start, end, output_dir=None):
+    """与 cut_range 相同，但 WAV 按字节偏移直接复制，其他格式用 ffmpeg -ss/-t 窗口解码。"""
+    info = wavfile.read_wav_info(audio_path) if wavfile.is_wav(audio_path) else None
+    if info is not None:
+        duration_sec = round(wavfile.frame_count(info) / info.sample_rate, 2)
+    else:
+        duration_sec = round(audio_duration(audio_path), 2)
+    if start < 0 or end <= start or end > duration_sec:
+        raise ValueError(f"请确认开始 < 结束，且在 0~{duration_sec} 秒之间")
+
+    output_name = _range_name(audio_path, start, end)
+    output_path = os.path.join(output_dir or os.path.dirname(audio_path), output_name)
+    _stream_segment(audio_path, output_path, start, end, info)
+    return output_path
+
+
+def stream_split_even(audio_path, n, output_dir=None, progress=None):
+    """与 split_even 相同，但每段只读取自身范围；WAV 以帧为单位精确分段。"""
+    if n < 1:
+        raise ValueError("分段数必须为正整数")
+    info = wavfile.read_wav_info(audio_path) if wavfile.is_wav(audio_path) else None
+    if info is not None:
+        rate = info.sample_rate
+        total = wavfile.frame_count(info)
+    else:
+        # 非 WAV 按毫秒分段，与 split_even 一致
+        rate = 1000
+        total = int(audio_duration(audio_path) * 1000)
+
+    seg = total // n
+    output_dir = output_dir or os.path.dirname(audio_path)
+    saved_files = []
+    errors = []
+    for i in range(n):
+        start = i * seg
+        end = (i + 1) * seg if i < n - 1 else total
+        output_name = _part_name(audio_path, i + 1, start // rate, end // rate)
+        try:
+            _stream_segment(
+                audio_path, os.path.join(output_dir, output_name), start / rate, end / rate, info
+            )
+            saved_files.append(output_name)
+        except Exception as e:
+            errors.append((i + 1, str(e)))
+        if progress:
+            progress(i + 1, n)
+    return saved_files, errors
+
+
+# --- 保留源编码剪切：WAV 字节复制，MP3 / FLAC 按帧复制，剪切点以采样为单位 ---
+
+
+def _lossless_cut(stream, output_dir, start, end, accurate, name_of):
+    """剪切到临时文件，再按 cut() 返回的实际范围（按帧边界取整时与请求不同）用 name_of(start, end) 命名。"""
+    tmp = wavfile.temp_path(os.path.join(output_dir, name_of(start, end)))
+    try:
+        start, end = stream.cut(tmp, start, end, accurate=accurate)
+        output_path = os.path.join(output_dir, name_of(start, end))
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return output_path
+
+
+def lossless_cut_range(audio_path, start, end, output_dir=None, samples=False, accurate=True):
+    """剪切 [start, end) 并保留源格式，返回输出路径；按帧边界取整时文件名反映实际剪切的范围。
+
+    samples 为 True 时 start / end 为采样序号，否则为秒（按采样率四舍五入到采样，不经过毫秒取整）。
+    """
+    from . import lossless
+
+    stream = lossless.open_stream(audio_path)
+    rate = stream.sample_rate
+    if samples:
+        start, end = int(start), int(end)
+    else:
+        start, end = round(start * rate), round(end * rate)
+    if start < 0 or end <= start or end > stream.total_samples:
+        raise ValueError(f"请确认开始 < 结束，且在 0~{stream.total_samples} 个采样之间")
+
+    ext = lossless.output_ext(stream)
+    return _lossless_cut(
+        stream, output_dir or os.path.dirname(audio_path), start, end, accurate,
+        lambda a, b: _range_name(audio_path, a / rate, b / rate, ext),
+    )
+
+
+def lossless_split_even(audio_path, n, output_dir=None, accurate=True, progress=None):
+    """与 split_even 相同，但保留源格式且以采样为单位均分，返回 (已保存的文件名列表, 错误列表)。"""
+    from . import lossless
+
+    if n < 1:
+        raise ValueError("分段数必须为正整数")
+    stream = lossless.open_stream(audio_path)
+    rate, total = stream.sample_rate, stream.total_samples
+    ext = lossless.output_ext(stream)
+    seg = total // n
+    output_dir = output_dir or os.path.dirname(audio_path)
+    saved_files = []
+    errors = []
+    for i in range(n):
+        start = i * seg
+        end = (i + 1) * seg if i < n - 1 else total
+        try:
+            output_path = _lossless_cut(
+                stream, output_dir, start, end, accurate,
+                lambda a, b: _part_name(audio_path, i + 1, a // rate, b // rate, ext),
+            )
+            saved_files.append(os.path.basename(output_path))
+        except Exception as e:
+            errors.append((i + 1, str(e)))
+        if progress:
+            progress(i + 1, n)
+    return saved_files, errors
+
+
+# --- 自动分段：在静音或起音处切分 ---
+
+
+def split_auto(
+    audio_path,
+    output_dir=None,
+    mode="silence",
+    min_len=1.0,
+    max_len=None,
+    threshold_db=-40.0,
+    min_silence=0.3,
+    streaming=False,
+    audio=None,
+    progress=None,
+):
+    """按检测到的静音 / 起音自动分段导出，返回 (已保存的文件名列表, [(段号, 错误信息), ...])。
+
+    streaming 为 True 时分析与导出都不解码整个文件（WAV 按字节复制，其余格式用 ffmpeg 窗口解码）。
+    """
+    from . import autosplit
+
+    if streaming:
+        audio = None
+    elif audio is None:
+        audio = load_audio(audio_path)
+    profile = autosplit.energy_profile(audio_path, audio=audio)
+    segments = autosplit.plan_segments(
+        profile, mode, min_len, max_len, threshold_db=threshold_db, min_silence=min_silence
+    )
+
+    info = None
+    if streaming and wavfile.is_wav(audio_path):
+        info = wavfile.read_wav_info(audio_path)
+    output_dir = output_dir or os.path.dirname(audio_path)
+    saved_files = []
+    errors = []
+    for i, (start, end) in enumerate(segments, 1):
+        output_name = _part_name(audio_path, i, int(start), int(end))
+        out_path = os.path.join(output_dir, output_name)
+        try:
+            if streaming:
+                _stream_segment(audio_path, out_path, start, end, info)
+            else:
+                audio[round(start * 1000) : round(end * 1000)].export(out_path, format="wav")
+            saved_files.append(output_name)
+        except Exception as e:
+            errors.append((i, str(e)))
+        if progress:
+            progress(i, len(segments))
+    return saved_files, errors
+
+
+# --- 多进程并行分段导出 ---
+# 源 PCM 只解码一次并落到磁盘（WAV 源直接使用原文件），各工作进程通过 mmap 共享，
+# 任务只传递帧偏移，不会把 AudioSegment 切片 pickle 给子进程。
+
+_worker_src = None
+
+
+def _init_export_worker(pcm_path):
+    global _worker_src
+    with open(pcm_path, "rb") as f:
+        _worker_src = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _export_segment(info, start_frame, end_frame, out_path, out_format):
+    begin = info.data_offset + start_frame * info.block_align
+    data = memoryview(_worker_src)[begin : info.data_offset + end_frame * info.block_align]
+    if out_format == "wav":
+        with open(out_path, "wb") as f:
+            wavfile.write_wav_header(
+                f, info.channels, info.sample_rate, info.sample_width, len(data), info.format_tag
+            )
+            f.write(data)
+    elif info.format_tag == wavfile.WAVE_FORMAT_IEEE_FLOAT:
+        # pydub 只当作整型 PCM 解释原始数据，浮点 WAV 直接交给 ffmpeg 按 f32le / f64le 读入
+        ffmpeg.run_ffmpeg([
+            "-f", f"f{8 * info.sample_width}le", "-ar", str(info.sample_rate), "-ac", str(info.channels),
+            "-i", "-", out_path,
+        ], input=data)
+    else:
+        from pydub import AudioSegment
+
+        AudioSegment(
+            data=bytes(data),
+            sample_width=info.sample_width,
+            frame_rate=info.sample_rate,
+            channels=info.channels,
+        ).export(out_path, format=out_format)
+    data.release()
+    return out_path
+
+
+def _prepare_pcm_source(audio_path, audio, tmp_dir):
+    """返回 (PCM 文件路径, WavInfo)：已解码的 AudioSegment 直接写盘，WAV 源原样使用，其余格式用 ffmpeg 解码一次。"""
+    if audio is not None:
+        pcm_path = os.path.join(tmp_dir, "source.wav")
+        with open(pcm_path, "wb") as f:
+            wavfile.write_wav_header(
+                f, audio.channels, audio.frame_rate, audio.sample_width, len(audio.raw_data)
+            )
+            f.write(audio.raw_data)
+    elif wavfile.is_wav(audio_path):
+        pcm_path = audio_path
+    else:
+        pcm_path = os.path.join(tmp_dir, "source.wav")
+        ffmpeg.run_ffmpeg(["-i", audio_path, "-vn", "-f", "wav", pcm_path])
+    return pcm_path, wavfile.read_wav_info(pcm_path)
+
+
+def parallel_split_even(
+    audio_path, n, output_dir=None, workers=None, out_format="wav", audio=None, progress=None
+):
+    """平均分成 n 段，由进程池并行导出（mp3/flac 等需重新编码的格式收益最明显）。
+
+    progress(已完成, 总数) 抛出异常（例如任务被取消）时，尚未开始的分段会被取消。
+    """
+    if n < 1:
+        raise ValueError("分段数必须为正整数")
+    workers = workers or os.cpu_count() or 1
+    output_dir = output_dir or os.path.dirname(audio_path)
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pcm_path, info = _prepare_pcm_source(audio_path, audio, tmp_dir)
+        rate = info.sample_rate
+        total = wavfile.frame_count(info)
+        seg = total // n
+
+        saved = {}
+        errors = []
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_export_worker, initargs=(pcm_path,)
+        )
+        try:
+            futures = {}
+            for i in range(n):
+                start = i * seg
+                end = (i + 1) * seg if i < n - 1 else total
+                name = _part_name(audio_path, i + 1, start // rate, end // rate, out_format)
+                fut = pool.submit(
+                    _export_segment, info, start, end, os.path.join(output_dir, name), out_format
+                )
+                futures[fut] = (i + 1, name)
+            for done, fut in enumerate(as_completed(futures), 1):
+                i, name = futures[fut]
+                try:
+                    fut.result()
+                    saved[i] = name
+                except Exception as e:
+                    errors.append((i, str(e)))
+                if progress:
+                    progress(done, n)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - t0
+    saved_files = [saved[i] for i in sorted(saved)]
+    errors.sort()
+    return ExportStats(saved_files, errors, elapsed, len(saved_files) / elapsed if elapsed else 0.0)
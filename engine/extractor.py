@@ -0,0 +1,288 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from . import ffmpeg, probe
+from .tasks import TaskRunner
+
+OUTPUT_FORMATS = ("mp3", "wav", "m4a")
+VIDEO_EXT = (".mp4", ".mov", ".avi", ".mkv")
+
+ExtractEvent = namedtuple("ExtractEvent", "index total path output error skipped elapsed")
+ExtractStats = namedtuple("ExtractStats", "success failed skipped elapsed files_per_sec")
+
+AudioStream = namedtuple("AudioStream", "index codec channels sample_rate language")
+
+# 源音轨编码属于这些集合时可直接复制到对应输出容器，无需解码/重新编码
+COPY_CODECS = {
+    "mp3": {"mp3"},
+    "wav": {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"},
+    "m4a": {"aac", "alac"},
+}
+ENCODE_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "m4a": ["-c:a", "aac", "-b:a", "192k"],
+}
+
+
+def audio_output_path(video_file, output_dir=None, out_format="mp3"):
+    base_name = os.path.splitext(os.path.basename(video_file))[0]
+    output_filename = f"{base_name}_audio.{out_format}"
+    return os.path.join(output_dir or os.path.dirname(video_file), output_filename)
+
+
+def probe_audio_streams(video_file):
+    """只读容器头部列出所有音轨；结果存入探测缓存，文件未改动时不再启动 ffprobe。"""
+    return [
+        AudioStream(s.index, s.codec, s.channels, s.sample_rate, s.language)
+        for s in probe.probe(video_file).streams
+        if s.kind == "audio"
+    ]
+
+
+def plan_extraction(video_file, out_format="mp3", copy=True):
+    """返回将采用的方式："copy"（直接复制音轨）、"transcode"（仅解码音轨）或 "moviepy"（无 ffmpeg 时）。"""
+    if not ffmpeg.has_ffmpeg():
+        return "moviepy"
+    if copy and ffmpeg.has_ffprobe():
+        streams = probe_audio_streams(video_file)
+        if not streams:
+            raise ValueError("视频中没有音轨")
+        if streams[0].codec in COPY_CODECS.get(out_format, ()):
+            return "copy"
+    return "transcode"
+
+
+def _extract_moviepy(video_file, out_path):
+    from moviepy.editor import VideoFileClip
+
+    clip = None
+    try:
+        clip = VideoFileClip(video_file)
+        clip.audio.write_audiofile(out_path)
+    finally:
+        if clip:
+            clip.close()
+
+
+def extract_audio(video_file, output_dir=None, out_format="mp3", copy=True):
+    """提取视频的第一条音轨，返回输出路径。
+
+    编码与输出格式兼容时直接 -c:a copy 复制；否则只解码音轨（-vn，不映射视频流）再编码。
+    """
+    if not os.path.isfile(video_file):
+        raise FileNotFoundError(video_file)
+
+    out_path = audio_output_path(video_file, output_dir, out_format)
+    method = plan_extraction(video_file, out_format, copy)
+    if method == "moviepy":
+        _extract_moviepy(video_file, out_path)
+        return out_path
+
+    codec_args = ["-c:a", "copy"] if method == "copy" else ENCODE_ARGS[out_format]
+    ffmpeg.run_ffmpeg(["-i", video_file, "-map", "0:a:0", "-vn", "-sn", "-dn", *codec_args, out_path])
+    return out_path
+
+
+# --- 多音轨 / 多时间段提取 ---
+# 每个时间段作为一个带 -ss/-t 的独立输入（输入端定位，区间外的数据不会被解码），
+# 所有 (时间段, 音轨) 组合在同一个 ffmpeg 进程里一次写出。
+
+
+def parse_ranges(text):
+    """"0-30, 60-90.5" -> [(0.0, 30.0), (60.0, 90.5)]"""
+    ranges = []
+    for part in text.replace("，", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start, end = float(start), float(end)
+        if start < 0 or end <= start:
+            raise ValueError(f"无效的时间段：{part}")
+        ranges.append((start, end))
+    return ranges
+
+
+def parse_tracks(text):
+    """"0, 2" -> [0, 2]（音轨序号从 0 开始，只计音频流）"""
+    return [int(t) for t in text.replace("，", ",").split(",") if t.strip()]
+
+
+def _fmt_sec(sec):
+    return f"{sec:g}"
+
+
+def track_output_path(video_file, output_dir, out_format, track=None, time_range=None):
+    base_name = os.path.splitext(os.path.basename(video_file))[0]
+    name = f"{base_name}_audio"
+    if track is not None:
+        name += f"_a{track}"
+    if time_range is not None:
+        name += f"_{_fmt_sec(time_range[0])}-{_fmt_sec(time_range[1])}s"
+    return os.path.join(output_dir or os.path.dirname(video_file), f"{name}.{out_format}")
+
+
+def extract_tracks(video_file, output_dir=None, out_format="mp3", tracks=None, ranges=None, copy=True):
+    """提取指定音轨的指定时间段，返回输出路径列表。
+
+    tracks 为空时取第一条音轨，ranges 为空时取整个时长；
+    只有选择了多条音轨 / 给出了时间段时，文件名才会带上 _a<音轨> / _<起>-<止>s 后缀。
+    """
+    if not os.path.isfile(video_file):
+        raise FileNotFoundError(video_file)
+    if not ffmpeg.has_ffmpeg():
+        raise RuntimeError("未找到 ffmpeg，无法按音轨或时间段提取")
+
+    streams = probe_audio_streams(video_file) if ffmpeg.has_ffprobe() else None
+    if streams is not None and not streams:
+        raise ValueError("视频中没有音轨")
+    track_list = list(tracks) if tracks else [0]
+    if streams is not None:
+        for k in track_list:
+            if not 0 <= k < len(streams):
+                raise ValueError(f"音轨 {k} 不存在（共 {len(streams)} 条音轨）")
+
+    inputs = []
+    range_list = ranges or [None]
+    for time_range in range_list:
+        if time_range is not None:
+            start, end = time_range
+            inputs += ["-ss", f"{start:.6f}", "-t", f"{end - start:.6f}"]
+        inputs += ["-i", video_file]
+
+    outputs = []
+    out_paths = []
+    for i, time_range in enumerate(range_list):
+        for k in track_list:
+            out_path = track_output_path(
+                video_file,
+                output_dir,
+                out_format,
+                k if tracks else None,
+                time_range,
+            )
+            codec = streams[k].codec if streams else None
+            if copy and codec in COPY_CODECS.get(out_format, ()):
+                codec_args = ["-c:a", "copy"]
+            else:
+                codec_args = ENCODE_ARGS[out_format]
+            outputs += ["-map", f"{i}:a:{k}", "-vn", "-sn", "-dn", *codec_args, out_path]
+            out_paths.append(out_path)
+
+    ffmpeg.run_ffmpeg([*inputs, *outputs])
+    return out_paths
+
+
+# --- 目录批量提取 ---
+# 每个任务都是一个 ffmpeg 子进程，线程池的大小就是同时运行的 ffmpeg 进程上限。
+
+
+def find_videos(folder, recursive=True):
+    found = []
+    if recursive:
+        for root, _, names in os.walk(folder):
+            found += [os.path.join(root, n) for n in names if n.lower().endswith(VIDEO_EXT)]
+    else:
+        found = [
+            os.path.join(folder, n) for n in os.listdir(folder) if n.lower().endswith(VIDEO_EXT)
+        ]
+    return sorted(found)
+
+
+def is_up_to_date(output_path, source):
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+class BatchExtractJob(TaskRunner):
+    metrics_name = "extract"
+
+    def __init__(
+        self,
+        files,
+        output_dir=None,
+        out_format="mp3",
+        copy=True,
+        workers=None,
+        resume=True,
+        root=None,
+    ):
+        super().__init__(len(files))
+        self.files = files
+        self.output_dir = output_dir
+        self.out_format = out_format
+        self.copy = copy
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.resume = resume
+        self.root = root  # 指定输出目录时，保留相对 root 的子目录结构，避免重名覆盖
+        self.stats = None
+
+    def output_dir_for(self, video_file):
+        if not self.output_dir:
+            return None
+        if self.root:
+            rel = os.path.relpath(os.path.dirname(video_file), self.root)
+            if not rel.startswith(".."):
+                return os.path.normpath(os.path.join(self.output_dir, rel))
+        return self.output_dir
+
+    def _extract_one(self, video_file, out_dir):
+        if self.is_cancelling:
+            return None
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        start = time.perf_counter()
+        out = extract_audio(video_file, out_dir, self.out_format, self.copy)
+        return out, time.perf_counter() - start
+
+    def run(self):
+        t0 = time.perf_counter()
+        counts = {"success": 0, "failed": 0, "skipped": 0}
+        total = self.total
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {}
+                for i, f in enumerate(self.files, 1):
+                    out_dir = self.output_dir_for(f)
+                    out_path = audio_output_path(f, out_dir, self.out_format)
+                    if self.resume and is_up_to_date(out_path, f):
+                        counts["skipped"] += 1
+                        self.advance(ExtractEvent(i, total, f, out_path, None, True, 0.0))
+                        continue
+                    futures[pool.submit(self._extract_one, f, out_dir)] = (i, f)
+
+                pending = set(futures)
+                while pending:
+                    finished, pending = wait(pending, timeout=0.2)
+                    for fut in finished:
+                        i, f = futures[fut]
+                        if fut.cancelled():
+                            continue
+                        try:
+                            result = fut.result()
+                        except Exception as e:
+                            counts["failed"] += 1
+                            self.advance(ExtractEvent(i, total, f, None, str(e), False, 0.0))
+                            continue
+                        if result is not None:
+                            counts["success"] += 1
+                            self.advance(ExtractEvent(i, total, f, result[0], None, False, result[1]))
+                    if self.is_cancelling:
+                        for fut in pending:
+                            fut.cancel()
+        finally:
+            elapsed = time.perf_counter() - t0
+            processed = counts["success"] + counts["failed"]
+            self.stats = ExtractStats(
+                counts["success"],
+                counts["failed"],
+                counts["skipped"],
+                elapsed,
+                processed / elapsed if elapsed else 0.0,
+            )
+        return self.stats
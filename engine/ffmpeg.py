@@ -0,0 +1,74 @@
+import functools
+import json
+import shutil
+import subprocess
+
+from . import metrics
+
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_exe():
+    """优先使用 PATH 中的 ffmpeg，其次是 moviepy 依赖的 imageio-ffmpeg 自带的可执行文件。"""
+    path = shutil.which(FFMPEG)
+    if path is None:
+        try:
+            import imageio_ffmpeg
+
+            path = imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            path = None
+    return path
+
+
+def has_ffmpeg():
+    return ffmpeg_exe() is not None
+
+
+def has_ffprobe():
+    return shutil.which(FFPROBE) is not None
+
+
+def run_ffmpeg(args, input=None, stage="ffmpeg"):
+    """运行 ffmpeg，失败时抛出带 stderr 的 RuntimeError。
+
+    input 为写入其标准输入的数据（配合 -i -）；耗时记入 stage 阶段（见 engine.metrics）。
+    """
+    cmd = [ffmpeg_exe() or FFMPEG, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *args]
+    try:
+        with metrics.stage(stage):
+            result = subprocess.run(
+                cmd, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+    except FileNotFoundError:
+        raise RuntimeError("未找到 ffmpeg，请确保它已安装并在 PATH 中")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip())
+    return result.stdout
+
+
+def ffprobe_json(path, *args):
+    cmd = [FFPROBE, "-v", "error", "-of", "json", *args, path]
+    try:
+        with metrics.stage("ffprobe"):
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("未找到 ffprobe，请确保它已安装并在 PATH 中")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip())
+    return json.loads(result.stdout or b"{}")
+
+
+def probe_duration(path):
+    info = ffprobe_json(path, "-show_entries", "format=duration")
+    return float(info["format"]["duration"])
+
+
+def decode_window(path, out_path, start, duration):
+    """只解码 [start, start + duration) 秒并写成 wav；-ss 放在 -i 前，ffmpeg 会先定位再解码。"""
+    run_ffmpeg(
+        ["-ss", f"{start:.6f}", "-t", f"{duration:.6f}", "-i", path, "-vn", "-f", "wav", out_path]
+    )
+    return out_path
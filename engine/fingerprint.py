@@ -0,0 +1,320 @@
+# 声学指纹与重复检测：把开头 FP_SECONDS 秒解码为 11025 Hz 单声道，用 NumPy 整批做 STFT，
+# 每帧取 33 个对数频带的能量，按“相邻频带能量差随时间的变化”的符号生成一个 32 位子指纹
+# （Haitsma & Kalker 的做法），对重新编码、换容器、改采样率、音量变化都不敏感。
+# 指纹存入 SQLite：files 表保存完整指纹，hashes 表是子指纹的倒排索引；查找时用查询指纹的
+# 全部子指纹在倒排索引中投票确定候选文件和对齐偏移，再逐个计算误码率（BER）确认。
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+
+from . import metrics, ncmcrypt, pcmstream
+from .cache import DEFAULT_CACHE_DIR
+
+FP_RATE = 11025
+FP_SECONDS = 90
+FRAME, HOP = 2048, 512  # 约 186 ms 窗长、46 ms 帧移
+BAND_LOW, BAND_HIGH = 300.0, 3000.0
+CHUNK_FRAMES = 512
+NCM_HEAD_BYTES = 16 << 20  # 足够解出 FP_SECONDS 秒的 FLAC
+MATCH_BER = 0.35  # 误码率低于该值视为同一录音
+MIN_VOTES = 3
+MIN_OVERLAP = 200  # 对齐后至少重叠的帧数（约 9 秒；较短的文件取其一半）
+_SILENT = (0, 0xFFFFFFFF)  # 静音段的子指纹到处都有，不参与投票
+_SQL_BATCH = 500
+
+DEFAULT_INDEX = os.path.join(DEFAULT_CACHE_DIR, "fingerprints.sqlite3")
+
+Match = namedtuple("Match", "path ber offset file_id")
+DedupPlan = namedtuple("DedupPlan", "originals duplicates reused")
+
+
+@lru_cache(maxsize=None)
+def _analysis():
+    window = np.hanning(FRAME).astype(np.float32)
+    freqs = np.fft.rfftfreq(FRAME, 1.0 / FP_RATE)
+    edges = np.geomspace(BAND_LOW, BAND_HIGH, 34)
+    bands = np.zeros((len(freqs), 33), np.float32)
+    for b in range(33):
+        bands[(freqs >= edges[b]) & (freqs < edges[b + 1]), b] = 1.0
+    return window, bands
+
+
+def compute(samples):
+    """单声道采样 -> uint32 子指纹序列（每 HOP 个采样一个）。"""
+    x = np.asarray(samples, dtype=np.float32)
+    if len(x) < FRAME + HOP:
+        return np.zeros(0, np.uint32)
+    window, bands = _analysis()
+    frames = np.lib.stride_tricks.sliding_window_view(x, FRAME)[::HOP]
+    energy = np.empty((len(frames), 33), np.float32)
+    for start in range(0, len(frames), CHUNK_FRAMES):
+        spec = np.fft.rfft(frames[start : start + CHUNK_FRAMES] * window, axis=1)
+        power = (spec.real**2 + spec.imag**2).astype(np.float32)
+        energy[start : start + CHUNK_FRAMES] = power @ bands
+    diff = energy[:, :-1] - energy[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder="little").view("<u4").ravel().copy()
+
+
+def _decode(path):
+    if path.lower().endswith(".ncm"):
+        _, data = ncmcrypt.read_audio(path, NCM_HEAD_BYTES)
+        pcm = pcmstream.ffmpeg_pcm("-", FP_RATE, 1, np.int16, ["-t", str(FP_SECONDS)], input=data)
+    else:
+        pcm = pcmstream.ffmpeg_pcm(path, FP_RATE, 1, np.int16, ["-t", str(FP_SECONDS)])
+    return pcm[:, 0]
+
+
+def fingerprint_file(path):
+    """解码开头 FP_SECONDS 秒并计算指纹；支持 ffmpeg 能解码的音视频和 .ncm。"""
+    with metrics.stage("decode"):
+        pcm = _decode(path)
+    with metrics.stage("fingerprint"):
+        return compute(pcm)
+
+
+def bit_error_rate(a, b, offset):
+    """a[i] 与 b[i + offset] 对齐时的误码率；重叠部分太短时返回 1.0。"""
+    start, end = max(0, -offset), min(len(a), len(b) - offset)
+    need = min(MIN_OVERLAP, len(a) // 2, len(b) // 2)
+    if end - start < max(need, 1):
+        return 1.0
+    x = a[start:end] ^ b[start + offset : end + offset]
+    return float(np.unpackbits(x.view(np.uint8)).mean())
+
+
+def signature(*parts):
+    """输出的“配方”（处理参数）摘要：相同配方下重复的输入才能复用彼此的输出。"""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def link_or_copy(src, dst):
+    """dst 指向 src 的内容：优先硬链接，跨设备等无法链接时复制。"""
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return dst
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        id       INTEGER PRIMARY KEY,
+        path     TEXT UNIQUE NOT NULL,
+        size     INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        hashes   BLOB NOT NULL
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS hashes (hash INTEGER NOT NULL, file_id INTEGER NOT NULL, pos INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS hashes_hash ON hashes (hash)",
+    "CREATE INDEX IF NOT EXISTS hashes_file ON hashes (file_id)",
+    """
+    CREATE TABLE IF NOT EXISTS outputs (
+        file_id   INTEGER NOT NULL,
+        signature TEXT NOT NULL,
+        output    TEXT NOT NULL,
+        PRIMARY KEY (file_id, signature)
+    )
+    """,
+)
+
+
+class FingerprintIndex:
+    """持久化的指纹索引；文件以绝对路径 + 大小 + mtime 识别，变化后重新计算。可跨线程使用。"""
+
+    def __init__(self, db_path=DEFAULT_INDEX):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            for stmt in _SCHEMA:
+                self.db.execute(stmt)
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def _row(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.db.execute(
+            "SELECT id, size, mtime_ns, hashes FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or row[1] != st.st_size or row[2] != st.st_mtime_ns:
+            return None
+        return row
+
+    def get(self, path):
+        """已索引且未变化时返回指纹，否则返回 None。"""
+        with self._lock:
+            row = self._row(path)
+        return None if row is None else np.frombuffer(row[3], dtype="<u4")
+
+    def file_id(self, path):
+        with self._lock:
+            row = self._row(path)
+        return None if row is None else row[0]
+
+    def put(self, path, hashes):
+        """写入（或替换）path 的指纹，返回 file_id。"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        hashes = np.asarray(hashes, dtype="<u4")
+        with self._lock, self.db:
+            old = self.db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            if old:
+                self.db.execute("DELETE FROM hashes WHERE file_id = ?", old)
+                self.db.execute("DELETE FROM outputs WHERE file_id = ?", old)
+                self.db.execute("DELETE FROM files WHERE id = ?", old)
+            cur = self.db.execute(
+                "INSERT INTO files (path, size, mtime_ns, hashes) VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, hashes.tobytes()),
+            )
+            file_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO hashes (hash, file_id, pos) VALUES (?, ?, ?)",
+                ((h, file_id, i) for i, h in enumerate(hashes.tolist()) if h not in _SILENT),
+            )
+        return file_id
+
+    def match(self, hashes, exclude=(), max_ber=MATCH_BER):
+        """查找与 hashes 为同一录音的已索引文件，按误码率升序返回 Match 列表。"""
+        positions = {}
+        for i, h in enumerate(hashes.tolist()):
+            if h not in _SILENT:
+                positions.setdefault(h, []).append(i)
+        votes = Counter()
+        keys = list(positions)
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start : start + _SQL_BATCH]
+                rows = self.db.execute(
+                    f"SELECT hash, file_id, pos FROM hashes WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for h, file_id, pos in rows:
+                    if file_id in exclude:
+                        continue
+                    for qpos in positions[h]:
+                        votes[file_id, pos - qpos] += 1
+
+        # 每个文件只验证得票最多的偏移
+        best = {}
+        for (file_id, offset), n in votes.items():
+            if n >= MIN_VOTES and n > best.get(file_id, (0, 0))[0]:
+                best[file_id] = (n, offset)
+        matches = []
+        with self._lock:
+            for file_id, (_, offset) in best.items():
+                path, blob = self.db.execute(
+                    "SELECT path, hashes FROM files WHERE id = ?", (file_id,)
+                ).fetchone()
+                ber = bit_error_rate(hashes, np.frombuffer(blob, dtype="<u4"), offset)
+                if ber <= max_ber:
+                    matches.append(Match(path, ber, offset, file_id))
+        return sorted(matches, key=lambda m: m.ber)
+
+    def record_output(self, path, sig, output):
+        """记录 path 在配方 sig 下产生的输出，供之后遇到重复输入时复用。"""
+        file_id = self.file_id(path)
+        if file_id is None:
+            return
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO outputs (file_id, signature, output) VALUES (?, ?, ?)",
+                (file_id, sig, os.path.abspath(output)),
+            )
+
+    def output_for(self, file_id, sig):
+        """file_id 在配方 sig 下的输出；未记录或文件已不存在时返回 None。"""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT output FROM outputs WHERE file_id = ? AND signature = ?", (file_id, sig)
+            ).fetchone()
+        return row[0] if row and os.path.isfile(row[0]) else None
+
+
+def _fingerprint_worker(path):
+    return metrics.run_collected(fingerprint_file, path)
+
+
+def fingerprint_files(paths, index, workers=None, progress=None):
+    """为 paths 中尚未索引（或已变化）的文件并行计算指纹并写入 index，返回 {路径: 指纹}。
+
+    无法解码的文件不在结果中（按非重复处理）。progress(已完成, 总数) 抛出异常时停止。
+    """
+    result = {}
+    todo = []
+    for p in paths:
+        fp = index.get(p)
+        if fp is None:
+            todo.append(p)
+        else:
+            result[p] = fp
+    if todo:
+        collector = metrics.active()
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            futures = {pool.submit(_fingerprint_worker, p): p for p in todo}
+            try:
+                for done, fut in enumerate(as_completed(futures), 1):
+                    path = futures[fut]
+                    try:
+                        fp, snap = fut.result()
+                    except Exception:
+                        fp = None
+                    else:
+                        if collector is not None:
+                            collector.merge(snap)
+                    if fp is not None and len(fp):
+                        index.put(path, fp)
+                        result[path] = fp
+                    if progress:
+                        progress(done, len(todo))
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+    return result
+
+
+def plan_dedup(paths, index, sig, workers=None, max_ber=MATCH_BER, progress=None):
+    """把 paths 分为需要处理的原件、与本批次更早文件重复的副本、可直接复用以前输出的文件。
+
+    返回 DedupPlan：originals 为列表（保持输入顺序），duplicates 为 {副本: 本批次中的原件}，
+    reused 为 {文件: (以前处理过的同一录音, 它在同一配方下的输出)}。
+    """
+    fps = fingerprint_files(paths, index, workers, progress)
+    originals, duplicates, reused = [], {}, {}
+    batch_ids = {}  # 本批次原件的 file_id -> 路径
+    for p in paths:
+        fp = fps.get(p)
+        if fp is None:
+            originals.append(p)
+            continue
+        own = index.file_id(p)
+        for m in index.match(fp, exclude={own}, max_ber=max_ber):
+            if m.file_id in batch_ids:
+                duplicates[p] = batch_ids[m.file_id]
+                break
+            output = index.output_for(m.file_id, sig)
+            if output:
+                reused[p] = (m.path, output)
+                break
+        else:
+            originals.append(p)
+            batch_ids[own] = p
+    return DedupPlan(originals, duplicates, reused)
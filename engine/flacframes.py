@@ -0,0 +1,357 @@
+# FLAC 帧表：解析元数据块和各音频帧头，不解码。剪切时按帧复制压缩数据，
+# 只重写帧头中的帧号 / 采样号（CRC-8 重新计算，CRC-16 通过 CRC 组合推算，不必重新遍历整帧）。
+# 指定 accurate 时，仅把首尾两个不完整的帧交给 ffmpeg 重新编码，其余帧仍原样复制。
+import io
+import mmap
+import os
+import struct
+import tempfile
+
+from collections import namedtuple
+
+import numpy as np
+
+from . import ffmpeg
+
+MAGIC = b"fLaC"
+STREAMINFO, PADDING, SEEKTABLE, CUESHEET = 0, 1, 3, 5
+# 剪切后失效的元数据块
+_DROP_BLOCKS = (PADDING, SEEKTABLE, CUESHEET)
+_BLOCK_SIZES = {1: 192, 2: 576, 3: 1152, 4: 2304, 5: 4608}
+_BLOCK_SIZES.update({n: 256 << (n - 8) for n in range(8, 16)})
+
+StreamInfo = namedtuple("StreamInfo", "sample_rate channels bits_per_sample total_samples")
+
+
+def _crc_table(poly, width):
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    table = []
+    for byte in range(256):
+        crc = byte << (width - 8)
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & mask if crc & top else (crc << 1) & mask
+        table.append(crc)
+    return table
+
+
+_CRC8 = _crc_table(0x07, 8)
+_CRC16 = _crc_table(0x8005, 16)
+
+
+def crc8(data):
+    crc = 0
+    for b in data:
+        crc = _CRC8[crc ^ b]
+    return crc
+
+
+def crc16(data, crc=0):
+    for b in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC16[(crc >> 8) ^ b]
+    return crc
+
+
+# --- CRC-16 “追加 n 个零字节”的线性变换，用于 CRC 组合 ---
+
+
+def _apply(cols, crc):
+    out = 0
+    i = 0
+    while crc:
+        if crc & 1:
+            out ^= cols[i]
+        crc >>= 1
+        i += 1
+    return out
+
+
+def _zero_byte_matrix():
+    return [crc16(b"\0", 1 << i) for i in range(16)]
+
+
+_ZERO_POWERS = [_zero_byte_matrix()]  # _ZERO_POWERS[k] = 追加 2**k 个零字节
+
+
+def _crc16_shift(crc, n):
+    """等价于 crc16(b"\\0" * n, crc)，耗时 O(log n)。"""
+    k = 0
+    while n:
+        while k >= len(_ZERO_POWERS):
+            m = _ZERO_POWERS[-1]
+            _ZERO_POWERS.append([_apply(m, c) for c in m])
+        if n & 1:
+            crc = _apply(_ZERO_POWERS[k], crc)
+        n >>= 1
+        k += 1
+    return crc
+
+
+def parse_streaminfo(si):
+    """解析 34 字节的 STREAMINFO 块；total_samples 为 0 表示编码器未写入总长度。"""
+    packed = int.from_bytes(si[10:18], "big")
+    return StreamInfo(
+        packed >> 44, ((packed >> 41) & 7) + 1, ((packed >> 36) & 31) + 1, packed & ((1 << 36) - 1)
+    )
+
+
+def read_streaminfo(path):
+    """只读取文件开头 42 字节（标识 + 块头 + STREAMINFO），不扫描帧。"""
+    with open(path, "rb") as f:
+        head = f.read(42)
+    if head[:4] != MAGIC or len(head) < 42:
+        raise ValueError(f"不是有效的 FLAC 文件：{path}")
+    if head[4] & 0x7F != STREAMINFO:
+        raise ValueError(f"FLAC 文件缺少 STREAMINFO：{path}")
+    return parse_streaminfo(head[8:42])
+
+
+def _read_utf8_number(buf, pos):
+    first = buf[pos]
+    if first < 0x80:
+        return first, 1
+    n = 0
+    mask = 0x80
+    while first & mask:
+        n += 1
+        mask >>= 1
+    if n < 2 or n > 7:
+        return None, 0
+    value = first & (mask - 1)
+    for i in range(1, n):
+        b = buf[pos + i]
+        if b & 0xC0 != 0x80:
+            return None, 0
+        value = (value << 6) | (b & 0x3F)
+    return value, n
+
+
+def _utf8_number(value):
+    if value < 0x80:
+        return bytes([value])
+    for n in range(2, 8):
+        if value < 1 << (5 * n + 1):
+            break
+    out = [0x80 | ((value >> (6 * i)) & 0x3F) for i in range(n - 1)]
+    first = ((0xFF00 >> n) & 0xFF) | (value >> (6 * (n - 1)))
+    return bytes([first] + out[::-1])
+
+
+class FlacStream:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_metadata(mm)
+            self._scan(mm)
+        finally:
+            mm.close()
+
+    def _read_metadata(self, mm):
+        if mm[:4] != MAGIC:
+            raise ValueError(f"不是有效的 FLAC 文件：{self.path}")
+        pos = 4
+        self.blocks = []
+        while True:
+            head = mm[pos]
+            btype = head & 0x7F
+            size = int.from_bytes(mm[pos + 1 : pos + 4], "big")
+            body = bytes(mm[pos + 4 : pos + 4 + size])
+            self.blocks.append((btype, body))
+            pos += 4 + size
+            if head & 0x80:
+                break
+        if not self.blocks or self.blocks[0][0] != STREAMINFO:
+            raise ValueError(f"FLAC 文件缺少 STREAMINFO：{self.path}")
+        si = self.blocks[0][1]
+        self.min_blocksize, self.max_blocksize = struct.unpack(">HH", si[:4])
+        self.min_framesize = int.from_bytes(si[4:7], "big")
+        (
+            self.sample_rate, self.channels, self.bits_per_sample, self.streaminfo_samples
+        ) = parse_streaminfo(si)
+        self.audio_offset = pos
+
+    def _parse_header(self, mm, pos):
+        """返回 (块长, 编码的帧号 / 采样号, 帧头长度含 CRC-8)，非法时返回 None。"""
+        if pos + 6 > len(mm) or mm[pos] != 0xFF or mm[pos + 1] & 0xFE != 0xF8:
+            return None
+        bs_code, sr_code = mm[pos + 2] >> 4, mm[pos + 2] & 15
+        if bs_code == 0 or sr_code == 15 or mm[pos + 3] & 1:
+            return None
+        number, n = _read_utf8_number(mm, pos + 4)
+        if number is None:
+            return None
+        p = pos + 4 + n
+        if bs_code == 6:
+            blocksize = mm[p] + 1
+            p += 1
+        elif bs_code == 7:
+            blocksize = int.from_bytes(mm[p : p + 2], "big") + 1
+            p += 2
+        else:
+            blocksize = _BLOCK_SIZES[bs_code]
+        p += {12: 1, 13: 2, 14: 2}.get(sr_code, 0)
+        if p >= len(mm) or crc8(mm[pos:p]) != mm[p]:
+            return None
+        return blocksize, number, p + 1 - pos
+
+    def _scan(self, mm):
+        end = len(mm)
+        pos = self.audio_offset
+        variable = bool(mm[pos + 1] & 1) if pos + 1 < end else False
+        sync = b"\xff\xf9" if variable else b"\xff\xf8"
+        min_gap = max(self.min_framesize, 6)
+        offsets, starts = [], []
+        sample = 0
+        while pos < end:
+            header = self._parse_header(mm, pos)
+            expected = sample if variable else len(offsets)
+            if header is None or header[1] != expected:
+                pos = mm.find(sync, pos + 1)
+                if pos < 0:
+                    break
+                continue
+            offsets.append(pos)
+            starts.append(sample)
+            sample += header[0]
+            # 下一帧的同步码出现在至少 min_framesize 字节之后；帧号不连续的候选是数据中的假同步
+            nxt = mm.find(sync, pos + min_gap)
+            pos = end if nxt < 0 else nxt
+        if not offsets:
+            raise ValueError(f"未找到 FLAC 帧：{self.path}")
+        self.variable = variable
+        self.offsets = np.asarray(offsets + [end], dtype=np.int64)
+        self.starts = np.asarray(starts + [sample], dtype=np.int64)
+        self.total_samples = sample
+
+    @property
+    def frame_count(self):
+        return len(self.offsets) - 1
+
+    # --- 写出 ---
+
+    def _streaminfo(self, total, min_bs, max_bs):
+        si = bytearray(self.blocks[0][1])
+        si[0:4] = struct.pack(">HH", min_bs, max_bs)
+        si[4:10] = bytes(6)  # 最小 / 最大帧长未知
+        packed = int.from_bytes(si[10:18], "big") & ~((1 << 36) - 1) | total
+        si[10:18] = packed.to_bytes(8, "big")
+        si[18:34] = bytes(16)  # MD5 未知
+        return bytes(si)
+
+    def _write_metadata(self, dst, total, min_bs, max_bs):
+        blocks = [(STREAMINFO, self._streaminfo(total, min_bs, max_bs))]
+        blocks += [b for b in self.blocks[1:] if b[0] not in _DROP_BLOCKS]
+        dst.write(MAGIC)
+        for i, (btype, body) in enumerate(blocks):
+            last = 0x80 if i == len(blocks) - 1 else 0
+            dst.write(bytes([last | btype]) + len(body).to_bytes(3, "big") + body)
+
+    @staticmethod
+    def _renumber(frame, old_header_len, number, variable):
+        """改写帧头里的编号与阻塞策略位，返回新的完整帧；frame 含结尾 CRC-16。"""
+        old_head = frame[:old_header_len]
+        _, n = _read_utf8_number(old_head, 4)
+        head = bytearray(old_head[:4])
+        head[1] = 0xF9 if variable else 0xF8
+        head += _utf8_number(number) + old_head[4 + n : -1]
+        head.append(crc8(head))
+
+        body_len = len(frame) - old_header_len - 2
+        stored = int.from_bytes(frame[-2:], "big")
+        # crc(H + B) = shift(crc(H), len(B)) ^ crc(B)，由旧帧头推出 crc(B)，再与新帧头组合
+        body_crc = stored ^ _crc16_shift(crc16(old_head), body_len)
+        new_crc = _crc16_shift(crc16(head), body_len) ^ body_crc
+        return bytes(head) + frame[old_header_len:-2] + new_crc.to_bytes(2, "big")
+
+    def _frames(self, src, f0, f1):
+        for i in range(f0, f1):
+            src.seek(int(self.offsets[i]))
+            frame = src.read(int(self.offsets[i + 1] - self.offsets[i]))
+            yield frame, self._parse_header(frame, 0)
+
+    def cut(self, out_path, start, end, accurate=False):
+        """复制覆盖 [start, end) 采样的帧，返回实际覆盖的 (start, end)。
+
+        accurate 为 False 时按帧边界取整；为 True 时首尾不完整的帧由 ffmpeg 重新编码，结果精确到采样，
+        此时若需要重新编码而 ffmpeg 不可用则抛出 RuntimeError，不会悄悄退回按帧边界取整。
+        """
+        start = max(0, start)
+        end = min(end, self.total_samples)
+        if end <= start:
+            raise ValueError("剪切范围为空")
+        f0 = int(np.searchsorted(self.starts, start, "right")) - 1
+        f1 = int(np.searchsorted(self.starts, end, "left"))
+
+        aligned = self.starts[f0] == start and self.starts[f1] == end
+        if accurate and not aligned:
+            if not ffmpeg.has_ffmpeg():
+                raise RuntimeError("FLAC 精确剪切需要 ffmpeg 重新编码首尾帧；未安装 ffmpeg 时请按帧边界剪切")
+            # 完整保留的帧范围 [c0, c1)，首尾的零头重新编码
+            c0 = f0 if self.starts[f0] == start else f0 + 1
+            c1 = f1 if self.starts[f1] == end else f1 - 1
+            return self._cut_accurate(out_path, start, end, c0, c1)
+        start, end = int(self.starts[f0]), int(self.starts[f1])
+
+        sizes = np.diff(self.starts[f0 : f1 + 1])
+        with open(self.path, "rb") as src, open(out_path, "wb") as dst:
+            self._write_metadata(dst, end - start, int(sizes[:-1].min(initial=sizes[-1])), int(sizes.max()))
+            for i, (frame, header) in enumerate(self._frames(src, f0, f1)):
+                number = int(self.starts[f0 + i] - self.starts[f0]) if self.variable else i
+                dst.write(self._renumber(frame, header[2], number, self.variable))
+        return start, end
+
+    def _piece(self, f0, f1):
+        """帧 [f0, f1) 组成的独立 FLAC 数据（只含 STREAMINFO，采样号从 0 开始）。"""
+        base = int(self.starts[f0])
+        sizes = np.diff(self.starts[f0 : f1 + 1])
+        si = self._streaminfo(int(self.starts[f1]) - base, int(sizes[:-1].min(initial=sizes[-1])), int(sizes.max()))
+        buf = io.BytesIO()
+        buf.write(MAGIC + bytes([0x80 | STREAMINFO]) + len(si).to_bytes(3, "big") + si)
+        with open(self.path, "rb") as src:
+            for i, (frame, header) in enumerate(self._frames(src, f0, f1)):
+                buf.write(self._renumber(frame, header[2], int(self.starts[f0 + i]) - base, True))
+        return buf.getvalue()
+
+    def _encode_piece(self, start, end, tmp_dir, name):
+        """把 [start, end) 采样重新编码为 FLAC，返回其中的帧列表 [(帧数据, 帧头), ...]。
+
+        只把覆盖该范围的原始帧经管道交给 ffmpeg 解码，耗时与剪切点在文件中的位置无关。
+        """
+        if end <= start:
+            return []
+        f0 = int(np.searchsorted(self.starts, start, "right")) - 1
+        f1 = int(np.searchsorted(self.starts, end, "left"))
+        base = int(self.starts[f0])
+        out = os.path.join(tmp_dir, name)
+        sample_fmt = "s16" if self.bits_per_sample <= 16 else "s32"
+        ffmpeg.run_ffmpeg([
+            "-f", "flac", "-i", "-",
+            "-af", f"atrim=start_sample={start - base}:end_sample={end - base}",
+            "-c:a", "flac", "-sample_fmt", sample_fmt,
+            "-bits_per_raw_sample", str(self.bits_per_sample), out,
+        ], input=self._piece(f0, f1))
+        piece = FlacStream(out)
+        with open(out, "rb") as f:
+            return list(piece._frames(f, 0, piece.frame_count))
+
+    def _cut_accurate(self, out_path, start, end, c0, c1):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if c0 < c1:
+                head = self._encode_piece(start, int(self.starts[c0]), tmp_dir, "head.flac")
+                tail = self._encode_piece(int(self.starts[c1]), end, tmp_dir, "tail.flac")
+            else:
+                # 范围落在一两个帧之内，没有可原样复制的整帧：整段重新编码
+                head, tail, c1 = self._encode_piece(start, end, tmp_dir, "piece.flac"), [], c0
+            sizes = [h[0] for _, h in head] + np.diff(self.starts[c0 : c1 + 1]).tolist()
+            sizes += [h[0] for _, h in tail]
+            with open(self.path, "rb") as src, open(out_path, "wb") as dst:
+                # 首尾重新编码的帧块长不同，整体改为可变块长
+                self._write_metadata(dst, end - start, max(16, min(sizes[:-1] or sizes)), max(sizes))
+                sample = 0
+                for part in (head, self._frames(src, c0, c1), tail):
+                    for frame, header in part:
+                        dst.write(self._renumber(frame, header[2], sample, True))
+                        sample += header[0]
+        return start, end
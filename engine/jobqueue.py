@@ -0,0 +1,154 @@
+# 持久化任务队列：监视文件夹守护进程（engine.watch）与其 HTTP API 共用的 SQLite 表。
+# 任务以 (类型, 源文件, 大小, mtime) 识别，同一版本的文件只入队一次；
+# 进程退出时仍在运行的任务，下次打开队列时重新排队。
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from .cache import DEFAULT_CACHE_DIR
+
+DEFAULT_QUEUE = os.path.join(DEFAULT_CACHE_DIR, "jobs.sqlite3")
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+Job = namedtuple("Job", "id kind source params status output error created started finished")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id       INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind     TEXT NOT NULL,
+        source   TEXT NOT NULL,
+        params   TEXT NOT NULL,
+        size     INTEGER,
+        mtime_ns INTEGER,
+        status   TEXT NOT NULL,
+        output   TEXT,
+        error    TEXT,
+        created  REAL NOT NULL,
+        started  REAL,
+        finished REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)",
+    "CREATE INDEX IF NOT EXISTS jobs_source ON jobs (source, kind)",
+)
+
+_COLUMNS = "id, kind, source, params, status, output, error, created, started, finished"
+
+
+def _job(row):
+    return Job(row[0], row[1], row[2], json.loads(row[3]), *row[4:])
+
+
+class JobQueue:
+    """线程安全的 SQLite 任务队列：submit() 入队，claim() 按先进先出取出并标记为 running。"""
+
+    def __init__(self, db_path=DEFAULT_QUEUE):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.db:
+            for stmt in _SCHEMA:
+                self.db.execute(stmt)
+            # 上次退出时没有跑完的任务
+            self.db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+
+    def close(self):
+        self.db.close()
+
+    def submit(self, kind, source, params=None):
+        """入队并返回 (任务 id, 是否新建)；同一版本的文件已入队或已处理过时返回原任务。"""
+        source = os.path.abspath(source)
+        st = os.stat(source)
+        with self._lock, self.db:
+            row = self.db.execute(
+                "SELECT id FROM jobs WHERE source = ? AND kind = ? AND size = ? AND mtime_ns = ?"
+                " AND status != 'cancelled' ORDER BY id DESC LIMIT 1",
+                (source, kind, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+            if row:
+                return row[0], False
+            cur = self.db.execute(
+                "INSERT INTO jobs (kind, source, params, size, mtime_ns, status, created)"
+                " VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (kind, source, json.dumps(params or {}, ensure_ascii=False), st.st_size,
+                 st.st_mtime_ns, time.time()),
+            )
+            return cur.lastrowid, True
+
+    def claim(self):
+        """取出最早排队的任务并标记为 running；队列为空时返回 None。"""
+        with self._lock, self.db:
+            row = self.db.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self.db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (now, row[0]))
+        return _job(row)._replace(status="running", started=now)
+
+    def finish(self, job_id, output=None, error=None):
+        with self._lock, self.db:
+            self.db.execute(
+                "UPDATE jobs SET status = ?, output = ?, error = ?, finished = ? WHERE id = ?",
+                ("failed" if error else "done", output, error, time.time(), job_id),
+            )
+
+    def cancel(self, job_id):
+        """取消尚未开始的任务；返回是否取消成功。"""
+        with self._lock, self.db:
+            cur = self.db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cur.rowcount > 0
+
+    def retry(self, job_id):
+        """把失败或已取消的任务重新排队；返回是否成功。"""
+        with self._lock, self.db:
+            cur = self.db.execute(
+                "UPDATE jobs SET status = 'queued', output = NULL, error = NULL, started = NULL,"
+                " finished = NULL WHERE id = ? AND status IN ('failed', 'cancelled')",
+                (job_id,),
+            )
+        return cur.rowcount > 0
+
+    def get(self, job_id):
+        with self._lock:
+            row = self.db.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else _job(row)
+
+    def list(self, status=None, limit=100):
+        """按 id 倒序列出任务。"""
+        sql = f"SELECT {_COLUMNS} FROM jobs"
+        args = []
+        if status:
+            sql += " WHERE status = ?"
+            args.append(status)
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [_job(row) for row in self.db.execute(sql, args)]
+
+    def stats(self, window=300):
+        """各状态的任务数，以及最近 window 秒内完成的任务数、平均耗时和每分钟吞吐。"""
+        since = time.time() - window
+        with self._lock:
+            counts = dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+            done, avg = self.db.execute(
+                "SELECT COUNT(*), AVG(finished - started) FROM jobs"
+                " WHERE status = 'done' AND finished >= ?",
+                (since,),
+            ).fetchone()
+        return {
+            "counts": {s: counts.get(s, 0) for s in STATUSES},
+            "window_s": window,
+            "done_in_window": done,
+            "avg_job_s": round(avg, 3) if avg is not None else None,
+            "jobs_per_min": round(done * 60.0 / window, 2),
+        }
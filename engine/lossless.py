@@ -0,0 +1,57 @@
+# 保留源编码的剪切：WAV 按字节复制，MP3 / FLAC 按帧复制压缩数据，不经过解码与重新编码。
+# 剪切点以采样为单位；帧表解析一次后缓存，从同一母带剪切大量片段时只有文件复制的开销。
+import functools
+import os
+
+from . import wavfile
+from .flacframes import FlacStream
+from .mp3frames import Mp3Stream
+
+SUPPORTED_EXT = (".wav", ".mp3", ".flac")
+
+
+class WavStream:
+    def __init__(self, path):
+        self.path = path
+        self.info = wavfile.read_wav_info(path)
+        self.sample_rate = self.info.sample_rate
+        self.total_samples = wavfile.frame_count(self.info)
+
+    def cut(self, out_path, start, end, accurate=True):
+        start, end = max(0, start), min(end, self.total_samples)
+        if end <= start:
+            raise ValueError("剪切范围为空")
+        wavfile.copy_wav_range(self.path, out_path, start, end, self.info)
+        return start, end
+
+
+@functools.lru_cache(maxsize=32)
+def _open(path, size, mtime_ns):
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return WavStream(path)
+    if head[:4] == b"fLaC":
+        return FlacStream(path)
+    if os.path.splitext(path)[1].lower() == ".mp3" or head[:3] == b"ID3":
+        return Mp3Stream(path)
+    raise ValueError(f"不支持无损剪切的格式（仅支持 {' / '.join(SUPPORTED_EXT)}）：{path}")
+
+
+def open_stream(path):
+    """打开 WAV / MP3 / FLAC 并建立帧表；文件未改动时复用缓存的结果。"""
+    st = os.stat(path)
+    return _open(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def output_ext(stream):
+    return {WavStream: "wav", Mp3Stream: "mp3", FlacStream: "flac"}[type(stream)]
+
+
+def cut_samples(path, out_path, start, end, accurate=True):
+    """剪切 [start, end) 采样，返回实际覆盖的 (start, end)。
+
+    WAV 与 MP3（Layer III，写入 LAME 延迟 / 填充）精确到采样；FLAC 在 accurate 为 True 时只用
+    ffmpeg 重新编码首尾两个不完整的帧（ffmpeg 不可用时抛出 RuntimeError），否则按帧边界取整。
+    """
+    return open_stream(path).cut(out_path, start, end, accurate=accurate)
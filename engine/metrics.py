@@ -0,0 +1,338 @@
+# 分阶段计时与计数：引擎函数用 stage("decode") 包住各处理阶段、用 count() 累加字节 / 采样数，
+# 数据记入当前的 Metrics 收集器（由 TaskRunner 或 CLI 通过 collecting() 设置）；
+# 没有收集器时两者都是空操作，只多一次全局变量读取。
+# 进程池里的工作进程各自收集，结果用 snapshot() / merge() 带回主进程。
+import contextlib
+import io
+import json
+import os
+import re
+import threading
+import time
+
+# 生效中的 (Metrics, Profiler 或 None)，最后一个为当前；各自退出时只移除自己，
+# 两个任务的生命周期交错时也不会留下已结束任务的收集器
+_stack = []
+_active = None
+
+
+class Metrics:
+    """线程安全的累加器：timers 为 {阶段: [次数, 墙钟秒, CPU 秒]}，counters / gauges 为 {名称: 数值}。
+
+    CPU 时间取调用线程的 thread_time()，不含 ffmpeg 等子进程。
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, name, wall, cpu, calls=1):
+        with self._lock:
+            t = self.timers.setdefault(name, [0, 0.0, 0.0])
+            t[0] += calls
+            t[1] += wall
+            t[2] += cpu
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        """可 pickle / JSON 序列化的副本。"""
+        with self._lock:
+            return {
+                "timers": {k: list(v) for k, v in self.timers.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def merge(self, snap):
+        """累加另一个收集器（通常来自工作进程）的 snapshot()。"""
+        for name, (calls, wall, cpu) in snap["timers"].items():
+            self.add_time(name, wall, cpu, calls)
+        for name, value in snap["counters"].items():
+            self.count(name, value)
+        for name, value in snap["gauges"].items():
+            self.set(name, value)
+
+    # --- 输出 ---
+
+    def records(self, **labels):
+        """JSON lines 记录：每个阶段、计数器、状态值各一条，附带 labels。"""
+        ts = round(time.time(), 3)
+        snap = self.snapshot()
+        out = []
+        for name, (calls, wall, cpu) in snap["timers"].items():
+            out.append(
+                {"ts": ts, **labels, "type": "stage", "name": name, "calls": calls,
+                 "wall_s": round(wall, 6), "cpu_s": round(cpu, 6)}
+            )
+        for kind in ("counters", "gauges"):
+            for name, value in snap[kind].items():
+                out.append({"ts": ts, **labels, "type": kind[:-1], "name": name, "value": value})
+        return out
+
+    def prometheus(self, **labels):
+        """Prometheus 文本格式（可供 node_exporter 的 textfile collector 读取）。"""
+        snap = self.snapshot()
+        lines = []
+
+        def family(metric, kind, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP audio_tools_{metric} {help_text}")
+            lines.append(f"# TYPE audio_tools_{metric} {kind}")
+            for extra, value in samples:
+                lines.append(f"audio_tools_{metric}{_labels({**labels, **extra})} {value:.9g}")
+
+        timers = sorted(snap["timers"].items())
+        family("stage_seconds_total", "counter", "Wall time spent per stage.",
+               [({"stage": k}, v[1]) for k, v in timers])
+        family("stage_cpu_seconds_total", "counter", "CPU time spent per stage.",
+               [({"stage": k}, v[2]) for k, v in timers])
+        family("stage_calls_total", "counter", "Number of times each stage ran.",
+               [({"stage": k}, v[0]) for k, v in timers])
+        for name, value in sorted(snap["counters"].items()):
+            family(f"{_metric_name(name)}_total", "counter", name, [({}, value)])
+        for name, value in sorted(snap["gauges"].items()):
+            family(_metric_name(name), "gauge", name, [({}, value)])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, **labels):
+        """.prom 结尾时整体覆盖写入 Prometheus 文本格式，否则以 JSON lines 追加。"""
+        if path.endswith(".prom"):
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus(**labels))
+            os.replace(tmp, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                for rec in self.records(**labels):
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        return path
+
+    def summary_lines(self):
+        """按墙钟时间降序的阶段表，附计数器；多进程时各阶段时间是所有进程之和。"""
+        snap = self.snapshot()
+        timers = sorted(snap["timers"].items(), key=lambda kv: -kv[1][1])
+        total = sum(v[1] for _, v in timers) or 1.0
+        lines = [f"{'阶段':<12}{'次数':>8}{'墙钟(秒)':>12}{'CPU(秒)':>12}{'占比':>8}"]
+        for name, (calls, wall, cpu) in timers:
+            lines.append(f"{name:<14}{calls:>8}{wall:>12.3f}{cpu:>12.3f}{wall / total:>9.1%}")
+        for name, value in sorted({**snap["counters"], **snap["gauges"]}.items()):
+            lines.append(f"{name}: {_human(name, value)}")
+        return lines
+
+    def brief(self, top=3):
+        """耗时最多的几个阶段，如“decode 52% · mix 30% · export 18%”；尚无数据时为空字符串。"""
+        timers = sorted(self.snapshot()["timers"].items(), key=lambda kv: -kv[1][1])
+        total = sum(v[1] for _, v in timers)
+        if not total:
+            return ""
+        return " · ".join(f"{name} {v[1] / total:.0%}" for name, v in timers[:top])
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+
+    def escape(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{_metric_name(k)}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _human(name, value):
+    if name.endswith("bytes") and value >= 2**20:
+        return f"{value / 2**20:.1f} MB"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+# --- 记录接口 ---
+
+
+def active():
+    """当前的收集器；未启用时为 None。"""
+    return _active[0] if _active else None
+
+
+def active_profiler():
+    return _active[1] if _active else None
+
+
+@contextlib.contextmanager
+def collecting(metrics, profiler=None):
+    """在 with 块内（对所有线程）把数据记入 metrics。"""
+    global _active
+    entry = (metrics, profiler)
+    _stack.append(entry)
+    _active = entry
+    try:
+        yield metrics
+    finally:
+        _stack.remove(entry)
+        _active = _stack[-1] if _stack else None
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "wall", "cpu")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(
+            self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu
+        )
+
+
+def stage(name):
+    """计时上下文：with stage("decode"): ...；未启用时返回空上下文。"""
+    m = _active[0] if _active else None
+    return _Stage(m, name) if m is not None else contextlib.nullcontext()
+
+
+def count(name, value=1):
+    if _active:
+        _active[0].count(name, value)
+
+
+def timed_blocks(name, blocks):
+    """包装块生成器，把每次取块（解码 / 读文件）的时间记入 name 阶段。"""
+    m = _active[0] if _active else None
+    if m is None:
+        yield from blocks
+        return
+    it = iter(blocks)
+    try:
+        while True:
+            with _Stage(m, name):
+                block = next(it, None)
+            if block is None:
+                return
+            yield block
+    finally:
+        close = getattr(it, "close", None)
+        if close:
+            close()
+
+
+def run_collected(fn, *args):
+    """在新的收集器下调用 fn，返回 (结果, snapshot)；供进程池工作进程使用。"""
+    m = Metrics()
+    with collecting(m):
+        result = fn(*args)
+    return result, m.snapshot()
+
+
+# --- 可选的 cProfile / tracemalloc ---
+
+
+class Profiler:
+    """cpu=True 时用 cProfile 记录调用耗时，memory=True 时用 tracemalloc 记录分配。
+
+    cProfile 在 Python 3.11 及以下只作用于启用它的线程，任务线程要用 thread() 单独开启，
+    save() 时合并；3.12 起同一时间只能有一个 cProfile，第一个会覆盖所有线程。
+    进程池里的工作进程不在统计范围内。
+    """
+
+    def __init__(self, cpu=False, memory=False):
+        self.cpu = cpu
+        self.memory = memory
+        self.peak_bytes = None
+        self._profiles = []
+        self._snapshot = None
+        self._main = None
+
+    def __enter__(self):
+        if self.memory:
+            import tracemalloc
+
+            tracemalloc.start(25)
+        self._main = self.thread()
+        self._main.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._main.__exit__(*exc)
+        if self.memory:
+            import tracemalloc
+
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def thread(self):
+        """在当前线程开启 cProfile；已有其他 cProfile 生效（3.12+）时什么也不做。"""
+        if not self.cpu:
+            yield
+            return
+        import cProfile
+
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            yield
+            return
+        try:
+            yield
+        finally:
+            prof.disable()
+            self._profiles.append(prof)
+
+    def _stats(self, stream=None):
+        import pstats
+
+        if not self._profiles:
+            return None
+        return pstats.Stats(*self._profiles, stream=stream)
+
+    def save(self, prefix):
+        """写出 <prefix>.prof（可用 snakeviz / pstats 查看）和 <prefix>.alloc.txt，返回写出的路径列表。"""
+        paths = []
+        stats = self._stats()
+        if stats is not None:
+            stats.dump_stats(f"{prefix}.prof")
+            paths.append(f"{prefix}.prof")
+        if self._snapshot is not None:
+            with open(f"{prefix}.alloc.txt", "w", encoding="utf-8") as f:
+                f.write("\n".join(self.top_allocations(50)) + "\n")
+            paths.append(f"{prefix}.alloc.txt")
+        return paths
+
+    def top_functions(self, limit=15):
+        buf = io.StringIO()
+        stats = self._stats(buf)
+        if stats is None:
+            return []
+        stats.sort_stats("cumulative").print_stats(limit)
+        return buf.getvalue().strip().splitlines()
+
+    def top_allocations(self, limit=15):
+        if self._snapshot is None:
+            return []
+        lines = [f"峰值跟踪内存：{self.peak_bytes / 2**20:.1f} MB"]
+        for stat in self._snapshot.statistics("lineno")[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 2**20:9.2f} MB {stat.count:>8} 次  {frame.filename}:{frame.lineno}")
+        return lines
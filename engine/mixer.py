@@ -0,0 +1,649 @@
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from . import loudness, metrics, pcmstream, probe, resample, wavfile
+from .tasks import TaskRunner
+
+SUPPORTED_EXT = (".wav", ".mp3", ".flac")
+FRAME_RATE = 44100
+CHANNELS = 2
+BLOCK_FRAMES = 1 << 16
+# dtype 为 None 时保持源位宽，各分轨混音前统一到最宽的一个
+DEFAULT_FORMAT = resample.AudioFormat(FRAME_RATE, CHANNELS, None)
+
+# duplicate_of 不为 None 时表示该输入与之是同一录音，output 链接（或复制）自它的混音结果
+MixEvent = namedtuple("MixEvent", "index total path output error skipped duplicate_of", defaults=(None,))
+
+# pydub 采样宽度（字节）到 NumPy 整型的映射；24 位等其他宽度走 pydub 原有流程
+_INT_DTYPES = {2: np.int16, 4: np.int32}
+
+
+def collect_vocal_files(folder):
+    return [
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if os.path.splitext(f)[1].lower() in SUPPORTED_EXT
+    ]
+
+
+def load_normalized(path):
+    """pydub 原有的统一格式流程（audioop.ratecv），仅供基准对比。"""
+    from pydub import AudioSegment
+
+    return AudioSegment.from_file(path).set_frame_rate(FRAME_RATE).set_channels(CHANNELS)
+
+
+_DIRECT_DTYPES = (np.dtype(np.int16), np.dtype(np.int32), np.dtype(np.float32))
+
+
+def _map_wav(path):
+    """16 / 32 位整型或 32 位浮点的 WAV 直接内存映射，返回 (数组, 采样率)；其他情况返回 None。"""
+    if not wavfile.is_wav(path):
+        return None
+    info = wavfile.read_wav_info(path)
+    fmt = pcmstream.sample_format(info.format_tag, info.sample_width)
+    frames = wavfile.frame_count(info)
+    if not (fmt and np.dtype(fmt[0]) in _DIRECT_DTYPES and frames):
+        return None
+    data = np.memmap(
+        path, dtype=fmt[0], mode="r", offset=info.data_offset, shape=(frames, info.channels)
+    )
+    return data, info.sample_rate
+
+
+def _decode(path):
+    """返回 (数组, 采样率)。WAV 直接内存映射，其余格式由 pydub 解码。"""
+    mapped = _map_wav(path)
+    if mapped is not None:
+        return mapped
+
+    from pydub import AudioSegment
+
+    seg = AudioSegment.from_file(path)
+    if seg.sample_width not in _INT_DTYPES:
+        seg = seg.set_sample_width(4)  # 8 / 24 位等宽度无损提升为 32 位
+    return segment_to_array(seg), seg.frame_rate
+
+
+def load_array(path, fmt=DEFAULT_FORMAT, quality=resample.DEFAULT_QUALITY):
+    """解码并转换为 fmt 指定格式的 (帧数, 声道) 数组；源文件已是目标格式时不做任何转换。"""
+    metrics.count("input_bytes", os.path.getsize(path))
+    with metrics.stage("decode"):
+        data, rate = _decode(path)
+    with metrics.stage("resample"):
+        return resample.convert(data, rate, fmt, quality)
+
+
+def _cache_key(cache, path, fmt, quality, streaming=False):
+    dtype = np.dtype(fmt.dtype).name if fmt.dtype is not None else "auto"
+    # 流式模式下由 ffmpeg 转换格式，结果与 engine.resample 不同，分开缓存
+    variant = (dtype, quality, "stream") if streaming else (dtype, quality)
+    return cache.key(path, fmt.rate, fmt.channels, *variant)
+
+
+def load_instrumental(path, cache=None, fmt=DEFAULT_FORMAT, quality=resample.DEFAULT_QUALITY):
+    """加载统一格式的伴奏数组；给定 PCMCache 时命中缓存即直接内存映射，无需解码。"""
+    if cache is None:
+        return load_array(path, fmt, quality)
+    key = _cache_key(cache, path, fmt, quality)
+    return cache.get_or_create(key, lambda: load_array(path, fmt, quality))
+
+
+def _common_dtype(dtypes):
+    """有浮点分轨时统一为 float32，否则统一为最宽的整型。"""
+    dtypes = [np.dtype(d) for d in dtypes]
+    if any(d.kind == "f" for d in dtypes):
+        return np.dtype(np.float32)
+    return max(dtypes, key=lambda d: d.itemsize)
+
+
+def mix_output_path(vocal_path, base_folder):
+    name = os.path.splitext(os.path.basename(vocal_path))[0]
+    return os.path.join(base_folder, f"{name}_mix.wav")
+
+
+def is_mix_output(path):
+    return os.path.splitext(os.path.basename(path))[0].endswith("_mix")
+
+
+def db_to_gain(db):
+    return 10 ** (db / 20)
+
+
+def segment_to_array(seg):
+    """AudioSegment -> (帧数, 声道) 只读数组，直接引用 raw_data，不复制。"""
+    dtype = _INT_DTYPES[seg.sample_width]
+    return np.frombuffer(seg.raw_data, dtype=dtype).reshape(-1, seg.channels)
+
+
+def _soft_limit(block, peak, threshold=0.9):
+    # 超过阈值的部分用 tanh 软膝压缩，阈值以下保持不变
+    x = block / peak
+    mag = np.abs(x)
+    over = mag > threshold
+    knee = 1.0 - threshold
+    mag[over] = threshold + knee * np.tanh((mag[over] - threshold) / knee)
+    return np.copysign(mag, x, out=x) * peak
+
+
+def mix_stems(stems, gains_db=None, length=None, limiter=False, block_frames=BLOCK_FRAMES):
+    """把 N 个 (帧数, 声道) 数组按各自增益相加，返回同 dtype 的混音结果。
+
+    每个分轨只做一次增益乘法，按块累加到复用的缓冲区里，不产生整段长度的中间副本。
+    整型分轨的增益按 audioop.mul 的规则向下取整并饱和，求和后再饱和，
+    因此两个分轨时结果与 pydub 的 ``(a + db1).overlay(b + db2)`` 逐位一致。
+    length 默认取最短分轨；比 length 短的分轨按静音补齐。
+    """
+    dtype = stems[0].dtype
+    channels = stems[0].shape[1]
+    gains = [1.0] * len(stems) if gains_db is None else [db_to_gain(g) for g in gains_db]
+    if length is None:
+        length = min(len(s) for s in stems)
+
+    integer = dtype.kind == "i"
+    if integer:
+        lo, hi = np.iinfo(dtype).min, np.iinfo(dtype).max
+        acc_dtype = np.int64 if dtype.itemsize >= 4 else np.int32
+        tmp_dtype = np.float64
+    else:
+        lo, hi = -1.0, 1.0
+        acc_dtype = tmp_dtype = dtype
+
+    out = np.empty((length, channels), dtype)
+    block_frames = min(block_frames, max(length, 1))
+    acc = np.empty((block_frames, channels), acc_dtype)
+    tmp = np.empty((block_frames, channels), tmp_dtype)
+    for start in range(0, length, block_frames):
+        end = min(start + block_frames, length)
+        a = acc[: end - start]
+        a.fill(0)
+        for stem, gain in zip(stems, gains):
+            part = stem[start:end]
+            k = len(part)
+            if k == 0:
+                continue
+            if gain == 1.0:
+                np.add(a[:k], part, out=a[:k], casting="unsafe")
+                continue
+            t = tmp[:k]
+            np.multiply(part, gain, out=t)
+            if integer:
+                np.floor(t, out=t)
+                np.clip(t, lo, hi, out=t)
+            np.add(a[:k], t, out=a[:k], casting="unsafe")
+        if limiter:
+            limited = _soft_limit(a, float(hi))
+            if integer:
+                np.floor(limited, out=limited)
+            np.clip(limited, lo, hi, out=limited)
+            out[start:end] = limited
+        else:
+            np.clip(a, lo, hi, out=a)
+            out[start:end] = a
+    return out
+
+
+def instrumental_loudness(instr, key=None, cache=None, rate=FRAME_RATE):
+    """伴奏的积分响度（LUFS）；给定缓存键时结果与解码后的 PCM 一起缓存，不重复测量。"""
+    if cache is not None and key is not None:
+        lufs = cache.get_meta(key).get("lufs")
+        if lufs is not None:
+            return lufs
+    lufs = _array_loudness(instr, rate)
+    if cache is not None and key is not None:
+        cache.set_meta(key, lufs=lufs)
+    return lufs
+
+
+def _array_loudness(data, rate):
+    with metrics.stage("loudness"):
+        return loudness.integrated_loudness_blocks(_array_blocks(data, BLOCK_FRAMES), rate, data.shape[1])
+
+
+def mix_file(
+    vocal_path,
+    instr,
+    vocal_db,
+    instr_db,
+    base_folder,
+    limiter=False,
+    target_lufs=None,
+    instr_lufs=None,
+    fmt=DEFAULT_FORMAT,
+    quality=resample.DEFAULT_QUALITY,
+    pad=False,
+):
+    """把单个人声与已加载的伴奏数组（见 load_instrumental，须为同一 fmt）混音，返回输出路径。
+
+    给定 target_lufs 时先把两条分轨各自归一到该响度（EBU R128），再叠加 vocal_db / instr_db；
+    instr_lufs 为预先测得的伴奏响度，省略时现场测量。
+    pad 为 True 时以较长的分轨为准，较短的补静音；否则截断到较短的分轨。
+    """
+    rate = fmt.rate
+    vocal = load_array(vocal_path, fmt, quality)
+    dtype = _common_dtype([vocal.dtype, instr.dtype])
+    vocal = resample.convert_dtype(vocal, dtype)
+    instr = resample.convert_dtype(instr, dtype)
+
+    # 与 pydub 按毫秒截取的长度保持一致
+    instr_ms = round(1000 * (len(instr) / rate))
+    vocal_ms = round(1000 * (len(vocal) / rate))
+    frames = int((max if pad else min)(vocal_ms, instr_ms) * (rate / 1000.0))
+    if target_lufs is not None:
+        with metrics.stage("loudness"):
+            if instr_lufs is None:
+                instr_lufs = loudness.integrated_loudness(instr, rate)
+            vocal_lufs = loudness.integrated_loudness(vocal, rate)
+        instr_db += loudness.gain_to_target(instr_lufs, target_lufs)
+        vocal_db += loudness.gain_to_target(vocal_lufs, target_lufs)
+    with metrics.stage("mix"):
+        mixed = mix_stems(
+            [instr, vocal],
+            [instr_db, vocal_db],
+            length=frames,
+            limiter=limiter,
+        )
+    return _export(mix_output_path(vocal_path, base_folder), mixed, rate)
+
+
+def _export(output_path, mixed, rate):
+    with metrics.stage("export"):
+        wavfile.write_wav_array(output_path, mixed, rate)
+    metrics.count("output_frames", len(mixed))
+    metrics.count("output_bytes", mixed.nbytes)
+    return output_path
+
+
+def mix_paths(
+    paths,
+    gains_db,
+    output_path,
+    limiter=False,
+    target_lufs=None,
+    fmt=DEFAULT_FORMAT,
+    quality=resample.DEFAULT_QUALITY,
+    pad=False,
+):
+    """混合任意数量的音频文件（统一为 fmt 指定格式），返回输出路径。
+
+    默认以最短的文件为准，pad 为 True 时以最长的为准、其余补静音。
+    给定 target_lufs 时各分轨先归一到该响度，gains_db 作为归一后的偏移。
+    """
+    stems = [load_array(p, fmt, quality) for p in paths]
+    dtype = _common_dtype([s.dtype for s in stems])
+    stems = [resample.convert_dtype(s, dtype) for s in stems]
+    if target_lufs is not None:
+        with metrics.stage("loudness"):
+            gains_db = [
+                g + loudness.gain_to_target(loudness.integrated_loudness(s, fmt.rate), target_lufs)
+                for g, s in zip(gains_db or [0.0] * len(stems), stems)
+            ]
+    length = max(len(s) for s in stems) if pad else None
+    with metrics.stage("mix"):
+        mixed = mix_stems(stems, gains_db, length=length, limiter=limiter)
+    return _export(output_path, mixed, fmt.rate)
+
+
+# --- 流式混音 ---
+# 各分轨按固定大小的块读取（已是目标采样率 / 声道的 WAV 直接读文件，其余经 ffmpeg 管道转换），
+# 逐块加权求和后追加写入输出文件；峰值内存只与块大小有关，与音频时长无关。
+# 不用内存映射遍历整个文件：映射过的页会一直计入进程 RSS。
+
+_FFMPEG_HQ_RESAMPLE = "aresample={rate}:filter_size=128:phase_shift=14:cutoff=0.98"
+
+
+def _array_blocks(data, block_frames):
+    """逐块产出数组切片；文件映射的数组（WAV、PCMCache 的 .npy）改为按块读文件。"""
+    filename = getattr(data, "filename", None)
+    if filename is None or not data.flags.c_contiguous:
+        for start in range(0, len(data), block_frames):
+            yield data[start : start + block_frames]
+        return
+    channels = data.shape[1]
+    with open(filename, "rb") as f:
+        f.seek(data.offset)
+        for start in range(0, len(data), block_frames):
+            count = min(block_frames, len(data) - start) * channels
+            yield np.fromfile(f, dtype=data.dtype, count=count).reshape(-1, channels)
+
+
+def stem_blocks(
+    path, fmt=DEFAULT_FORMAT, quality=resample.DEFAULT_QUALITY, block_frames=BLOCK_FRAMES, stage="decode"
+):
+    """返回 (dtype, 块生成器)，除最后一块外每块恰为 block_frames 帧。
+
+    fmt.dtype 为 None 时 WAV 保持原位宽，其余格式按 16 位解码。取块耗时记入 stage 阶段（None 为不计）。
+    """
+    rate, channels = fmt.rate or FRAME_RATE, fmt.channels or CHANNELS
+    metrics.count("input_bytes", os.path.getsize(path))
+    mapped = _map_wav(path)
+    if mapped is not None and mapped[1] == rate and mapped[0].shape[1] == channels:
+        data = mapped[0]
+        dtype = np.dtype(fmt.dtype) if fmt.dtype is not None else data.dtype
+        blocks = (resample.convert_dtype(b, dtype) for b in _array_blocks(data, block_frames))
+        return dtype, metrics.timed_blocks(stage, blocks) if stage else blocks
+    dtype = np.dtype(fmt.dtype) if fmt.dtype is not None else np.dtype(np.int16)
+    filter_args = ("-af", _FFMPEG_HQ_RESAMPLE.format(rate=rate)) if quality == "hq" else ()
+    blocks = pcmstream.ffmpeg_pcm_blocks(path, rate, channels, dtype, block_frames, filter_args)
+    return dtype, metrics.timed_blocks(stage, blocks) if stage else blocks
+
+
+def _stream_mix(streams, gains_db, writer, pad, limiter):
+    """逐块混音写入 writer，返回写入的帧数。streams 为块生成器列表，结束时全部关闭。"""
+    streams = list(streams)
+    empty = np.zeros((0, writer.channels), writer.dtype)
+    total = 0
+    try:
+        while True:
+            blocks = []
+            for i, it in enumerate(streams):
+                block = next(it, None) if it is not None else None
+                if block is None:
+                    streams[i] = None
+                    block = empty
+                blocks.append(resample.convert_dtype(block, writer.dtype))
+            lengths = [len(b) for b in blocks]
+            n = max(lengths) if pad else min(lengths)
+            if n == 0:
+                return total
+            with metrics.stage("mix"):
+                mixed = mix_stems(blocks, gains_db, length=n, limiter=limiter)
+            with metrics.stage("export"):
+                writer.write(mixed)
+            metrics.count("output_frames", n)
+            metrics.count("output_bytes", mixed.nbytes)
+            total += n
+    finally:
+        for it in streams:
+            if it is not None:
+                it.close()
+
+
+def _stream_loudness(path, fmt, quality, block_frames):
+    # 测量用的这遍解码计入 loudness，不与混音时的 decode 混在一起
+    with metrics.stage("loudness"):
+        _, blocks = stem_blocks(path, fmt, quality, block_frames, stage=None)
+        return loudness.integrated_loudness_blocks(blocks, fmt.rate, fmt.channels)
+
+
+def stream_mix_paths(
+    paths,
+    gains_db,
+    output_path,
+    limiter=False,
+    target_lufs=None,
+    fmt=DEFAULT_FORMAT,
+    quality=resample.DEFAULT_QUALITY,
+    pad=False,
+    block_frames=BLOCK_FRAMES,
+):
+    """与 mix_paths 相同，但不整体载入任何分轨；给定 target_lufs 时每个分轨多解码一遍用于测量响度。"""
+    fmt = fmt._replace(rate=fmt.rate or FRAME_RATE, channels=fmt.channels or CHANNELS)
+    gains_db = list(gains_db or [0.0] * len(paths))
+    if target_lufs is not None:
+        gains_db = [
+            g + loudness.gain_to_target(_stream_loudness(p, fmt, quality, block_frames), target_lufs)
+            for g, p in zip(gains_db, paths)
+        ]
+    opened = [stem_blocks(p, fmt, quality, block_frames) for p in paths]
+    dtype = _common_dtype([d for d, _ in opened])
+    with wavfile.WavWriter(output_path, fmt.channels, fmt.rate, dtype) as writer:
+        _stream_mix([b for _, b in opened], gains_db, writer, pad, limiter)
+    return output_path
+
+
+def stream_mix_file(
+    vocal_path,
+    instr,
+    vocal_db,
+    instr_db,
+    base_folder,
+    limiter=False,
+    target_lufs=None,
+    instr_lufs=None,
+    fmt=DEFAULT_FORMAT,
+    quality=resample.DEFAULT_QUALITY,
+    pad=False,
+    block_frames=BLOCK_FRAMES,
+):
+    """mix_file 的流式版本：伴奏为内存映射的数组（见 PCMCache），人声按块解码。"""
+    if target_lufs is not None:
+        if instr_lufs is None:
+            instr_lufs = _array_loudness(instr, fmt.rate)
+        vocal_lufs = _stream_loudness(vocal_path, fmt, quality, block_frames)
+        instr_db += loudness.gain_to_target(instr_lufs, target_lufs)
+        vocal_db += loudness.gain_to_target(vocal_lufs, target_lufs)
+    vocal_dtype, vocal_blocks = stem_blocks(vocal_path, fmt, quality, block_frames)
+    dtype = _common_dtype([instr.dtype, vocal_dtype])
+    output_path = mix_output_path(vocal_path, base_folder)
+    with wavfile.WavWriter(output_path, fmt.channels, fmt.rate, dtype) as writer:
+        _stream_mix(
+            [_array_blocks(instr, block_frames), vocal_blocks],
+            [instr_db, vocal_db],
+            writer,
+            pad,
+            limiter,
+        )
+    return output_path
+
+
+def is_up_to_date(output_path, *sources):
+    try:
+        out_mtime = os.path.getmtime(output_path)
+    except OSError:
+        return False
+    return all(out_mtime >= os.path.getmtime(src) for src in sources)
+
+
+# --- 进程池批量混音 ---
+# 伴奏先写入 PCMCache，各工作进程在初始化时内存映射同一个 .npy，
+# 任务只传人声路径；结果经由队列按输入顺序回传，调用方用 poll() 非阻塞读取。
+
+_worker_instr = None
+
+
+def _init_mix_worker(instr_npy):
+    global _worker_instr
+    _worker_instr = np.load(instr_npy, mmap_mode="r")
+
+
+def _mix_worker(vocal_path, *args):
+    return metrics.run_collected(mix_file, vocal_path, _worker_instr, *args)
+
+
+def _stream_mix_worker(vocal_path, *args):
+    return metrics.run_collected(stream_mix_file, vocal_path, _worker_instr, *args)
+
+
+class BatchMixJob(TaskRunner):
+    metrics_name = "mix"
+
+    def __init__(
+        self,
+        files,
+        instr_path,
+        vocal_db,
+        instr_db,
+        base_folder,
+        limiter=False,
+        cache=None,
+        workers=None,
+        resume=False,
+        target_lufs=None,
+        fmt=DEFAULT_FORMAT,
+        quality=resample.DEFAULT_QUALITY,
+        streaming=False,
+        pad=False,
+        dedup=None,
+    ):
+        """streaming 为 True 时伴奏逐块解码写入缓存、人声逐块混音，内存占用与音频时长无关。
+
+        dedup 为 engine.fingerprint.FingerprintIndex 时按声学指纹识别重复的人声：每组只混音一次，
+        其余的输出硬链接（或复制）自它；以前用相同参数混过的录音直接复用以前的输出。
+        """
+        self.files = [f for f in files if not is_mix_output(f)]  # 跳过已处理文件
+        super().__init__(len(self.files))
+        self.instr_path = instr_path
+        self.vocal_db = vocal_db
+        self.instr_db = instr_db
+        self.base_folder = base_folder
+        self.limiter = limiter
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.resume = resume
+        self.target_lufs = target_lufs
+        self.instr_lufs = None
+        self.fmt = fmt
+        self.quality = quality
+        self.streaming = streaming
+        self.pad = pad
+        self.dedup = dedup
+
+    def signature(self):
+        """影响混音结果的全部参数，相同时重复的人声才能共用输出。"""
+        from .fingerprint import signature
+
+        st = os.stat(self.instr_path)
+        fmt = (self.fmt.rate, self.fmt.channels, np.dtype(self.fmt.dtype).name if self.fmt.dtype else None)
+        return signature(
+            "mix", os.path.abspath(self.instr_path), st.st_size, st.st_mtime_ns, self.vocal_db,
+            self.instr_db, self.limiter, self.target_lufs, fmt, self.quality, self.pad, self.streaming,
+        )
+
+    def _plan_dedup(self):
+        """返回 (原件集合, {重复项: 原件}, {原件: 已有输出}, 配方)；未启用去重时全部为原件。"""
+        if self.dedup is None:
+            return set(self.files), {}, {}, None
+        from .fingerprint import plan_dedup
+
+        sig = self.signature()
+        plan = plan_dedup(
+            self.files, self.dedup, sig, self.workers, progress=lambda done, total: self.check_cancelled()
+        )
+        dup_of = dict(plan.duplicates)
+        outputs = {}
+        for f, (source, output) in plan.reused.items():
+            dup_of[f] = source
+            outputs[source] = output
+        return set(plan.originals), dup_of, outputs, sig
+
+    def run(self):
+        tmp_dir = None
+        try:
+            cache = self.cache
+            if cache is None:
+                from .cache import PCMCache
+
+                tmp_dir = tempfile.TemporaryDirectory()
+                cache = PCMCache(tmp_dir.name)
+            key = _cache_key(cache, self.instr_path, self.fmt, self.quality, self.streaming)
+            instr = cache.get(key)
+            if instr is None and self.streaming:
+                _, blocks = stem_blocks(self.instr_path, self.fmt, self.quality)
+                instr = cache.put_blocks(key, blocks)
+            elif instr is None:
+                instr = cache.put(key, load_array(self.instr_path, self.fmt, self.quality))
+            if self.target_lufs is not None:
+                self.instr_lufs = instrumental_loudness(instr, key, cache, self.fmt.rate)
+            del instr
+            self._dispatch(cache.path(key))
+        finally:
+            if tmp_dir is not None:
+                tmp_dir.cleanup()
+
+    def _dispatch(self, instr_npy):
+        total = self.total
+        originals, dup_of, outputs, sig = self._plan_dedup()
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_mix_worker, initargs=(instr_npy,)
+        )
+        try:
+            jobs = []
+            todo = []
+            for i, f in enumerate(self.files, 1):
+                output_path = mix_output_path(f, self.base_folder)
+                if self.resume and is_up_to_date(output_path, f, self.instr_path):
+                    jobs.append((i, f, output_path, None))
+                elif f not in originals:
+                    jobs.append((i, f, output_path, dup_of[f]))
+                else:
+                    todo.append(f)
+                    jobs.append((i, f, None, None))
+
+            # 按头部探测到的时长从长到短提交，避免最长的文件最后才开始、拖长总耗时
+            lengths = probe.durations(todo + [self.instr_path])
+            instr_len = lengths.pop(self.instr_path, None)
+            if instr_len is not None and len(lengths) == len(todo):
+                pick = max if self.pad else min
+                self.metrics.set("planned_output_seconds", sum(pick(d, instr_len) for d in lengths.values()))
+            futures = {}
+            for f in sorted(todo, key=lambda f: -lengths.get(f, 0.0)):
+                futures[f] = pool.submit(
+                    _stream_mix_worker if self.streaming else _mix_worker,
+                    f,
+                    self.vocal_db,
+                    self.instr_db,
+                    self.base_folder,
+                    self.limiter,
+                    self.target_lufs,
+                    self.instr_lufs,
+                    self.fmt,
+                    self.quality,
+                    self.pad,
+                )
+            jobs = [(i, f, out, futures[f]) if out is None else (i, f, out, fut) for i, f, out, fut in jobs]
+
+            # 按输入顺序回传结果；重复项的原件总在它之前，轮到它时原件的输出已确定
+            for i, f, output_path, fut in jobs:
+                if fut is None:
+                    outputs[f] = output_path
+                    self.advance(MixEvent(i, total, f, output_path, None, True))
+                    continue
+                if isinstance(fut, str):
+                    self.advance(self._link_duplicate(i, f, output_path, fut, outputs.get(fut)))
+                    continue
+                while not wait([fut], timeout=0.2).done:
+                    self.check_cancelled()
+                try:
+                    output, snap = fut.result()
+                    self.metrics.merge(snap)
+                    outputs[f] = output
+                    if sig is not None:
+                        self.dedup.record_output(f, sig, output)
+                    self.advance(MixEvent(i, total, f, output, None, False))
+                except Exception as e:
+                    self.advance(MixEvent(i, total, f, None, str(e), False))
+                self.check_cancelled()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _link_duplicate(self, i, f, output_path, original, source_output):
+        from .fingerprint import link_or_copy
+
+        name = os.path.basename(original)
+        if source_output is None:
+            return MixEvent(i, self.total, f, None, f"与 {name} 是同一录音，但它混音失败", False, original)
+        try:
+            link_or_copy(source_output, output_path)
+        except OSError as e:
+            return MixEvent(i, self.total, f, None, str(e), False, original)
+        metrics.count("duplicates")
+        return MixEvent(i, self.total, f, output_path, None, True, original)
+
+
+def clean_mix_files(folder):
+    """删除目录下所有 *_mix.wav，返回 (删除数量, [(文件名, 错误信息), ...])。"""
+    deleted = 0
+    errors = []
+    for f in os.listdir(folder):
+        if f.endswith("_mix.wav"):
+            try:
+                os.remove(os.path.join(folder, f))
+                deleted += 1
+            except OSError as e:
+                errors.append((f, str(e)))
+    return deleted, errors
@@ -0,0 +1,363 @@
+# MP3 帧表：只解析帧头，不解码。剪切时按帧复制原始数据，并写入带 LAME 延迟 / 填充字段的
+# Info 帧，支持无缝播放的解码器（ffmpeg、mpg123、foobar2000 等）据此精确裁掉多余的采样。
+import mmap
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# MPEG 版本位 -> 版本号：1 = MPEG-1，2 = MPEG-2，25 = MPEG-2.5
+_VERSIONS = {3: 1, 2: 2, 0: 25}
+_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+DECODER_DELAY = 529  # 解码器固有延迟，LAME 标签中的 delay 不含这部分
+GRANULE = 576  # Layer III 每个 granule 的采样数（MPEG-1 每帧 2 个，MPEG-2/2.5 每帧 1 个）
+MIN_PROBE_FRAMES = 7  # ffmpeg 探测格式时开头连续这么多帧才确认是 MP3，帧数少的文件可能被误判成 H.263 等
+MAX_BACKSTEP = 511  # main_data_begin 的上限：帧的主数据最多从前面帧的数据区回溯这么多字节（比特池）
+_XING_FLAGS = 0x0F  # 帧数 | 字节数 | TOC | 质量
+
+FrameHeader = namedtuple("FrameHeader", "version layer bitrate sample_rate size samples")
+# Xing / Info / VBRI 标签帧中的信息；frames 为音频帧数（不含标签帧），未写入时为 None
+InfoTag = namedtuple("InfoTag", "frames encoder delay padding")
+
+
+def _header_info(h, _memo={}):
+    """解析 32 位帧头，非法时返回 None；只依赖高 23 位，结果缓存。"""
+    key = h >> 9
+    if key in _memo:
+        return _memo[key]
+    info = None
+    ver_bits, layer_bits = (h >> 19) & 3, (h >> 17) & 3
+    br_idx, sr_idx, pad = (h >> 12) & 15, (h >> 10) & 3, (h >> 9) & 1
+    if (h >> 21) == 0x7FF and ver_bits != 1 and layer_bits and br_idx not in (0, 15) and sr_idx != 3:
+        version = _VERSIONS[ver_bits]
+        layer = 4 - layer_bits
+        bitrate = _BITRATES[(min(version, 2), layer)][br_idx] * 1000
+        rate = _SAMPLE_RATES[version][sr_idx]
+        if layer == 1:
+            size, samples = (12 * bitrate // rate + pad) * 4, 384
+        elif layer == 2 or version == 1:
+            size, samples = 144 * bitrate // rate + pad, 1152
+        else:
+            size, samples = 72 * bitrate // rate + pad, 576
+        info = FrameHeader(version, layer, bitrate, rate, size, samples)
+    _memo[key] = info
+    return info
+
+
+def _side_info_size(h):
+    mono = (h >> 6) & 3 == 3
+    if _VERSIONS[(h >> 19) & 3] == 1:
+        return 17 if mono else 32
+    return 9 if mono else 17
+
+
+def _id3v2_size(mm):
+    if len(mm) >= 10 and mm[:3] == b"ID3":
+        size = (mm[6] << 21) | (mm[7] << 14) | (mm[8] << 7) | mm[9]
+        return 10 + size + (10 if mm[5] & 0x10 else 0)
+    return 0
+
+
+def read_info_tag(buf, pos):
+    """解析 pos 处帧内的 Xing / Info / VBRI 标签，返回 InfoTag；该帧不是标签帧时返回 None。"""
+    h = int.from_bytes(buf[pos : pos + 4], "big")
+    tag_pos = pos + 4 + _side_info_size(h) + (0 if h & 0x10000 else 2)
+    tag = bytes(buf[tag_pos : tag_pos + 4])
+    if tag == b"VBRI":
+        return InfoTag(int.from_bytes(buf[tag_pos + 14 : tag_pos + 18], "big"), None, 0, 0)
+    if tag not in (b"Xing", b"Info"):
+        return None
+    flags = int.from_bytes(buf[tag_pos + 4 : tag_pos + 8], "big")
+    frames = int.from_bytes(buf[tag_pos + 8 : tag_pos + 12], "big") if flags & 1 else None
+    p = tag_pos + 8 + 4 * bool(flags & 1) + 4 * bool(flags & 2) + 100 * bool(flags & 4)
+    p += 4 * bool(flags & 8)
+    version = bytes(buf[p : p + 9])
+    if version[:4] in (b"LAME", b"Lavf", b"Lavc"):
+        v = int.from_bytes(buf[p + 21 : p + 24], "big")
+        return InfoTag(frames, version, v >> 12, v & 0xFFF)
+    return InfoTag(frames, None, 0, 0)
+
+
+def decoded_samples(frames, frame_samples, encoder, delay, padding):
+    """frames 个帧解码后的采样数；有 LAME 标签时扣除编码延迟和尾部填充（与 ffmpeg 的无缝解码一致）。"""
+    total = frames * frame_samples
+    if encoder:
+        total -= delay + DECODER_DELAY + max(0, padding - DECODER_DELAY)
+    return max(0, total)
+
+
+def find_first_frame(buf, pos=0):
+    """从 pos 起查找第一个合法帧头（要求紧随其后的也是合法帧头），返回 (位置, FrameHeader)；找不到时返回 None。"""
+    while pos + 4 <= len(buf):
+        info = _header_info(int.from_bytes(buf[pos : pos + 4], "big"))
+        if info is not None:
+            nxt = pos + info.size
+            if nxt + 4 > len(buf) or _header_info(int.from_bytes(buf[nxt : nxt + 4], "big")) is not None:
+                return pos, info
+        pos += 1
+    return None
+
+
+def _crc16(data):
+    """CRC-16/ARC（多项式 0xA001），LAME 标签校验使用。"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+class Mp3Stream:
+    """offsets / sizes 为各音频帧在文件中的位置（不含 Xing/Info 帧）；
+    采样位置以解码输出为准，已扣除源文件 LAME 标签记录的编码延迟。"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._scan(mm)
+        finally:
+            mm.close()
+
+    def _scan(self, mm):
+        end = len(mm)
+        if end >= 128 and mm[end - 128 : end - 125] == b"TAG":
+            end -= 128
+        pos = _id3v2_size(mm)
+        offsets = []
+        first = None
+        while pos + 4 <= end:
+            h = int.from_bytes(mm[pos : pos + 4], "big")
+            info = _header_info(h)
+            if info is None or (first and (info.sample_rate, info.layer) != first[1:]):
+                pos += 1  # 失去同步，逐字节重新查找帧头
+                continue
+            if pos + info.size > end:
+                break
+            if first is None:
+                # 第一帧要求紧接着也是合法帧头，避免把垃圾数据当成帧
+                nxt = pos + info.size
+                if nxt + 4 <= end and _header_info(int.from_bytes(mm[nxt : nxt + 4], "big")) is None:
+                    pos += 1
+                    continue
+                first = (h, info.sample_rate, info.layer)
+            offsets.append(pos)
+            pos += info.size
+        if first is None:
+            raise ValueError(f"未找到 MP3 帧：{self.path}")
+
+        self.header = first[0]
+        info = _header_info(self.header)
+        self.sample_rate = info.sample_rate
+        self.layer = info.layer
+        self.frame_samples = info.samples
+        self.channels = 1 if (self.header >> 6) & 3 == 3 else 2
+        self.encoder = None
+        self.delay = self.padding = 0
+
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if self._parse_info_frame(mm, offsets[0]):
+            offsets = offsets[1:]
+        ends = np.append(offsets[1:], pos)
+        self.offsets = offsets
+        self.sizes = ends - offsets
+        self.data_end = int(pos)
+
+    def _parse_info_frame(self, mm, pos):
+        tag = read_info_tag(mm, pos)
+        if tag is None:
+            return False
+        if tag.encoder:
+            self.encoder, self.delay, self.padding = tag.encoder, tag.delay, tag.padding
+        return True
+
+    @property
+    def frame_count(self):
+        return len(self.offsets)
+
+    @property
+    def gapless(self):
+        """只有 Layer III 支持 LAME 标签，其余层只能按帧精度剪切。"""
+        return self.layer == 3
+
+    @property
+    def _skip(self):
+        return self.delay + DECODER_DELAY if self.encoder else 0
+
+    @property
+    def total_samples(self):
+        return decoded_samples(self.frame_count, self.frame_samples, self.encoder, self.delay, self.padding)
+
+    def cut(self, out_path, start, end, accurate=True):
+        """复制 [start, end) 采样对应的帧到 out_path，返回实际覆盖的 (start, end)。
+
+        accurate 为 False 或非 Layer III 时不写 Info 帧，按帧边界取整；否则起止落在同一帧内的
+        范围无法精确剪切，抛出 ValueError。
+        """
+        spf = self.frame_samples
+        start = max(0, start)
+        end = min(end, self.total_samples)
+        if end <= start:
+            raise ValueError("剪切范围为空")
+        a, b = start + self._skip, end + self._skip  # 源文件解码输出中的位置
+        f1 = min(self.frame_count, -(-b // spf))
+        if not (self.gapless and accurate):
+            f0 = a // spf
+            with open(out_path, "wb") as dst:
+                self._copy_frames(dst, f0, f1)
+            return max(0, f0 * spf - self._skip), min(self.total_samples, f1 * spf - self._skip)
+
+        if a // spf == b // spf:
+            # 起止落在同一帧内时，ffmpeg 处理尾部填充的那个包会清掉尚未跳完的起始延迟
+            raise ValueError(f"剪切范围过短：起止位于同一 MP3 帧内（每帧 {spf} 个采样），无法精确剪切")
+        # 起点前两个 granule 也要正确解码（MDCT 重叠与合成滤波器的历史）；它们引用的比特池数据
+        # 放进一个静音的引导帧，而不是再往前复制整帧，这样 delay 始终在 LAME 标签的 12 位范围内
+        f0 = max(0, (a - 2 * GRANULE) // spf)
+        prime = self._priming_frame(f0, self._reservoir(f0))
+        delay = a - f0 * spf - DECODER_DELAY + (spf if prime else 0)
+        if delay < 0:
+            # 无标签源文件的开头：解码器总会丢弃前 529 个采样
+            delay = 0
+            start = f0 * spf + DECODER_DELAY - self._skip
+        # 结果太短时在末尾多复制几帧（解码时随尾部填充一起裁掉），凑够 MIN_PROBE_FRAMES
+        frames = 1 + bool(prime) + f1 - f0  # 含 Info 帧
+        f1 = min(self.frame_count, f1 + max(0, MIN_PROBE_FRAMES - frames))
+        while f1 * spf - b + DECODER_DELAY > 0xFFF:
+            f1 -= 1
+        padding = f1 * spf - b + DECODER_DELAY
+        sizes = self.sizes[f0:f1]
+        if prime:
+            sizes = np.concatenate(([len(prime)], sizes))
+        with open(out_path, "wb") as dst:
+            body = len(prime) + self._span(f0, f1)
+            dst.write(self._info_frame(sizes, delay, padding, body))
+            dst.write(prime)
+            self._copy_frames(dst, f0, f1)
+        return start, end
+
+    def _reservoir(self, first):
+        """帧 first 起的各帧通过 main_data_begin 引用的、位于 first 之前的比特池数据（最多 511 字节）。"""
+        with open(self.path, "rb") as f:
+
+            def read(k):
+                f.seek(int(self.offsets[k]))
+                head = f.read(8)
+                h = int.from_bytes(head[:4], "big")
+                p = 4 + (0 if h & 0x10000 else 2)
+                if _VERSIONS[(h >> 19) & 3] == 1:
+                    backstep = (head[p] << 1) | (head[p + 1] >> 7)
+                else:
+                    backstep = head[p]
+                return backstep, p + _side_info_size(h)  # (main_data_begin, 数据区在帧内的起点)
+
+            # 以帧 first 的数据区起点为 0；数据区之后的帧最多回溯 MAX_BACKSTEP 字节
+            earliest = pos = 0
+            k = first
+            while k < self.frame_count and pos <= MAX_BACKSTEP:
+                backstep, data_start = read(k)
+                earliest = min(earliest, pos - backstep)
+                pos += int(self.sizes[k]) - data_start
+                k += 1
+            chunks = []
+            need = -earliest
+            k = first
+            while need > 0 and k > 0:
+                k -= 1
+                data_start = read(k)[1]
+                f.seek(int(self.offsets[k]) + data_start)
+                chunk = f.read(int(self.sizes[k]) - data_start)
+                chunks.append(chunk[-need:])
+                need -= len(chunk)
+        return b"".join(reversed(chunks))
+
+    def _priming_frame(self, first, reservoir):
+        """放在帧 first 之前的引导帧：侧信息全零（main_data_begin = 0，各 granule 无数据，解码为静音），
+        数据区末尾放 reservoir，供后面的帧回溯。reservoir 为空时返回 b""。"""
+        if not reservoir:
+            return b""
+        # 帧头取自帧 first 而不是 self.header（可能是编码器写的 Info 帧）：ffmpeg 重新同步时
+        # 要求相邻帧的声道模式和版权 / 原创 / 加重位一致，否则会丢掉这一帧
+        with open(self.path, "rb") as f:
+            f.seek(int(self.offsets[first]))
+            h = int.from_bytes(f.read(4), "big")
+        h = (h | 0x10000) & ~0x200  # 无 CRC、无填充
+        side = _side_info_size(h)
+        for br_idx in range(1, 15):
+            h = (h & ~0xF000) | (br_idx << 12)
+            size = _header_info(h).size
+            if size - 4 - side >= len(reservoir):
+                break
+        else:
+            raise ValueError(f"比特池数据过长（{len(reservoir)} 字节），无法放入引导帧")
+        frame = bytearray(size)
+        frame[0:4] = h.to_bytes(4, "big")
+        frame[size - len(reservoir) :] = reservoir
+        return bytes(frame)
+
+    def _span(self, f0, f1):
+        return int(self.offsets[f1 - 1] + self.sizes[f1 - 1] - self.offsets[f0])
+
+    def _copy_frames(self, dst, f0, f1, chunk_size=1 << 20):
+        remaining = self._span(f0, f1)
+        with open(self.path, "rb") as src:
+            src.seek(int(self.offsets[f0]))
+            while remaining > 0:
+                buf = src.read(min(chunk_size, remaining))
+                if not buf:
+                    break
+                dst.write(buf)
+                remaining -= len(buf)
+
+    def _info_frame(self, sizes, delay, padding, body_bytes):
+        """构造 Info 帧：帧头沿用首个音频帧的版本 / 采样率 / 声道，选取足够容纳标签的最小码率。
+
+        sizes 为其后各音频帧的字节数。delay / padding 超出 LAME 标签的 12 位字段时抛出 ValueError。
+        """
+        if not (0 <= delay <= 0xFFF and 0 <= padding <= 0xFFF):
+            raise ValueError(f"LAME 标签无法表示 delay={delay} / padding={padding}")
+        h = self.header | 0x10000  # 无 CRC
+        h &= ~0x200  # 无填充
+        side = _side_info_size(h)
+        needed = 4 + side + 120 + 36
+        for br_idx in range(1, 15):
+            h = (h & ~0xF000) | (br_idx << 12)
+            size = _header_info(h).size
+            if size >= needed:
+                break
+        frames = len(sizes)
+        cbr = bool(np.all(sizes[:-1] >= sizes[0] - 1) and np.all(sizes[:-1] <= sizes[0] + 1))
+        total = size + body_bytes
+
+        # TOC：按时长百分比索引到字节位置（0~255）
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1])) + size
+        idx = np.minimum((np.arange(100) * frames) // 100, frames - 1)
+        toc = np.minimum(starts[idx] * 256 // total, 255).astype(np.uint8).tobytes()
+
+        frame = bytearray(size)
+        frame[0:4] = h.to_bytes(4, "big")
+        p = 4 + side
+        frame[p : p + 120] = (
+            (b"Info" if cbr else b"Xing")
+            + struct.pack(">III", _XING_FLAGS, frames, total)
+            + toc
+            + struct.pack(">I", 0)
+        )
+        p += 120
+        lame = bytearray(36)
+        lame[0:9] = (self.encoder or b"LAME3.100").ljust(9, b" ")[:9]
+        lame[21:24] = ((delay << 12) | padding).to_bytes(3, "big")
+        lame[28:32] = struct.pack(">I", total)
+        frame[p : p + 36] = lame
+        crc_pos = p + 34
+        frame[crc_pos : crc_pos + 2] = struct.pack(">H", _crc16(frame[:crc_pos]))
+        return bytes(frame)
@@ -0,0 +1,267 @@
+import asyncio
+import functools
+import os
+import shutil
+import subprocess
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from . import metrics
+from .tasks import TaskCancelled, TaskRunner
+
+NcmEvent = namedtuple("NcmEvent", "index total path success message stderr elapsed")
+NcmStats = namedtuple(
+    "NcmStats", "success failed elapsed total_bytes files_per_sec mb_per_sec"
+)
+
+
+BACKENDS = ("native", "ncmdump")
+
+
+def has_ncmdump():
+    return shutil.which("ncmdump") is not None
+
+
+def find_ncm_files(src: str):
+    """返回 src（单个 .ncm 文件或目录）下的所有 .ncm 文件；路径无效时返回 None。"""
+    if os.path.isfile(src) and src.endswith(".ncm"):
+        return [src]
+    if os.path.isdir(src):
+        return [str(f) for f in Path(src).rglob("*.ncm")]
+    return None
+
+
+def _convert_native(ncm_path: str, output_dir: str):
+    from .ncmcrypt import decrypt_ncm
+
+    try:
+        return True, decrypt_ncm(ncm_path, output_dir)
+    except Exception as e:
+        return False, str(e)
+
+
+def _ncmdump_output(ncm_path: str, output_dir: str, stdout: str):
+    """ncmdump 只在标准输出里打印日志；按与内置解密相同的命名找出它写出的文件，找不到时返回日志。"""
+    from .ncmsync import guess_output
+
+    return guess_output(output_dir, ncm_path) or stdout
+
+
+def convert_ncm_file(ncm_path: str, output_dir: str, backend: str = "native"):
+    """返回 (是否成功, 信息)；成功时信息为输出文件路径。"""
+    if backend == "native":
+        return _convert_native(ncm_path, output_dir)
+    try:
+        # 使用 ncmdump/ncm2mp3 等命令行工具（你也可以用 Python 实现）
+        result = subprocess.run(
+            ["ncmdump", ncm_path, "-o", output_dir],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        return True, _ncmdump_output(ncm_path, output_dir, result.stdout.strip())
+    except FileNotFoundError:
+        return False, "ncmdump' command not found. Please ensure it is installed and in your PATH."
+    except Exception as e:
+        return False, str(e)
+
+
+# --- asyncio 并发转换 ---
+# N 个 worker 从有界队列取文件：内置解密放进线程池执行，ncmdump 则通过
+# create_subprocess_exec 启动，同时运行的任务数不超过 concurrency；结果经 on_event 回调逐个上报。
+
+
+async def convert_ncm_file_async(ncm_path: str, output_dir: str, backend: str = "native"):
+    """返回 (是否成功, 信息, stderr)，成功时信息为输出文件路径。取消时会杀掉正在运行的 ncmdump。"""
+    if backend == "native":
+        # 解密主要是文件读写和 NumPy 异或，都会释放 GIL，放进线程池即可并发
+        loop = asyncio.get_running_loop()
+        success, msg = await loop.run_in_executor(None, _convert_native, ncm_path, output_dir)
+        return success, msg, ""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ncmdump",
+            ncm_path,
+            "-o",
+            output_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        return False, "ncmdump' command not found. Please ensure it is installed and in your PATH.", ""
+    try:
+        # 多个 ncmdump 并发时各自计时，总和可能超过墙钟时间
+        with metrics.stage("subprocess"):
+            stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    stdout = stdout.decode(errors="replace").strip()
+    stderr = stderr.decode(errors="replace").strip()
+    if proc.returncode != 0:
+        return False, stderr or f"ncmdump 退出码 {proc.returncode}", stderr
+    return True, _ncmdump_output(ncm_path, output_dir, stdout), stderr
+
+
+async def convert_many(
+    ncm_files, output_dir, concurrency=8, on_event=None, convert=None, backend="native"
+):
+    convert = convert or functools.partial(convert_ncm_file_async, backend=backend)
+    total = len(ncm_files)
+    work = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"success": 0, "failed": 0, "bytes": 0}
+    t0 = time.perf_counter()
+
+    async def producer():
+        for item in enumerate(ncm_files, 1):
+            await work.put(item)
+        for _ in range(concurrency):
+            await work.put(None)
+
+    async def worker():
+        while True:
+            item = await work.get()
+            if item is None:
+                return
+            i, path = item
+            start = time.perf_counter()
+            success, msg, stderr = await convert(path, output_dir)
+            if success:
+                counts["success"] += 1
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = 0
+                counts["bytes"] += size
+                metrics.count("input_bytes", size)
+            else:
+                counts["failed"] += 1
+            if on_event:
+                on_event(NcmEvent(i, total, path, success, msg, stderr, time.perf_counter() - start))
+
+    await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    done = counts["success"] + counts["failed"]
+    return NcmStats(
+        counts["success"],
+        counts["failed"],
+        elapsed,
+        counts["bytes"],
+        done / elapsed if elapsed else 0.0,
+        counts["bytes"] / 2**20 / elapsed if elapsed else 0.0,
+    )
+
+
+class NcmBatchJob(TaskRunner):
+    """在后台线程里运行 convert_many，事件放入队列供 GUI / CLI 用 poll() 非阻塞读取。"""
+
+    metrics_name = "ncm"
+
+    def __init__(
+        self, ncm_files, output_dir, concurrency=8, convert=None, backend="native", dedup=None
+    ):
+        """dedup 为 engine.fingerprint.FingerprintIndex 时按声学指纹识别同一首歌的多个 .ncm：
+        每组只解密一次，其余的复制它的输出并换上自己的标签与封面，以前转换过的直接复用以前的输出；
+        mutagen 未安装、无法改写标签时重复项照常单独转换。"""
+        super().__init__(len(ncm_files))
+        self.ncm_files = ncm_files
+        self.output_dir = output_dir
+        self.concurrency = max(1, concurrency)
+        self.convert = convert
+        self.backend = backend
+        self.dedup = dedup
+        self.duplicates = 0
+        self.stats = None
+        self._loop = None
+        self._task = None
+
+    def _dedup_convert(self):
+        """先规划去重，再返回包装后的单文件转换：原件照常转换并记录输出，重复项等原件完成后复制其输出。"""
+        from .fingerprint import plan_dedup, signature
+        from .ncmcrypt import copy_with_metadata
+
+        sig = signature("ncm", self.backend)
+        plan = plan_dedup(
+            self.ncm_files, self.dedup, sig, progress=lambda done, total: self.check_cancelled()
+        )
+        convert = self.convert or functools.partial(convert_ncm_file_async, backend=self.backend)
+        results = {}  # 本批次原件 -> 转换结果的 Future
+
+        def result_of(path):
+            if path not in results:
+                results[path] = asyncio.get_running_loop().create_future()
+            return results[path]
+
+        async def run_one(path, output_dir):
+            if path in plan.reused:
+                original, output = plan.reused[path]
+                success = True
+            elif path in plan.duplicates:
+                # 原件在输入顺序中更靠前，已被某个 worker 取走，这里不会死锁
+                original = plan.duplicates[path]
+                success, output, _ = await asyncio.shield(result_of(original))
+            else:
+                try:
+                    result = await convert(path, output_dir)
+                except Exception as e:  # 等待它的重复项也要能结束
+                    result = (False, str(e), "")
+                if result[0] and os.path.isfile(result[1]):
+                    self.dedup.record_output(path, sig, result[1])
+                result_of(path).set_result(result)
+                return result
+
+            if not success:
+                return False, f"与 {os.path.basename(original)} 是同一首歌，但它转换失败", ""
+            if not os.path.isfile(output):
+                return False, f"与 {os.path.basename(original)} 是同一首歌，但找不到它的输出文件", ""
+            stem = os.path.splitext(os.path.basename(path))[0]
+            target = os.path.join(output_dir, stem + os.path.splitext(output)[1])
+            try:
+                # 不硬链接：同一首歌的各个 .ncm 标题、封面等标签可能不同
+                copied = await asyncio.get_running_loop().run_in_executor(
+                    None, copy_with_metadata, output, path, target
+                )
+            except (OSError, ValueError) as e:
+                return False, str(e), ""
+            if not copied:
+                return await convert(path, output_dir)
+            self.duplicates += 1
+            metrics.count("duplicates")
+            return True, target, ""
+
+        return run_one
+
+    def run(self):
+        convert = self._dedup_convert() if self.dedup is not None else self.convert
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(
+                convert_many(
+                    self.ncm_files,
+                    self.output_dir,
+                    self.concurrency,
+                    self.advance,
+                    convert,
+                    self.backend,
+                )
+            )
+            if self.is_cancelling:
+                self._task.cancel()
+            self.stats = self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            raise TaskCancelled()
+        finally:
+            self._loop.close()
+        return self.stats
+
+    def cancel(self):
+        super().cancel()
+        if self._loop and self._task and not self.done:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # 事件循环已关闭
@@ -0,0 +1,242 @@
+# 内置 NCM 解密：解析容器（AES-ECB 密钥块、元数据块、封面），
+# 音频部分用类 RC4 的 256 字节周期密钥流做异或。密钥流按块平铺后用 NumPy 整块异或，
+# 输入到输出全程流式，不需要为每个文件启动 ncmdump 进程。
+import base64
+import json
+import os
+import shutil
+import struct
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from . import aes, metrics
+from .cache import content_hasher, remember_hash
+from .wavfile import temp_path
+
+MAGIC = b"CTENFDAM"
+CORE_KEY = bytes.fromhex("687A4852416D736F356B496E62617857")
+META_KEY = bytes.fromhex("2331346C6A6B5F215C5D2630553C2728")
+KEY_PREFIX = b"neteasecloudmusic"
+META_PREFIX = b"163 key(Don't modify):"
+CHUNK_SIZE = 1 << 22  # 必须是 256 的倍数，保证每块都从密钥流起点开始
+
+NcmHeader = namedtuple("NcmHeader", "key_stream meta cover audio_offset")
+
+
+def build_key_stream(key):
+    """由 RC4 密钥生成 256 字节的密钥流表：第 i 个音频字节与 table[i % 256] 异或。"""
+    box = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + box[i] + key[i % len(key)]) & 0xFF
+        box[i], box[j] = box[j], box[i]
+    table = np.empty(256, dtype=np.uint8)
+    for i in range(256):
+        k = (i + 1) & 0xFF
+        table[i] = box[(box[k] + box[(box[k] + k) & 0xFF]) & 0xFF]
+    return table
+
+
+def _xor_bytes(data, value):
+    return (np.frombuffer(data, dtype=np.uint8) ^ value).tobytes()
+
+
+def _read_block(f):
+    (size,) = struct.unpack("<I", f.read(4))
+    return f.read(size)
+
+
+def read_header(f):
+    if f.read(8) != MAGIC:
+        raise ValueError("不是有效的 NCM 文件")
+    f.seek(2, 1)
+
+    key_data = aes.pkcs7_unpad(aes.ecb_decrypt(CORE_KEY, _xor_bytes(_read_block(f), 0x64)))
+    key_stream = build_key_stream(key_data[len(KEY_PREFIX) :])
+
+    meta = {}
+    meta_data = _read_block(f)
+    if meta_data:
+        meta_data = _xor_bytes(meta_data, 0x63)[len(META_PREFIX) :]
+        meta_data = aes.pkcs7_unpad(aes.ecb_decrypt(META_KEY, base64.b64decode(meta_data)))
+        # 形如 "music:{...}"，电台节目为 "dj:{...}"
+        meta = json.loads(meta_data.split(b":", 1)[1].decode("utf-8"))
+        meta = meta.get("mainMusic", meta)
+
+    f.seek(5, 1)  # CRC32 + 1 字节保留
+    cover_frame_len, image_size = struct.unpack("<II", f.read(8))
+    cover = f.read(image_size)
+    f.seek(max(0, cover_frame_len - image_size), 1)
+    return NcmHeader(key_stream, meta, cover, f.tell())
+
+
+def _output_format(meta, first_bytes):
+    fmt = meta.get("format")
+    if fmt:
+        return fmt
+    return "flac" if first_bytes.startswith(b"fLaC") else "mp3"
+
+
+def decrypt_ncm(ncm_path, output_dir, chunk_size=CHUNK_SIZE, write_tags=True):
+    """解密单个 .ncm 到 output_dir，输出文件名与 ncmdump 一致，返回输出路径。"""
+    chunk_size -= chunk_size % 256
+    with open(ncm_path, "rb") as src:
+        st = os.fstat(src.fileno())
+        with metrics.stage("header"):
+            header = read_header(src)
+        # 顺带计算源文件的内容哈希，增量同步记录结果时不必再读一遍
+        hasher = content_hasher()
+        with metrics.stage("hash"):
+            head_size = src.tell()
+            src.seek(0)
+            hasher.update(src.read(head_size))
+        tiled = np.tile(header.key_stream, chunk_size // 256)
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        arr = np.frombuffer(buf, dtype=np.uint8)
+
+        with metrics.stage("read"):
+            n = src.readinto(buf)
+        fmt = _output_format(header.meta, bytes(arr[:4] ^ tiled[:4]))
+        name = os.path.splitext(os.path.basename(ncm_path))[0]
+        out_path = os.path.join(output_dir, f"{name}.{fmt}")
+        # 写完、加好标签后再替换 out_path，不原地改写已有的输出（它可能被硬链接到别处）
+        tmp = temp_path(out_path)
+        try:
+            with open(tmp, "wb") as dst:
+                while n:
+                    metrics.count("audio_bytes", n)
+                    with metrics.stage("hash"):
+                        hasher.update(view[:n])
+                    with metrics.stage("decrypt"):
+                        np.bitwise_xor(arr[:n], tiled[:n], out=arr[:n])
+                    with metrics.stage("write"):
+                        dst.write(view[:n])
+                    with metrics.stage("read"):
+                        n = src.readinto(buf)
+            if write_tags:
+                with metrics.stage("tags"):
+                    write_metadata(tmp, fmt, header.meta, header.cover)
+            os.replace(tmp, out_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    remember_hash(ncm_path, st, hasher.hexdigest())
+    return out_path
+
+
+def copy_with_metadata(audio_path, ncm_path, out_path):
+    """把另一个 .ncm 已解密的输出 audio_path 复制为 out_path，换上 ncm_path 自己的标题 / 歌手 / 专辑与封面。
+
+    用于同一首歌的多个 .ncm 只解密一次；mutagen 未安装、无法改写标签时不复制，返回 False。
+    """
+    with open(ncm_path, "rb") as f:
+        header = read_header(f)
+    fmt = "flac" if audio_path.lower().endswith(".flac") else "mp3"
+    tmp = temp_path(out_path)
+    try:
+        shutil.copyfile(audio_path, tmp)
+        if not write_metadata(tmp, fmt, header.meta, header.cover, replace=True):
+            os.remove(tmp)
+            return False
+        os.replace(tmp, out_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
+
+
+def read_audio(ncm_path, limit=None):
+    """在内存中解密音频部分，返回 (格式, 字节)；limit 为最多读取的字节数（只需要开头时使用）。"""
+    with open(ncm_path, "rb") as src:
+        header = read_header(src)
+        data = np.frombuffer(bytearray(src.read(limit) if limit else src.read()), dtype=np.uint8)
+    np.bitwise_xor(data, np.resize(header.key_stream, len(data)), out=data)
+    data = data.tobytes()
+    return _output_format(header.meta, data[:4]), data
+
+
+def write_metadata(path, fmt, meta, cover, replace=False):
+    """写入标题/歌手/专辑与封面；mutagen 未安装时跳过。replace 为 True 时先清除文件里已有的这几项。"""
+    try:
+        from mutagen.flac import FLAC, Picture
+        from mutagen.id3 import APIC, ID3, TALB, TIT2, TPE1, ID3NoHeaderError
+    except ImportError:
+        return False
+
+    title = meta.get("musicName")
+    artists = [a[0] for a in meta.get("artist", []) if a]
+    album = meta.get("album")
+    mime = "image/png" if cover.startswith(b"\x89PNG") else "image/jpeg"
+
+    if fmt == "flac":
+        audio = FLAC(path)
+        if replace:
+            for key in ("title", "artist", "album"):
+                audio.pop(key, None)
+            audio.clear_pictures()
+        if title:
+            audio["title"] = title
+        if artists:
+            audio["artist"] = artists
+        if album:
+            audio["album"] = album
+        if cover:
+            pic = Picture()
+            pic.type = 3
+            pic.mime = mime
+            pic.data = cover
+            audio.add_picture(pic)
+        audio.save()
+    else:
+        try:
+            tags = ID3(path)
+        except ID3NoHeaderError:
+            tags = ID3()
+        if replace:
+            for frame in ("TIT2", "TPE1", "TALB", "APIC"):
+                tags.delall(frame)
+        if title:
+            tags.add(TIT2(encoding=3, text=title))
+        if artists:
+            tags.add(TPE1(encoding=3, text=artists))
+        if album:
+            tags.add(TALB(encoding=3, text=album))
+        if cover:
+            tags.add(APIC(encoding=3, mime=mime, type=3, desc="Cover", data=cover))
+        tags.save(path)
+    return True
+
+
+def encode_ncm(audio, meta=None, cover=b"", key=b"0123456789abcdef0123456789abcdef"):
+    """把音频字节封装为 NCM 容器；用于生成测试/基准数据，与 decrypt_ncm 互逆。"""
+    key_data = aes.ecb_encrypt(CORE_KEY, aes.pkcs7_pad(KEY_PREFIX + key))
+    key_data = _xor_bytes(key_data, 0x64)
+
+    meta_data = b""
+    if meta is not None:
+        plain = b"music:" + json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        meta_data = META_PREFIX + base64.b64encode(aes.ecb_encrypt(META_KEY, aes.pkcs7_pad(plain)))
+        meta_data = _xor_bytes(meta_data, 0x63)
+
+    stream = np.resize(build_key_stream(key), len(audio))
+    body = (np.frombuffer(audio, dtype=np.uint8) ^ stream).tobytes()
+    return b"".join(
+        [
+            MAGIC,
+            b"\x01\x70",
+            struct.pack("<I", len(key_data)),
+            key_data,
+            struct.pack("<I", len(meta_data)),
+            meta_data,
+            struct.pack("<I", zlib.crc32(cover) & 0xFFFFFFFF),
+            b"\x00",
+            struct.pack("<II", len(cover), len(cover)),
+            cover,
+            body,
+        ]
+    )
@@ -0,0 +1,162 @@
+# NCM 库增量同步：用 SQLite 记录每个源文件的大小、mtime、内容哈希、输出路径与状态，
+# 再次运行时只转换新增/变更的文件并重试失败项；可选清理源文件已删除的孤立输出。
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from .cache import file_hash
+
+INDEX_NAME = ".ncm_index.sqlite3"
+
+SyncPlan = namedtuple("SyncPlan", "todo unchanged orphans")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source   TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash     TEXT,
+    output   TEXT,
+    status   TEXT NOT NULL,
+    error    TEXT,
+    updated  REAL NOT NULL
+)
+"""
+
+
+def scan_ncm(src):
+    """os.scandir 递归遍历，返回 {路径: stat}；比 Path.rglob + 逐个 stat 快得多。"""
+    found = {}
+    if os.path.isfile(src):
+        if src.endswith(".ncm"):
+            found[os.path.abspath(src)] = os.stat(src)
+        return found
+    stack = [os.path.abspath(src)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".ncm"):
+                        found[entry.path] = entry.stat()
+        except OSError:
+            continue
+    return found
+
+
+def guess_output(output_dir, source):
+    """source 转换后的输出（与 ncmdump 同名的 .mp3 / .flac）；两种都有时取最近写入的。"""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    found = [os.path.join(output_dir, f"{stem}.{ext}") for ext in ("mp3", "flac")]
+    found = [path for path in found if os.path.isfile(path)]
+    return max(found, key=os.path.getmtime) if found else None
+
+
+class NcmSync:
+    def __init__(self, src, output_dir, db_path=None, retry_failed=True):
+        self.src = src
+        self.output_dir = output_dir
+        self.retry_failed = retry_failed
+        self.db_path = db_path or os.path.join(output_dir, INDEX_NAME)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute(_SCHEMA)
+        self.db.commit()
+        self._stats = {}
+
+    def close(self):
+        self.db.close()
+
+    def plan(self):
+        found = scan_ncm(self.src)
+        self._stats = found
+        rows = {
+            row[0]: row
+            for row in self.db.execute(
+                "SELECT source, size, mtime_ns, hash, output, status FROM files"
+            )
+        }
+
+        todo = []
+        unchanged = 0
+        touched = []
+        for path, st in sorted(found.items()):
+            row = rows.get(path)
+            if row is None:
+                todo.append(path)
+                continue
+            _, size, mtime_ns, digest, output, status = row
+            if status != "ok":
+                if self.retry_failed:
+                    todo.append(path)
+                else:
+                    unchanged += 1
+                continue
+            if not output or not os.path.exists(output):
+                todo.append(path)
+                continue
+            if size == st.st_size and mtime_ns == st.st_mtime_ns:
+                unchanged += 1
+                continue
+            # 大小或 mtime 变了：内容哈希相同（例如只是被 touch）则无需重新转换
+            if size == st.st_size and digest and file_hash(path) == digest:
+                touched.append((st.st_mtime_ns, time.time(), path))
+                unchanged += 1
+                continue
+            todo.append(path)
+
+        if touched:
+            self.db.executemany(
+                "UPDATE files SET mtime_ns = ?, updated = ? WHERE source = ?", touched
+            )
+            self.db.commit()
+
+        # 只有扫描整个目录时才能判断孤立项
+        orphans = []
+        if os.path.isdir(self.src):
+            root = os.path.join(os.path.abspath(self.src), "")
+            orphans = [
+                (source, row[4])
+                for source, row in rows.items()
+                if source.startswith(root) and source not in found
+            ]
+        return SyncPlan(todo, unchanged, orphans)
+
+    def record(self, event):
+        """记录一个 NcmEvent 的结果。
+
+        内置解密已在读取时登记了源文件哈希，这里的 file_hash 只是查表；ncmdump 转换的文件才需要再读一遍。
+        """
+        path = event.path
+        st = self._stats.get(path) or os.stat(path)
+        if event.success:
+            output = event.message if os.path.isfile(event.message) else guess_output(
+                self.output_dir, path
+            )
+            values = (st.st_size, st.st_mtime_ns, file_hash(path), output, "ok", None)
+        else:
+            values = (st.st_size, st.st_mtime_ns, None, None, "failed", event.message)
+        self.db.execute(
+            "INSERT OR REPLACE INTO files "
+            "(source, size, mtime_ns, hash, output, status, error, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, *values, time.time()),
+        )
+
+    def commit(self):
+        self.db.commit()
+
+    def prune(self, orphans):
+        """删除孤立输出并移出索引，返回删除的输出文件数。"""
+        removed = 0
+        for source, output in orphans:
+            if output and os.path.isfile(output):
+                try:
+                    os.remove(output)
+                    removed += 1
+                except OSError:
+                    continue
+            self.db.execute("DELETE FROM files WHERE source = ?", (source,))
+        self.db.commit()
+        return removed
@@ -0,0 +1,129 @@
+# 分块读取 PCM 采样（归一化到 ±1 的 float32），供能量分析、波形索引等只需顺序扫描的功能使用。
+# WAV 源通过 memmap 读取，其余格式由 ffmpeg 解码为单声道 PCM 流，已解码的 AudioSegment 直接使用。
+import subprocess
+
+import numpy as np
+
+from . import ffmpeg, wavfile
+
+ANALYSIS_RATE = 22050  # 非 WAV 源交给 ffmpeg 解码时的分析采样率（单声道）
+
+_INT_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+_PIPE_FORMATS = {"int16": "s16le", "int32": "s32le", "float32": "f32le"}
+
+
+def sample_format(format_tag, sample_width):
+    """返回 (dtype, 满幅值, 直流偏移)；不支持直接读取的格式（如 24 位）返回 None。"""
+    if format_tag == wavfile.WAVE_FORMAT_IEEE_FLOAT and sample_width == 4:
+        return np.float32, 1.0, 0.0
+    if format_tag == wavfile.WAVE_FORMAT_PCM and sample_width in _INT_DTYPES:
+        offset = 128.0 if sample_width == 1 else 0.0  # 8 位 PCM 为无符号
+        return _INT_DTYPES[sample_width], float(1 << (sample_width * 8 - 1)), offset
+    return None
+
+
+def _array_blocks(data, fmt, chunk_frames):
+    _, scale, offset = fmt
+    for begin in range(0, len(data), chunk_frames):
+        block = data[begin : begin + chunk_frames].astype(np.float32)
+        if offset:
+            block -= offset
+        block *= 1.0 / scale
+        yield block
+
+
+def ffmpeg_pcm_blocks(path, rate, channels, dtype, chunk_frames, filter_args=()):
+    """ffmpeg 解码并转换为指定采样率 / 声道 / 采样格式，从管道逐块产出 (帧数, 声道) 数组。
+
+    除最后一块外每块恰为 chunk_frames 帧；内存占用与文件长度无关。提前关闭生成器时结束 ffmpeg 进程。
+    """
+    dtype = np.dtype(dtype)
+    cmd = [
+        ffmpeg.ffmpeg_exe(), "-v", "error", "-nostdin", "-i", path, "-vn", *filter_args,
+        "-ac", str(channels), "-ar", str(rate), "-f", _PIPE_FORMATS[dtype.name], "-",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    frame_bytes = channels * dtype.itemsize
+    killed = False
+    try:
+        while True:
+            raw = proc.stdout.read(chunk_frames * frame_bytes)
+            if not raw:
+                break
+            raw = raw[: len(raw) - len(raw) % frame_bytes]
+            yield np.frombuffer(raw, dtype=dtype).reshape(-1, channels)
+    except GeneratorExit:
+        proc.kill()
+        killed = True
+        raise
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read().decode(errors="replace")
+        proc.stderr.close()
+        if proc.wait() != 0 and not killed:
+            raise RuntimeError(f"ffmpeg 解码失败：{stderr.strip()}")
+
+
+def ffmpeg_pcm(path, rate, channels, dtype, input_args=(), output_args=(), input=None):
+    """ffmpeg 一次解码为 (帧数, 声道) 只读数组，直接引用管道读到的字节，不复制。
+
+    input_args 放在 -i 之前（如 -ss / -t 输入端定位，区间外不解码），output_args 在其后（如 -map、-af）。
+    给定 input（已在内存中的编码数据）时从标准输入读取，path 应为 "-"。
+    """
+    dtype = np.dtype(dtype)
+    cmd = [
+        ffmpeg.ffmpeg_exe(), "-v", "error", "-nostdin", *input_args, "-i", path, "-vn", *output_args,
+        "-ac", str(channels), "-ar", str(rate), "-f", _PIPE_FORMATS[dtype.name], "-",
+    ]
+    result = subprocess.run(cmd, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg 解码失败：{result.stderr.decode(errors='replace').strip()}")
+    frames = len(result.stdout) // (channels * dtype.itemsize)
+    return np.frombuffer(result.stdout, dtype=dtype, count=frames * channels).reshape(-1, channels)
+
+
+def _ffmpeg_blocks(path, chunk_frames):
+    for block in ffmpeg_pcm_blocks(path, ANALYSIS_RATE, 1, np.int16, chunk_frames):
+        yield block.astype(np.float32) / 32768.0
+
+
+class PcmSource:
+    """sample_rate / channels 为读出数据的参数；frames 为总帧数，ffmpeg 解码时未知则为 None。"""
+
+    def __init__(self, sample_rate, channels, frames, make_blocks):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = frames
+        self._make_blocks = make_blocks
+
+    def blocks(self, chunk_frames):
+        """逐块产出 (帧数, 声道) 的 float32 数组，除最后一块外每块恰为 chunk_frames 帧。"""
+        return self._make_blocks(chunk_frames)
+
+
+def open_source(path, audio=None):
+    if audio is not None:
+        fmt = sample_format(wavfile.WAVE_FORMAT_PCM, audio.sample_width)
+        if fmt:
+            data = np.frombuffer(audio.raw_data, dtype=fmt[0]).reshape(-1, audio.channels)
+            return PcmSource(
+                audio.frame_rate, audio.channels, len(data),
+                lambda n: _array_blocks(data, fmt, n),
+            )
+
+    if wavfile.is_wav(path):
+        info = wavfile.read_wav_info(path)
+        fmt = sample_format(info.format_tag, info.sample_width)
+        if fmt:
+            frames = wavfile.frame_count(info)
+            if frames:
+                data = np.memmap(
+                    path, dtype=fmt[0], mode="r", offset=info.data_offset, shape=(frames, info.channels)
+                )
+            else:
+                data = np.zeros((0, info.channels), dtype=fmt[0])  # 空文件无法 memmap
+            return PcmSource(
+                info.sample_rate, info.channels, frames, lambda n: _array_blocks(data, fmt, n)
+            )
+
+    return PcmSource(ANALYSIS_RATE, 1, None, lambda n: _ffmpeg_blocks(path, n))
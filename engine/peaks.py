@@ -0,0 +1,198 @@
+# 波形峰值索引：按块记录 min/max，逐级合并成多分辨率金字塔，
+# 一次扫描生成后存为 sidecar 文件（<音频文件>.peaks），再次打开时直接 memmap，无需重新解码。
+import hashlib
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from . import pcmstream
+from .cache import DEFAULT_CACHE_DIR
+
+MAGIC = b"AUPEAKS1"
+VERSION = 1
+BASE_BLOCK = 256  # 第 0 级每块的采样帧数
+FACTOR = 4  # 相邻两级的块长之比
+TOP_BLOCKS = 1024  # 最粗一级不超过这么多块
+CHUNK_BLOCKS = 4096  # 每次从源读取 BASE_BLOCK * CHUNK_BLOCKS 帧
+
+# magic, 版本, 采样率, 总帧数, 基础块长, 级间倍数, 级数, 源文件大小, 源文件 mtime_ns
+_HEADER = struct.Struct("<8sHIQIHHQq")
+
+
+def sidecar_path(audio_path):
+    return audio_path + ".peaks"
+
+
+def _fallback_path(audio_path):
+    # 音频所在目录不可写时，索引放到缓存目录
+    key = hashlib.blake2b(os.path.abspath(audio_path).encode(), digest_size=16).hexdigest()
+    return os.path.join(DEFAULT_CACHE_DIR, "peaks", key + ".peaks")
+
+
+def _level_lengths(frames, levels):
+    lengths = []
+    n = -(-frames // BASE_BLOCK)
+    for _ in range(levels):
+        lengths.append(n)
+        n = -(-n // FACTOR)
+    return lengths
+
+
+def _to_int16(x):
+    return np.clip(np.rint(x * 32767.0), -32768, 32767).astype(np.int16)
+
+
+def _reduce(peaks, factor):
+    """把 (n, 2) 的 [min, max] 每 factor 块合并为一块，末尾不足的部分单独合并。"""
+    full = len(peaks) // factor * factor
+    head = peaks[:full].reshape(-1, factor, 2)
+    out = np.empty((-(-len(peaks) // factor), 2), dtype=peaks.dtype)
+    out[: len(head), 0] = head[:, :, 0].min(axis=1)
+    out[: len(head), 1] = head[:, :, 1].max(axis=1)
+    if full < len(peaks):
+        out[-1, 0] = peaks[full:, 0].min()
+        out[-1, 1] = peaks[full:, 1].max()
+    return out
+
+
+class PeakIndex:
+    def __init__(self, sample_rate, frames, levels, path=None):
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.levels = levels  # levels[k] 为 (块数, 2) 的 int16 数组，每块 BASE_BLOCK * FACTOR**k 帧
+        self.path = path
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def block_frames(self, level):
+        return BASE_BLOCK * FACTOR**level
+
+    def peaks(self, start, end, width):
+        """返回 [start, end) 秒范围内约 width 列的 (mins, maxs)，取值为 ±1 的 float32。
+
+        选择块长不超过每列帧数的最粗一级，再用 reduceat 合并到 width 列，
+        因此无论文件多长、缩放到哪一级，每次只读取 O(width) 量级的数据。
+        """
+        width = max(1, int(width))
+        start = max(0.0, start)
+        end = min(self.duration, end)
+        if end <= start or not self.levels:
+            empty = np.zeros(0, dtype=np.float32)
+            return empty, empty
+
+        frames_per_col = (end - start) * self.sample_rate / width
+        level = 0
+        while level + 1 < len(self.levels) and self.block_frames(level + 1) <= frames_per_col:
+            level += 1
+        bs = self.block_frames(level)
+        b0 = int(start * self.sample_rate) // bs
+        b1 = max(b0 + 1, -(-int(end * self.sample_rate) // bs))
+        data = np.asarray(self.levels[level][b0:b1])
+        if len(data) > width:
+            edges = np.linspace(0, len(data), width + 1).astype(np.intp)[:-1]
+            mins = np.minimum.reduceat(data[:, 0], edges)
+            maxs = np.maximum.reduceat(data[:, 1], edges)
+        else:
+            mins, maxs = data[:, 0], data[:, 1]
+        scale = np.float32(1 / 32768)
+        return mins.astype(np.float32) * scale, maxs.astype(np.float32) * scale
+
+    # --- 生成与读写 ---
+
+    @classmethod
+    def build(cls, path, audio=None, progress=None):
+        """扫描一遍音频生成索引；progress(已读帧数, 总帧数) 在总帧数已知时调用。"""
+        source = pcmstream.open_source(path, audio)
+        chunk = BASE_BLOCK * CHUNK_BLOCKS
+        base = []
+        frames = 0
+        for block in source.blocks(chunk):
+            frames += len(block)
+            # 各声道合并取 min/max
+            full = len(block) // BASE_BLOCK * BASE_BLOCK
+            if full:
+                x = block[:full].reshape(-1, BASE_BLOCK * block.shape[1])
+                base.append(np.stack([_to_int16(x.min(axis=1)), _to_int16(x.max(axis=1))], axis=1))
+            if full < len(block):
+                tail = block[full:]
+                base.append(_to_int16(np.array([[tail.min(), tail.max()]], dtype=np.float32)))
+            if progress and source.frames:
+                progress(frames, source.frames)
+
+        level = np.concatenate(base) if base else np.zeros((0, 2), dtype=np.int16)
+        levels = [level]
+        while len(level) > TOP_BLOCKS:
+            level = _reduce(level, FACTOR)
+            levels.append(level)
+        return cls(source.sample_rate, frames, levels)
+
+    def save(self, out_path, audio_path):
+        st = os.stat(audio_path)
+        header = _HEADER.pack(
+            MAGIC, VERSION, self.sample_rate, self.frames, BASE_BLOCK, FACTOR,
+            len(self.levels), st.st_size, st.st_mtime_ns,
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(out_path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                for level in self.levels:
+                    f.write(np.ascontiguousarray(level, dtype="<i2").tobytes())
+            os.replace(tmp, out_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.path = out_path
+
+    @classmethod
+    def open(cls, index_path, audio_path=None):
+        """memmap 打开索引；文件无效或与源音频（大小 / mtime）不一致时返回 None。"""
+        try:
+            with open(index_path, "rb") as f:
+                head = f.read(_HEADER.size)
+        except OSError:
+            return None
+        if len(head) < _HEADER.size:
+            return None
+        magic, version, rate, frames, base, factor, n_levels, size, mtime = _HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or base != BASE_BLOCK or factor != FACTOR:
+            return None
+        if audio_path is not None:
+            st = os.stat(audio_path)
+            if st.st_size != size or st.st_mtime_ns != mtime:
+                return None
+
+        lengths = _level_lengths(frames, n_levels)
+        if os.path.getsize(index_path) != _HEADER.size + 4 * sum(lengths):
+            return None
+        levels = []
+        if frames:
+            data = np.memmap(index_path, dtype="<i2", mode="r", offset=_HEADER.size)
+            data = data.reshape(-1, 2)
+            pos = 0
+            for n in lengths:
+                levels.append(data[pos : pos + n])
+                pos += n
+        return cls(rate, frames, levels, index_path)
+
+
+def load_or_build(audio_path, audio=None, progress=None):
+    """优先打开有效的 sidecar 索引，否则生成并保存（音频目录不可写时存到缓存目录）。"""
+    for path in (sidecar_path(audio_path), _fallback_path(audio_path)):
+        index = PeakIndex.open(path, audio_path)
+        if index is not None:
+            return index
+
+    index = PeakIndex.build(audio_path, audio, progress)
+    for path in (sidecar_path(audio_path), _fallback_path(audio_path)):
+        try:
+            index.save(path, audio_path)
+            break
+        except OSError:
+            continue
+    return index
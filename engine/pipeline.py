@@ -0,0 +1,326 @@
+# 声明式处理流水线：一份 JSON / YAML 描述“源 -> 提取音轨 -> 剪切 -> 混音 -> 输出”，
+# 源文件只解码一次（ffmpeg 直接解码到内存，开头的剪切区间下推为输入端 -ss / -t，区间外不解码；
+# 已是目标格式的 WAV 直接内存映射），各阶段在 NumPy 数组上完成，最后只编码一次
+# （WAV 直接写，其余格式经标准输入交给 ffmpeg），全程没有中间文件。
+# 输入可以是通配符，展开后的实例由进程池并行执行；混音用的伴奏只解码一次，经 PCMCache 在进程间共享。
+#
+#     format: {rate: 44100, channels: 2}          # 可选，sample_format 可为 s16 / s32 / f32
+#     jobs:
+#       - input: videos/*.mp4
+#         stages:
+#           - extract: {track: 0}                   # 可选，必须是第一个阶段
+#           - cut: {start: 10, end: 40}
+#           - mix: {with: backing.mp3, db: 2, with_db: -2, lufs: -16, limiter: true}
+#         output: out/{name}_clip.mp3               # {name} 为输入文件名（不含扩展名），{index} 为序号
+#
+# 相对路径以描述文件所在目录为基准。
+import glob
+import json
+import os
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from . import ffmpeg, loudness, metrics, mixer, pcmstream, resample, wavfile
+from .extractor import ENCODE_ARGS as _EXTRACT_ENCODE_ARGS
+from .tasks import TaskRunner
+
+ENCODE_ARGS = {**_EXTRACT_ENCODE_ARGS, "flac": ["-c:a", "flac"]}
+OUTPUT_FORMATS = ("wav", *sorted(k for k in ENCODE_ARGS if k != "wav"))
+
+CutStage = namedtuple("CutStage", "start end")
+MixStage = namedtuple("MixStage", "path db with_db lufs limiter pad")
+# window 为下推到解码的 (开始, 结束) 秒，结束为 None 表示到结尾；stages 为其余阶段
+Instance = namedtuple("Instance", "index source output track window stages")
+PipelineEvent = namedtuple("PipelineEvent", "index total source output error skipped elapsed")
+
+
+# --- 解析描述 ---
+
+
+def load_spec(path):
+    """读取 .json / .yaml / .yml 描述文件，返回 (描述, 所在目录)。"""
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("读取 YAML 描述需要安装 PyYAML（pip install pyyaml），或改用 JSON")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    return spec, os.path.dirname(os.path.abspath(path))
+
+
+def parse_format(spec):
+    """描述中的 format -> resample.AudioFormat；省略的字段取混音默认值。"""
+    spec = spec or {}
+    sample_format = spec.get("sample_format")
+    if sample_format is not None and sample_format not in resample.SAMPLE_FORMATS:
+        raise ValueError(f"未知的采样格式：{sample_format}")
+    return resample.AudioFormat(
+        int(spec.get("rate", mixer.FRAME_RATE)),
+        int(spec.get("channels", mixer.CHANNELS)),
+        resample.SAMPLE_FORMATS[sample_format] if sample_format else None,
+    )
+
+
+def _parse_stage(item, base_dir):
+    if not isinstance(item, dict) or len(item) != 1:
+        raise ValueError(f"每个阶段应写成 {{名称: 参数}}：{item!r}")
+    kind, params = next(iter(item.items()))
+    params = params or {}
+    if kind == "extract":
+        return "extract", int(params.get("track", 0))
+    if kind == "cut":
+        start = float(params.get("start", 0.0))
+        end = params.get("end")
+        end = None if end is None else float(end)
+        if start < 0 or (end is not None and end <= start):
+            raise ValueError(f"无效的剪切区间：{start} - {end}")
+        return "cut", CutStage(start, end)
+    if kind == "mix":
+        if "with" not in params:
+            raise ValueError("mix 阶段需要 with（伴奏文件）")
+        lufs = params.get("lufs")
+        return "mix", MixStage(
+            os.path.join(base_dir, params["with"]),
+            float(params.get("db", 0.0)),
+            float(params.get("with_db", 0.0)),
+            None if lufs is None else float(lufs),
+            bool(params.get("limiter", False)),
+            bool(params.get("pad", False)),
+        )
+    raise ValueError(f"未知的阶段：{kind}（可用 extract / cut / mix）")
+
+
+def _expand_input(pattern, base_dir):
+    pattern = os.path.join(base_dir, pattern)
+    if glob.has_magic(pattern):
+        return sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return [pattern]
+
+
+def expand(spec, base_dir="."):
+    """把描述展开为 Instance 列表（按 jobs 顺序、每个 job 内按文件名排序）。"""
+    jobs = spec.get("jobs") if "jobs" in spec else [spec]
+    instances = []
+    for job in jobs:
+        if "input" not in job or "output" not in job:
+            raise ValueError("每个 job 都需要 input 和 output")
+        stages = [_parse_stage(item, base_dir) for item in job.get("stages", [])]
+        track = None
+        if stages and stages[0][0] == "extract":
+            track = stages.pop(0)[1]
+        if any(kind == "extract" for kind, _ in stages):
+            raise ValueError("extract 只能是第一个阶段")
+        window = None
+        if stages and stages[0][0] == "cut":
+            window = stages.pop(0)[1]
+        ext = os.path.splitext(job["output"])[1].lower().lstrip(".")
+        if ext not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式：{ext}（可用 {' / '.join(OUTPUT_FORMATS)}）")
+
+        sources = _expand_input(job["input"], base_dir)
+        if not sources:
+            raise ValueError(f"没有匹配 {job['input']} 的文件")
+        for source in sources:
+            index = len(instances) + 1
+            name = os.path.splitext(os.path.basename(source))[0]
+            output = os.path.join(base_dir, job["output"].format(name=name, index=index))
+            instances.append(
+                Instance(index, source, output, track, window, tuple(s for _, s in stages))
+            )
+
+    outputs = [inst.output for inst in instances]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("多个实例输出到同一文件，请在 output 中使用 {name} 或 {index}")
+    return instances
+
+
+# --- 执行 ---
+
+
+def decode(path, fmt, quality=resample.DEFAULT_QUALITY, track=None, window=None):
+    """把 path（音频或视频）的 window 区间解码为 fmt 格式的 (帧数, 声道) 数组。
+
+    未指定音轨的 WAV 直接内存映射并切片；其余交给一个 ffmpeg 进程，fmt.dtype 为 None 时解码为 16 位。
+    """
+    start, end = window if window is not None else (0.0, None)
+    metrics.count("input_bytes", os.path.getsize(path))
+    mapped = mixer._map_wav(path) if track is None else None
+    if mapped is not None:
+        data, rate = mapped
+        first = min(len(data), int(round(start * rate)))
+        last = len(data) if end is None else min(len(data), int(round(end * rate)))
+        with metrics.stage("resample"):
+            return resample.convert(data[first:last], rate, fmt, quality)
+
+    dtype = np.dtype(fmt.dtype) if fmt.dtype is not None else np.dtype(np.int16)
+    input_args = ["-ss", f"{start:.6f}"] if start else []
+    if end is not None:
+        input_args += ["-t", f"{end - start:.6f}"]
+    output_args = ["-map", f"0:a:{track or 0}"]
+    if quality == "hq":
+        output_args += ["-af", mixer._FFMPEG_HQ_RESAMPLE.format(rate=fmt.rate)]
+    with metrics.stage("decode"):
+        return pcmstream.ffmpeg_pcm(path, fmt.rate, fmt.channels, dtype, input_args, output_args)
+
+
+def encode(data, rate, out_path):
+    """按扩展名写出：WAV 直接写文件，其余格式经标准输入交给 ffmpeg 编码。"""
+    ext = os.path.splitext(out_path)[1].lower().lstrip(".")
+    if ext == "wav":
+        with metrics.stage("encode"):
+            wavfile.write_wav_array(out_path, data, rate)
+    else:
+        data = np.ascontiguousarray(data)
+        pipe_format = pcmstream._PIPE_FORMATS[data.dtype.name]
+        ffmpeg.run_ffmpeg(
+            ["-f", pipe_format, "-ar", str(rate), "-ac", str(data.shape[1]), "-i", "-",
+             *ENCODE_ARGS[ext], out_path],
+            input=data.tobytes(),
+            stage="encode",
+        )
+    metrics.count("output_frames", len(data))
+    return out_path
+
+
+def _apply_cut(data, stage, rate):
+    first = min(len(data), int(round(stage.start * rate)))
+    last = len(data) if stage.end is None else min(len(data), int(round(stage.end * rate)))
+    return data[first:last]
+
+
+def _apply_mix(data, stage, backing, backing_lufs, rate):
+    dtype = mixer._common_dtype([data.dtype, backing.dtype])
+    data = resample.convert_dtype(data, dtype)
+    backing = resample.convert_dtype(backing, dtype)
+    db, with_db = stage.db, stage.with_db
+    if stage.lufs is not None:
+        with metrics.stage("loudness"):
+            db += loudness.gain_to_target(loudness.integrated_loudness(data, rate), stage.lufs)
+        with_db += loudness.gain_to_target(backing_lufs, stage.lufs)
+    length = (max if stage.pad else min)(len(data), len(backing))
+    with metrics.stage("mix"):
+        return mixer.mix_stems([backing, data], [with_db, db], length=length, limiter=stage.limiter)
+
+
+def run_instance(inst, fmt, quality, backings):
+    """执行单个实例，返回输出路径。backings 为 {伴奏路径: (数组, 响度 LUFS 或 None)}。"""
+    data = decode(inst.source, fmt, quality, inst.track, inst.window)
+    for stage in inst.stages:
+        if isinstance(stage, CutStage):
+            data = _apply_cut(data, stage, fmt.rate)
+        else:
+            backing, backing_lufs = backings[stage.path]
+            data = _apply_mix(data, stage, backing, backing_lufs, fmt.rate)
+    os.makedirs(os.path.dirname(inst.output) or ".", exist_ok=True)
+    return encode(data, fmt.rate, inst.output)
+
+
+# --- 进程池 ---
+# 伴奏在主进程里解码写入 PCMCache，工作进程初始化时内存映射对应的 .npy。
+
+_worker_backings = None
+
+
+def _init_pipeline_worker(backing_npys):
+    global _worker_backings
+    _worker_backings = {
+        path: (np.load(npy, mmap_mode="r"), lufs) for path, (npy, lufs) in backing_npys.items()
+    }
+
+
+def _pipeline_worker(inst, fmt, quality):
+    t0 = time.perf_counter()
+    output, snap = metrics.run_collected(run_instance, inst, fmt, quality, _worker_backings)
+    return output, snap, time.perf_counter() - t0
+
+
+class PipelineJob(TaskRunner):
+    """并行执行展开后的实例；resume 为 True 时跳过输出比源文件和伴奏都新的实例。"""
+
+    metrics_name = "pipeline"
+
+    def __init__(
+        self,
+        instances,
+        fmt=mixer.DEFAULT_FORMAT,
+        quality=resample.DEFAULT_QUALITY,
+        workers=None,
+        cache=None,
+        resume=False,
+    ):
+        super().__init__(len(instances))
+        self.instances = instances
+        self.fmt = fmt
+        self.quality = quality
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self.resume = resume
+
+    def _prepare_backings(self, cache):
+        """每个伴奏只解码一次，返回 {伴奏路径: (.npy 路径, 响度或 None)}。"""
+        need_lufs = {}
+        for inst in self.instances:
+            for stage in inst.stages:
+                if isinstance(stage, MixStage):
+                    need_lufs[stage.path] = need_lufs.get(stage.path, False) or stage.lufs is not None
+        backings = {}
+        for path, want_lufs in need_lufs.items():
+            self.check_cancelled()
+            key = mixer._cache_key(cache, path, self.fmt, self.quality)
+            data = mixer.load_instrumental(path, cache, self.fmt, self.quality)
+            lufs = mixer.instrumental_loudness(data, key, cache, self.fmt.rate) if want_lufs else None
+            backings[path] = (cache.path(key), lufs)
+        return backings
+
+    def run(self):
+        tmp_dir = None
+        try:
+            cache = self.cache
+            if cache is None:
+                from .cache import PCMCache
+
+                tmp_dir = tempfile.TemporaryDirectory()
+                cache = PCMCache(tmp_dir.name)
+            self._dispatch(self._prepare_backings(cache))
+        finally:
+            if tmp_dir is not None:
+                tmp_dir.cleanup()
+
+    def _dispatch(self, backing_npys):
+        total = self.total
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_pipeline_worker, initargs=(backing_npys,)
+        )
+        try:
+            futures = {}
+            for inst in self.instances:
+                backing_paths = [s.path for s in inst.stages if isinstance(s, MixStage)]
+                if self.resume and mixer.is_up_to_date(inst.output, inst.source, *backing_paths):
+                    self.advance(PipelineEvent(inst.index, total, inst.source, inst.output, None, True, 0.0))
+                    continue
+                futures[pool.submit(_pipeline_worker, inst, self.fmt, self.quality)] = inst
+
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=0.2)
+                for fut in finished:
+                    inst = futures[fut]
+                    try:
+                        output, snap, elapsed = fut.result()
+                        self.metrics.merge(snap)
+                        error = None
+                    except Exception as e:
+                        output, error, elapsed = None, str(e), 0.0
+                    self.advance(
+                        PipelineEvent(inst.index, total, inst.source, output, error, False, elapsed)
+                    )
+                self.check_cancelled()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,212 @@
+# 只读头部的媒体探测：WAV 读 RIFF 块、FLAC 读 STREAMINFO、MP3 读首帧与 Xing/Info/VBRI 标签，
+# 不扫描帧、不解码；其他格式（视频容器、M4A 等）交给 ffprobe。
+# 结果按 (路径, 大小, mtime) 存入 SQLite 探测缓存，文件未改动时再次打开只是一次查询，
+# 批量任务可在解码前先拿到所有输入的时长，用于规划截断长度、分段边界和任务分配。
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+from . import ffmpeg, flacframes, metrics, mp3frames, wavfile
+from .cache import DEFAULT_CACHE_DIR
+
+DEFAULT_PROBE_CACHE = os.path.join(DEFAULT_CACHE_DIR, "probe.sqlite3")
+_MP3_HEAD_BYTES = 16 << 10  # 首帧（含 Xing 标签）之前最多允许的垃圾数据
+_MEMO_LIMIT = 4096
+
+# frames 为采样帧数，只有头部给出精确长度时才有值（ffprobe / 无 Xing 标签的 MP3 为 None）
+MediaInfo = namedtuple("MediaInfo", "duration sample_rate channels codec frames streams")
+StreamInfo = namedtuple("StreamInfo", "index kind codec channels sample_rate language")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    info     TEXT NOT NULL
+)
+"""
+
+
+def _audio_info(codec, rate, channels, frames):
+    stream = StreamInfo(0, "audio", codec, channels, rate, "")
+    return MediaInfo(frames / rate if rate else 0.0, rate, channels, codec, frames, (stream,))
+
+
+def probe_wav(path):
+    info = wavfile.read_wav_info(path)
+    bits = info.sample_width * 8
+    if info.format_tag == wavfile.WAVE_FORMAT_IEEE_FLOAT:
+        codec = f"pcm_f{bits}le"
+    else:
+        codec = "pcm_u8" if bits == 8 else f"pcm_s{bits}le"
+    return _audio_info(codec, info.sample_rate, info.channels, wavfile.frame_count(info))
+
+
+def probe_flac(path):
+    si = flacframes.read_streaminfo(path)
+    if not si.total_samples:
+        return None  # 编码器没有写入总长度，只能交给 ffprobe
+    return _audio_info("flac", si.sample_rate, si.channels, si.total_samples)
+
+
+def probe_mp3(path):
+    """读 ID3v2 之后的首帧；有 Xing/Info/VBRI 帧数时精确计算长度，否则按首帧码率估算（CBR 准确）。"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        start = mp3frames._id3v2_size(head)
+        f.seek(start)
+        buf = f.read(_MP3_HEAD_BYTES)
+        f.seek(max(0, size - 128))
+        has_id3v1 = f.read(3) == b"TAG"
+    found = mp3frames.find_first_frame(buf)
+    if found is None:
+        raise ValueError(f"未找到 MP3 帧：{path}")
+    pos, first = found
+    channels = 1 if (int.from_bytes(buf[pos : pos + 4], "big") >> 6) & 3 == 3 else 2
+    codec = f"mp{first.layer}"
+    tag = mp3frames.read_info_tag(buf, pos)
+    if tag is not None and tag.frames:
+        frames = mp3frames.decoded_samples(tag.frames, first.samples, tag.encoder, tag.delay, tag.padding)
+        return _audio_info(codec, first.sample_rate, channels, frames)
+    audio_bytes = size - start - pos - (128 if has_id3v1 else 0)
+    if tag is not None:
+        audio_bytes -= first.size
+    info = _audio_info(codec, first.sample_rate, channels, 0)
+    return info._replace(duration=max(0, audio_bytes) * 8.0 / first.bitrate, frames=None)
+
+
+def probe_ffprobe(path):
+    info = ffmpeg.ffprobe_json(
+        path,
+        "-show_entries",
+        "format=duration:stream=index,codec_type,codec_name,channels,sample_rate,duration"
+        ":stream_tags=language",
+    )
+    streams = tuple(
+        StreamInfo(
+            s["index"],
+            s.get("codec_type", ""),
+            s.get("codec_name", ""),
+            s.get("channels", 0),
+            int(s.get("sample_rate") or 0),
+            s.get("tags", {}).get("language", ""),
+        )
+        for s in info.get("streams", [])
+    )
+    duration = info.get("format", {}).get("duration")
+    if duration is None:  # 部分容器只在流上给出时长
+        duration = max((float(s.get("duration") or 0) for s in info.get("streams", [])), default=0.0)
+    audio = next((s for s in streams if s.kind == "audio"), None)
+    return MediaInfo(
+        float(duration),
+        audio.sample_rate if audio else 0,
+        audio.channels if audio else 0,
+        audio.codec if audio else "",
+        None,
+        streams,
+    )
+
+
+def probe_headers(path):
+    """不经缓存直接探测；原生解析失败或无法给出长度时回退到 ffprobe。"""
+    with open(path, "rb") as f:
+        head = f.read(12)
+    native = None
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        native = probe_wav
+    elif head[:4] == flacframes.MAGIC:
+        native = probe_flac
+    elif os.path.splitext(path)[1].lower() == ".mp3" or head[:3] == b"ID3":
+        native = probe_mp3
+    if native is not None:
+        try:
+            info = native(path)
+        except (ValueError, OSError):
+            info = None
+        if info is not None:
+            return info
+    return probe_ffprobe(path)
+
+
+class ProbeCache:
+    """持久化的探测结果；文件以绝对路径 + 大小 + mtime 识别。可跨线程、跨进程使用。"""
+
+    def __init__(self, db_path=DEFAULT_PROBE_CACHE):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.db:
+            self.db.execute(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def get(self, path, size, mtime_ns):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT info FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+        if row is None:
+            return None
+        d = json.loads(row[0])
+        return MediaInfo(**{**d, "streams": tuple(StreamInfo(*s) for s in d["streams"])})
+
+    def put(self, path, size, mtime_ns, info):
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, json.dumps(info._asdict())),
+            )
+
+
+_memo = {}
+_default = None
+_default_lock = threading.Lock()
+
+
+def _default_cache():
+    global _default
+    with _default_lock:
+        if _default is None:
+            try:
+                _default = ProbeCache()
+            except (sqlite3.Error, OSError):  # 缓存目录不可写时只用进程内缓存
+                _default = False
+    return _default or None
+
+
+def probe(path, cache=None):
+    """返回 MediaInfo。cache 为 None 时使用默认的持久化缓存，为 False 时只用进程内缓存。"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    info = _memo.get(key)
+    if info is not None:
+        return info
+    db = _default_cache() if cache is None else cache or None
+    info = db.get(*key) if db else None
+    if info is None:
+        with metrics.stage("probe"):
+            info = probe_headers(path)
+        if db:
+            db.put(*key, info)
+    if len(_memo) >= _MEMO_LIMIT:
+        _memo.clear()
+    _memo[key] = info
+    return info
+
+
+def durations(paths, cache=None):
+    """{路径: 时长（秒）}；无法探测的文件不在结果中。供批量任务在解码前规划工作量。"""
+    out = {}
+    for path in paths:
+        try:
+            out[path] = probe(path, cache).duration
+        except (OSError, ValueError, RuntimeError):
+            continue
+    return out
@@ -0,0 +1,167 @@
+# 采样率 / 声道 / 采样格式转换：取代 pydub 的 set_frame_rate / set_channels（audioop.ratecv，单线程、无抗混叠滤波）。
+# 重采样为有理数比例 up/down 的多相 Kaiser 窗 sinc 滤波器：每 down 个输入产生 up 个输出，
+# 把所有相位的系数排成 (down + K, up) 的矩阵，一块数据只需一次矩阵乘法（BLAS）。
+# 输入已是目标格式时原样返回，不做任何复制。
+import functools
+import math
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 质量档位 -> (每相位基础抽头数, Kaiser β, 截止频率相对目标奈奎斯特频率的比例)
+# 44.1k -> 48k 的 1 kHz 正弦，滤波器本身的信噪比约为 fast 68 dB、hq 110 dB（hq 在 18 kHz 以下不低于 100 dB）；
+# 16 位输出时 hq 受量化噪声限制，-6 dBFS 正弦约 88 dB。见 benchmarks/bench_resample.py。
+QUALITIES = {
+    "fast": (16, 6.0, 0.90),
+    "hq": (64, 10.0, 0.95),
+}
+DEFAULT_QUALITY = "fast"
+MAX_PHASES = 1024  # up 超过此值（如 44100 -> 44101）时滤波器组过大，不支持
+BLOCK_FRAMES = 1 << 15  # 每次计算的输出帧数
+
+SAMPLE_FORMATS = {"s16": np.dtype(np.int16), "s32": np.dtype(np.int32), "f32": np.dtype(np.float32)}
+
+# rate / channels / dtype 为 None 的字段表示保持源文件的值
+AudioFormat = namedtuple("AudioFormat", "rate channels dtype", defaults=(None, None, None))
+
+
+@functools.lru_cache(maxsize=16)
+def _filter_bank(up, down, quality):
+    """返回 (up, K) 的多相系数：第 m 行对应输出位置小数部分为 (m * down % up) / up 的相位。"""
+    taps, beta, rolloff = QUALITIES[quality]
+    ratio = min(1.0, up / down)
+    half = max(2, math.ceil(taps / ratio / 2))  # 降采样时滤波器按比例加宽
+    k = np.arange(2 * half)
+    frac = (np.arange(up) * down % up) / up
+    t = frac[:, None] + (half - 1) - k[None, :]  # 相对输出时刻的输入采样偏移
+    fc = rolloff * ratio
+    window = np.i0(beta * np.sqrt(np.clip(1 - (t / half) ** 2, 0, None))) / np.i0(beta)
+    bank = fc * np.sinc(fc * t) * window
+    bank /= bank.sum(axis=1, keepdims=True)  # 各相位直流增益为 1
+    return bank
+
+
+@functools.lru_cache(maxsize=16)
+def _phase_matrix(up, down, quality, dtype):
+    """(down + K 左右, up) 的矩阵：第 m 列是第 m 个相位的系数，放在该相位窗口起点对应的行上。"""
+    bank = _filter_bank(up, down, quality)
+    width = bank.shape[1]
+    offsets = np.arange(up) * down // up
+    matrix = np.zeros((offsets[-1] + width, up), dtype)
+    for m in range(up):
+        matrix[offsets[m] : offsets[m] + width, m] = bank[m]
+    return matrix
+
+
+def resample(data, src_rate, dst_rate, quality=DEFAULT_QUALITY, block_frames=BLOCK_FRAMES):
+    """(帧数, 声道) 数组的采样率转换，输出帧数为 ceil(帧数 * dst / src)。
+
+    16 位及以下的整型、float32 输入按 float32 计算（误差远低于 16 位量化噪声），其余按 float64；
+    返回值为计算所用的浮点类型，量纲与输入相同。
+    """
+    if quality not in QUALITIES:
+        raise ValueError(f"未知的重采样质量：{quality}")
+    g = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    if up > MAX_PHASES:
+        raise ValueError(f"不支持的采样率转换：{src_rate} -> {dst_rate}")
+    work = np.float32 if data.dtype.itemsize <= 2 or data.dtype == np.float32 else np.float64
+    matrix = _phase_matrix(up, down, quality, work)
+    span = matrix.shape[0]
+    width = _filter_bank(up, down, quality).shape[1]
+    frames, channels = data.shape
+    n_out = -(-frames * up // down)
+    periods = -(-n_out // up)  # 每个周期 up 个输出，消耗 down 个输入
+
+    # 按声道分行存放；第 q 个周期的输入窗口为 padded[:, q * down : q * down + span]
+    padded = np.zeros((channels, periods * down + span), work)
+    pad_left = width // 2 - 1
+    padded[:, pad_left : pad_left + frames] = data.T
+    out = np.empty((channels, periods, up), work)
+    chunk = max(1, block_frames // up)
+    for q0 in range(0, periods, chunk):
+        q1 = min(periods, q0 + chunk)
+        seg = padded[:, q0 * down : (q1 - 1) * down + span]
+        windows = sliding_window_view(seg, span, axis=1)[:, ::down]
+        # 窗口之间重叠，先复制成连续数组才能走 BLAS
+        np.matmul(np.ascontiguousarray(windows), matrix, out=out[:, q0:q1])
+    return out.reshape(channels, -1)[:, :n_out].T
+
+
+def convert_channels(data, channels):
+    have = data.shape[1]
+    if have == channels:
+        return data
+    if channels == 1:
+        # 下混为单声道取平均；整型保持源位宽（四舍五入并饱和，与 audioop.tomono 相同），否则会被当成归一化浮点
+        mono = data.mean(axis=1, keepdims=True, dtype=np.float64)
+        if data.dtype.kind != "i":
+            return mono.astype(data.dtype)
+        info = np.iinfo(data.dtype)
+        np.rint(mono, out=mono)
+        np.clip(mono, info.min, info.max, out=mono)
+        return mono.astype(data.dtype)
+    if have == 1:
+        return np.repeat(data, channels, axis=1)
+    raise ValueError(f"不支持的声道转换：{have} -> {channels}")
+
+
+def _scale(dtype):
+    return float(1 << (8 * dtype.itemsize - 1))
+
+
+def convert_dtype(data, dtype):
+    """整型 / 浮点之间的采样格式转换；整型之间按位移（与 audioop.lin2lin 相同），浮点 -> 整型四舍五入并饱和。"""
+    dtype = np.dtype(dtype)
+    src = data.dtype
+    if src == dtype:
+        return data
+    if src.kind == "i" and dtype.kind == "i":
+        shift = 8 * (dtype.itemsize - src.itemsize)
+        if shift > 0:
+            return np.left_shift(data.astype(dtype), shift)
+        return np.right_shift(data, -shift).astype(dtype)
+    if dtype.kind == "f":
+        if src.kind == "f":
+            return data.astype(dtype)
+        return (data * (1.0 / _scale(src))).astype(dtype)
+    # 浮点 -> 整型
+    scale = _scale(dtype)
+    out = np.rint(np.asarray(data, dtype=np.float64) * scale)
+    np.clip(out, -scale, scale - 1, out=out)
+    return out.astype(dtype)
+
+
+def _from_float(data, dtype):
+    """把 resample 输出的浮点数组（与源数组同一量纲）还原为 dtype。"""
+    if dtype.kind == "f":
+        return data.astype(dtype)
+    info = np.iinfo(dtype)
+    data = np.rint(data)
+    np.clip(data, info.min, info.max, out=data)
+    return data.astype(dtype)
+
+
+def needs_conversion(src_rate, src_channels, src_dtype, fmt):
+    return (
+        (fmt.rate is not None and fmt.rate != src_rate)
+        or (fmt.channels is not None and fmt.channels != src_channels)
+        or (fmt.dtype is not None and np.dtype(fmt.dtype) != src_dtype)
+    )
+
+
+def convert(data, src_rate, fmt, quality=DEFAULT_QUALITY):
+    """把 (帧数, 声道) 数组转换为 fmt 指定的格式；已匹配时原样返回输入数组。"""
+    if not needs_conversion(src_rate, data.shape[1], data.dtype, fmt):
+        return data
+    dtype = np.dtype(fmt.dtype) if fmt.dtype is not None else data.dtype
+    channels = fmt.channels or data.shape[1]
+    # 下混放在重采样之前、上混放在之后，减少滤波的声道数
+    if channels < data.shape[1]:
+        data = convert_channels(data, channels)
+    if fmt.rate is not None and fmt.rate != src_rate:
+        src_dtype = data.dtype
+        data = _from_float(resample(data, src_rate, fmt.rate, quality), src_dtype)
+    data = convert_channels(data, channels)
+    return convert_dtype(data, dtype)
@@ -0,0 +1,134 @@
+# 后台任务：在工作线程里执行，进度事件放入线程安全的队列，
+# GUI 用 after() 定时 poll()，CLI 用带超时的 poll()，调用方都不会被阻塞。
+import contextlib
+import queue
+import threading
+import time
+
+from . import metrics
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class TaskRunner:
+    """后台任务基类：子类实现 run()，每完成一项调用 advance(event)。
+
+    run() 中应定期调用 check_cancelled()（或通过 report() 间接调用）以响应取消。
+    各处理阶段的耗时记入 self.metrics（见 engine.metrics）；创建任务时已有收集器生效
+    （如 CLI 的 --metrics）则沿用它，否则每个任务单独收集。
+    """
+
+    metrics_name = "task"
+
+    def __init__(self, total=0):
+        self.total = total
+        self.completed = 0
+        self.events = queue.Queue()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.done = False
+        self.started_at = None
+        self.finished_at = None
+        self.metrics = metrics.active() or metrics.Metrics()
+        self.profiler = metrics.active_profiler()
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def run(self):
+        raise NotImplementedError
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._main, daemon=True)
+        self._thread.start()
+        return self
+
+    def _main(self):
+        profiling = self.profiler.thread() if self.profiler else contextlib.nullcontext()
+        try:
+            with metrics.collecting(self.metrics, self.profiler), profiling:
+                self.result = self.run()
+        except TaskCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            if self._cancel_event.is_set():
+                self.cancelled = True
+            self.finished_at = time.perf_counter()
+            self.metrics.set(f"{self.metrics_name}_seconds", self.elapsed)
+            self.metrics.set(f"{self.metrics_name}_items", self.completed)
+            self.done = True
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def is_cancelling(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+    def advance(self, event=None):
+        self.completed += 1
+        if event is not None:
+            self.events.put(event)
+
+    def report(self, done, total):
+        """供引擎函数作为 progress 回调使用；任务已取消时抛出 TaskCancelled。"""
+        self.completed = done
+        self.total = total
+        self.check_cancelled()
+
+    def poll(self, timeout=0):
+        """取出目前已产生的事件；timeout 为 0 时立即返回。"""
+        events = []
+        try:
+            events.append(self.events.get(timeout=timeout) if timeout else self.events.get_nowait())
+            while True:
+                events.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def wait(self):
+        if self._thread:
+            self._thread.join()
+
+    @property
+    def finished(self):
+        """任务已结束且所有事件都已取走。"""
+        return self.done and self.events.empty()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def rate(self):
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed else 0.0
+
+    def eta(self):
+        """预计剩余秒数；尚无完成项时返回 None。"""
+        rate = self.rate()
+        if not rate or not self.total:
+            return None
+        return max(0.0, (self.total - self.completed) / rate)
+
+
+class FunctionTask(TaskRunner):
+    """把普通函数放到后台执行：fn 接收任务本身，可把 task.report 作为进度回调传下去。"""
+
+    def __init__(self, fn, total=0):
+        super().__init__(total)
+        self.fn = fn
+
+    def run(self):
+        return self.fn(self)
@@ -0,0 +1,486 @@
+# 监视文件夹守护进程：定期（或在 inotify 通知时）扫描输入目录，把新出现且已写完的文件
+# 作为混音 / 提取 / NCM 转换任务写入 SQLite 队列（engine.jobqueue），由常驻的进程池逐个处理。
+# 工作进程在任务之间保持存活：已导入的模块和解码好的伴奏（内存映射 PCMCache 的 .npy）
+# 都留在进程里，同一伴奏的后续任务不再重新加载。
+# 另提供一个只监听本机的 HTTP API（也可用 Unix 套接字）用于提交任务、查询状态和读取吞吐指标。
+#
+# 配置（JSON，或安装 PyYAML 后用 YAML；相对路径相对配置文件所在目录）：
+#
+#     {
+#       "workers": 4, "poll": 2, "settle": 2, "queue": "jobs.sqlite3",
+#       "watch": [
+#         {"dir": "inbox/vocals", "op": "mix", "instr": "backing.mp3", "vocal_db": 2, "output": "out/mix"},
+#         {"dir": "inbox/videos", "op": "extract", "format": "wav", "output": "out/audio"},
+#         {"dir": "inbox/ncm", "op": "ncm", "output": "out/music"}
+#       ]
+#     }
+#
+# 每类任务可用的参数见 DEFAULT_PARAMS；output 省略时输出到源文件所在目录。
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import metrics
+from .jobqueue import STATUSES
+from .tasks import TaskRunner
+
+KINDS = ("mix", "extract", "ncm")
+DEFAULT_PORT = 8765
+SETTLE_SECONDS = 2.0  # mtime 距今不足该值的文件视为仍在写入，稍后再看
+POLL_SECONDS = 2.0
+INOTIFY_RESCAN_SECONDS = 60.0  # 有 inotify 时仍定期全量扫描一次，防止漏掉事件
+
+# 各类任务的参数及默认值；output 为 None 时输出到源文件所在目录
+DEFAULT_PARAMS = {
+    "mix": {"instr": None, "vocal_db": 0.0, "instr_db": 0.0, "limiter": False, "lufs": None,
+            "pad": False, "output": None},
+    "extract": {"format": "mp3", "copy": True, "output": None},
+    "ncm": {"backend": "native", "output": None},
+}
+_PATH_PARAMS = ("instr", "output")
+_STR_PARAMS = ("instr", "output", "format", "backend")
+_FLOAT_PARAMS = ("vocal_db", "instr_db", "lufs")  # lufs 可为 None（不做响度归一）
+_BOOL_PARAMS = ("limiter", "pad", "copy")
+
+WatchRule = namedtuple("WatchRule", "dir kind params")
+JobEvent = namedtuple("JobEvent", "id kind source status output error elapsed")
+
+
+def normalize_params(kind, params, base_dir=None):
+    """补全默认值并检查参数；相对路径相对 base_dir 解析。参数有误时抛出 ValueError。"""
+    if kind not in DEFAULT_PARAMS:
+        raise ValueError(f"未知的任务类型：{kind}（可选 {', '.join(KINDS)}）")
+    unknown = set(params) - set(DEFAULT_PARAMS[kind])
+    if unknown:
+        raise ValueError(f"{kind} 任务不支持参数：{', '.join(sorted(unknown))}")
+    out = {**DEFAULT_PARAMS[kind], **params}
+    for key in (k for k in _STR_PARAMS if k in out):
+        if out[key] is not None and not isinstance(out[key], str):
+            raise ValueError(f"{key} 须为字符串")
+    for key in (k for k in _FLOAT_PARAMS if k in out):
+        value = out[key]
+        if value is None and key == "lufs":
+            continue
+        # bool 是 int 的子类，单独排除
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{key} 须为数值")
+        out[key] = float(value)
+    for key in (k for k in _BOOL_PARAMS if k in out):
+        if not isinstance(out[key], bool):
+            raise ValueError(f"{key} 须为 true 或 false")
+    for key in _PATH_PARAMS:
+        if out.get(key):
+            out[key] = os.path.abspath(os.path.join(base_dir or os.getcwd(), os.path.expanduser(out[key])))
+    if kind == "mix":
+        if not out["instr"]:
+            raise ValueError("mix 任务需要指定伴奏 instr")
+        if not os.path.isfile(out["instr"]):
+            raise ValueError(f"伴奏不存在：{out['instr']}")
+    elif kind == "extract":
+        from .extractor import OUTPUT_FORMATS
+
+        if out["format"] not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式：{out['format']}")
+    elif out["backend"] not in ("native", "ncmdump"):
+        raise ValueError(f"未知的 NCM 转换方式：{out['backend']}")
+    return out
+
+
+def parse_rules(spec, base_dir=None):
+    """配置中的 watch 列表 -> [WatchRule]，每项形如 {"dir": ..., "op": "mix", ...参数}。"""
+    rules = []
+    for entry in spec.get("watch") or []:
+        entry = dict(entry)
+        folder = entry.pop("dir", None)
+        kind = entry.pop("op", None)
+        if not folder or not kind:
+            raise ValueError("watch 的每一项都需要 dir 和 op")
+        folder = os.path.abspath(os.path.join(base_dir or os.getcwd(), os.path.expanduser(folder)))
+        if not os.path.isdir(folder):
+            raise ValueError(f"监视目录不存在：{folder}")
+        rules.append(WatchRule(folder, kind, normalize_params(kind, entry, base_dir)))
+    if not rules:
+        raise ValueError("配置中没有要监视的目录（watch）")
+    return rules
+
+
+def _matches(rule, path):
+    from . import extractor, mixer
+
+    name = os.path.basename(path)
+    if name.startswith(".") or name.endswith((".part", ".tmp", ".crdownload")):
+        return False
+    ext = os.path.splitext(name)[1].lower()
+    if rule.kind == "mix":
+        return ext in mixer.SUPPORTED_EXT and not mixer.is_mix_output(path) and path != rule.params["instr"]
+    if rule.kind == "extract":
+        return ext in extractor.VIDEO_EXT
+    return ext == ".ncm"
+
+
+def scan_rule(rule):
+    """递归遍历监视目录，返回 [(路径, stat)]（只含该任务类型能处理的文件）。"""
+    found = []
+    stack = [rule.dir]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif _matches(rule, entry.path):
+                        found.append((entry.path, entry.stat()))
+        except OSError:
+            continue
+    return found
+
+
+# --- 工作进程 ---
+
+_warm_instr = {}  # (路径, 大小, mtime) -> [伴奏数组, 响度, PCMCache, 缓存键]；进程存活期间复用
+_WARM_LIMIT = 4
+
+
+def _instrumental(path, want_lufs):
+    from . import mixer, resample
+    from .cache import PCMCache
+
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    entry = _warm_instr.get(key)
+    if entry is None:
+        if len(_warm_instr) >= _WARM_LIMIT:
+            _warm_instr.pop(next(iter(_warm_instr)))
+        cache = PCMCache()
+        cache_key = mixer._cache_key(cache, path, mixer.DEFAULT_FORMAT, resample.DEFAULT_QUALITY)
+        instr = mixer.load_instrumental(path, cache)
+        entry = _warm_instr[key] = [instr, None, cache, cache_key]
+    if want_lufs and entry[1] is None:
+        entry[1] = mixer.instrumental_loudness(entry[0], entry[3], entry[2])
+    return entry[0], entry[1]
+
+
+def run_job(kind, source, params):
+    """在当前进程执行一个任务，返回输出路径；失败时抛出异常。"""
+    output_dir = params.get("output") or os.path.dirname(source)
+    os.makedirs(output_dir, exist_ok=True)
+    if kind == "mix":
+        from . import mixer
+
+        instr, instr_lufs = _instrumental(params["instr"], params["lufs"] is not None)
+        return mixer.mix_file(
+            source,
+            instr,
+            params["vocal_db"],
+            params["instr_db"],
+            output_dir,
+            limiter=params["limiter"],
+            target_lufs=params["lufs"],
+            instr_lufs=instr_lufs,
+            pad=params["pad"],
+        )
+    metrics.count("input_bytes", os.path.getsize(source))
+    if kind == "extract":
+        from . import extractor
+
+        return extractor.extract_audio(source, output_dir, params["format"], copy=params["copy"])
+    from . import ncm
+
+    success, message = ncm.convert_ncm_file(source, output_dir, params["backend"])
+    if not success:
+        raise RuntimeError(message)
+    return message
+
+
+def _job_worker(kind, source, params):
+    return metrics.run_collected(run_job, kind, source, params)
+
+
+# --- 守护进程 ---
+
+
+def _start_observer(folders, wake):
+    """安装了 watchdog（Linux 上基于 inotify）时在目录变化时唤醒扫描；否则返回 None，只靠轮询。"""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    observer = Observer()
+    for folder in folders:
+        observer.schedule(Handler(), folder, recursive=True)
+    observer.start()
+    return observer
+
+
+class WatchDaemon(TaskRunner):
+    """常驻任务：扫描监视目录入队、从队列领取任务交给进程池；每完成一个任务产生一个 JobEvent。
+
+    cancel() 后不再领取新任务，等正在运行的任务结束并记录结果后退出；
+    被强行终止时，运行中的任务下次启动会重新排队。
+    """
+
+    metrics_name = "watch"
+
+    def __init__(self, rules, queue, workers=None, poll=POLL_SECONDS, settle=SETTLE_SECONDS):
+        super().__init__(0)
+        self.rules = rules
+        self.queue = queue
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.poll_interval = poll
+        self.settle = settle
+        self.inotify = False
+        self.running = ()  # 运行中的任务 id，供 API 读取
+        self._seen = {}  # (规则序号, 路径) -> (大小, mtime)，未变化的文件不再查询队列
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def submit(self, kind, source, params=None):
+        """提交一个任务，返回 (任务 id, 是否新建)。省略 params 时沿用监视同一目录（或同类型）的规则参数。"""
+        source = os.path.abspath(source)
+        if not os.path.isfile(source):
+            raise ValueError(f"文件不存在：{source}")
+        if params is None:
+            rules = [r for r in self.rules if r.kind == kind]
+            inside = [r for r in rules if source.startswith(r.dir + os.sep)]
+            params = (inside or rules)[0].params if rules else normalize_params(kind, {})
+        else:
+            params = normalize_params(kind, params)
+        job_id, created = self.queue.submit(kind, source, params)
+        if created:
+            self.metrics.count("jobs_queued")
+            self.wake()
+        return job_id, created
+
+    def scan(self):
+        """扫描所有监视目录并把新文件入队，返回仍在写入、稍后要再看的文件数。"""
+        pending = 0
+        now = time.time()
+        with metrics.stage("scan"):
+            for i, rule in enumerate(self.rules):
+                for path, st in scan_rule(rule):
+                    version = (st.st_size, st.st_mtime_ns)
+                    if self._seen.get((i, path)) == version:
+                        continue
+                    if now - st.st_mtime < self.settle:
+                        pending += 1
+                        continue
+                    try:
+                        _, created = self.queue.submit(rule.kind, path, rule.params)
+                    except OSError:  # 扫描后被删除或移走
+                        continue
+                    self._seen[(i, path)] = version
+                    if created:
+                        self.metrics.count("jobs_queued")
+                        self.events.put(JobEvent(None, rule.kind, path, "queued", None, None, 0.0))
+        return pending
+
+    def run(self):
+        observer = _start_observer([r.dir for r in self.rules], self._wake)
+        self.inotify = observer is not None
+        rescan = INOTIFY_RESCAN_SECONDS if self.inotify else self.poll_interval
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        running = {}
+        next_scan = 0.0
+        try:
+            while not self.is_cancelling:
+                now = time.monotonic()
+                if self._wake.is_set() or now >= next_scan:
+                    self._wake.clear()
+                    pending = self.scan()
+                    next_scan = now + (min(self.settle, rescan) if pending else rescan)
+                while len(running) < self.workers and not self.is_cancelling:
+                    job = self.queue.claim()
+                    if job is None:
+                        break
+                    fut = pool.submit(_job_worker, job.kind, job.source, job.params)
+                    running[fut] = (job, time.perf_counter())
+                self.running = tuple(job.id for job, _ in running.values())
+                if running:
+                    done, _ = wait(running, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        self._finish(fut, *running.pop(fut))
+                else:
+                    self._wake.wait(min(0.5, max(0.0, next_scan - time.monotonic())))
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            pool.shutdown(wait=True, cancel_futures=True)
+            for fut, entry in running.items():
+                if fut.done() and not fut.cancelled():
+                    self._finish(fut, *entry)
+            self.running = ()
+
+    def _finish(self, fut, job, t0):
+        output = error = None
+        try:
+            output, snap = fut.result()
+            self.metrics.merge(snap)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self.queue.finish(job.id, output, error)
+        self.metrics.count("jobs_failed" if error else "jobs_done")
+        self.metrics.count(f"{job.kind}_jobs")
+        status = "failed" if error else "done"
+        self.advance(JobEvent(job.id, job.kind, job.source, status, output, error, time.perf_counter() - t0))
+
+    def stats(self):
+        return {
+            "uptime_s": round(self.elapsed, 3),
+            "workers": self.workers,
+            "inotify": self.inotify,
+            "watching": [{"dir": r.dir, "op": r.kind} for r in self.rules],
+            "running": list(self.running),
+            "completed": self.completed,
+            "jobs_per_sec": round(self.rate(), 4),
+            "queue": self.queue.stats(),
+            "stages": self.metrics.brief(),
+            "metrics": self.metrics.snapshot(),
+        }
+
+
+# --- HTTP API ---
+# GET  /jobs[?status=queued&limit=50]   列出任务
+# GET  /jobs/<id>                       查询单个任务
+# POST /jobs {"kind", "source", "params"?}  提交任务（params 省略时沿用同类监视规则）
+# POST /jobs/<id>/retry                 重新排队失败或已取消的任务
+# DELETE /jobs/<id>                     取消尚未开始的任务
+# GET  /stats                           队列统计与吞吐（JSON）
+# GET  /metrics                         各阶段耗时与计数（Prometheus 文本格式）
+
+
+class _Handler(BaseHTTPRequestHandler):
+    daemon = None
+    server_version = "audio-tools"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, code, body):
+        if isinstance(body, str):
+            data, ctype = body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data, ctype = json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        return parts, parse_qs(url.query)
+
+    def _job_id(self, parts):
+        try:
+            return int(parts[1])
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        parts, query = self._route()
+        queue = self.daemon.queue
+        if parts == ["jobs"]:
+            status = query.get("status", [None])[0]
+            if status and status not in STATUSES:
+                return self._send(400, {"error": f"未知状态：{status}"})
+            try:
+                limit = int(query.get("limit", ["100"])[0])
+            except ValueError:
+                limit = 0
+            if limit <= 0:
+                return self._send(400, {"error": "limit 须为正整数"})
+            return self._send(200, [job._asdict() for job in queue.list(status, limit)])
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = queue.get(self._job_id(parts))
+            return self._send(200, job._asdict()) if job else self._send(404, {"error": "任务不存在"})
+        if parts == ["stats"]:
+            return self._send(200, self.daemon.stats())
+        if parts == ["metrics"]:
+            return self._send(200, self.daemon.metrics.prometheus())
+        self._send(404, {"error": "未知路径"})
+
+    def do_POST(self):
+        parts, _ = self._route()
+        if parts == ["jobs"]:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise ValueError("请求体须为 JSON 对象")
+                for key in ("kind", "source"):
+                    if key in body and not isinstance(body[key], str):
+                        raise ValueError(f"{key} 须为字符串")
+                if not isinstance(body.get("params", {}), (dict, type(None))):
+                    raise ValueError("params 须为 JSON 对象")
+                job_id, created = self.daemon.submit(body["kind"], body["source"], body.get("params"))
+            except KeyError as e:
+                return self._send(400, {"error": f"缺少字段：{e.args[0]}"})
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            return self._send(201 if created else 200, {"id": job_id, "created": created})
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "retry":
+            ok = self.daemon.queue.retry(self._job_id(parts))
+            if ok:
+                self.daemon.wake()
+            return self._send(200 if ok else 409, {"retried": ok})
+        self._send(404, {"error": "未知路径"})
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == "jobs":
+            ok = self.daemon.queue.cancel(self._job_id(parts))
+            return self._send(200 if ok else 409, {"cancelled": ok})
+        self._send(404, {"error": "未知路径"})
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+    def get_request(self):
+        request, _ = self.socket.accept()
+        return request, ("local", 0)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def serve_api(daemon, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    """在后台线程启动 API 服务，返回 server（用 shutdown() 停止）。给定 socket_path 时改用 Unix 套接字。
+
+    API 不做认证，能访问它的进程都能让守护进程读写任意路径，请只绑定本机地址。
+    """
+    handler = type("Handler", (_Handler,), {"daemon": daemon})
+    if socket_path:
+        server = _UnixHTTPServer(socket_path, handler)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
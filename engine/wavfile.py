@@ -0,0 +1,182 @@
+import os
+import struct
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+WavInfo = namedtuple(
+    "WavInfo",
+    "format_tag channels sample_rate sample_width block_align data_offset data_size",
+)
+
+
+def is_wav(path):
+    with open(path, "rb") as f:
+        head = f.read(12)
+    return len(head) == 12 and head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+def read_wav_info(path):
+    """只解析 RIFF 头部，返回 WavInfo；不读取任何采样数据。"""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+            raise ValueError(f"不是有效的 WAV 文件：{path}")
+
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"WAV 文件缺少 data 块：{path}")
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                body = f.read(size)
+                format_tag, channels, rate, _, block_align, bits = struct.unpack(
+                    "<HHIIHH", body[:16]
+                )
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    # 子格式 GUID 的前两个字节即实际格式
+                    format_tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (format_tag, channels, rate, (bits + 7) // 8, block_align)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"WAV 文件缺少 fmt 块：{path}")
+                data_offset = f.tell()
+                # 流式写出的文件 data 大小可能为 0 或 0xFFFFFFFF，以文件实际长度为准
+                f.seek(0, 2)
+                data_size = min(size, f.tell() - data_offset)
+                data_size -= data_size % fmt[4]
+                return WavInfo(*fmt, data_offset, data_size)
+            else:
+                f.seek(size + (size & 1), 1)
+            if chunk_id == b"fmt " and size & 1:
+                f.seek(1, 1)
+
+
+def frame_count(info):
+    return info.data_size // info.block_align
+
+
+def write_wav_header(f, channels, sample_rate, sample_width, data_size, format_tag=WAVE_FORMAT_PCM):
+    block_align = channels * sample_width
+    f.write(
+        struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF",
+            36 + data_size,
+            b"WAVE",
+            b"fmt ",
+            16,
+            format_tag,
+            channels,
+            sample_rate,
+            sample_rate * block_align,
+            block_align,
+            sample_width * 8,
+            b"data",
+            data_size,
+        )
+    )
+
+
+def copy_wav_range(path, out_path, start_frame, end_frame, info=None, chunk_size=1 << 20):
+    """按字节偏移复制 [start_frame, end_frame) 帧到新的 WAV 文件，内存占用只与 chunk_size 有关。"""
+    info = info or read_wav_info(path)
+    start_frame = max(0, start_frame)
+    end_frame = min(end_frame, frame_count(info))
+    remaining = max(0, end_frame - start_frame) * info.block_align
+    with open(path, "rb") as src, open(out_path, "wb") as dst:
+        write_wav_header(
+            dst, info.channels, info.sample_rate, info.sample_width, remaining, info.format_tag
+        )
+        src.seek(info.data_offset + start_frame * info.block_align)
+        while remaining > 0:
+            buf = src.read(min(chunk_size, remaining))
+            if not buf:
+                break
+            dst.write(buf)
+            remaining -= len(buf)
+    return out_path
+
+
+def temp_path(path):
+    """与 path 同目录的临时文件名。输出先写到这里再 os.replace 过去，已有的 path
+    （可能与其他文件硬链接，见 engine.fingerprint.link_or_copy）不会被原地改写。"""
+    head, tail = os.path.split(path)
+    return os.path.join(head, f".{tail}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+
+def write_wav_array(path, data, sample_rate):
+    """把 (帧数, 声道) 的 NumPy 数组直接写成 WAV，不额外复制数据；浮点数组写为 IEEE float。"""
+    frames, channels = data.shape
+    format_tag = WAVE_FORMAT_IEEE_FLOAT if data.dtype.kind == "f" else WAVE_FORMAT_PCM
+    tmp = temp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            write_wav_header(
+                f, channels, sample_rate, data.dtype.itemsize, data.nbytes, format_tag
+            )
+            f.write(memoryview(data.reshape(-1)).cast("B") if data.flags.c_contiguous else data.tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+class WavWriter:
+    """逐块写入 WAV：先写占位头部，关闭时回填数据大小（超过 4 GB 时记为 0xFFFFFFFF）。
+
+    数据写在同目录的临时文件里，close() 时才替换 path；with 块内出错时丢弃临时文件，保留原有的 path。
+    """
+
+    def __init__(self, path, channels, sample_rate, dtype):
+        self.path = path
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.dtype = dtype
+        self.data_size = 0
+        self._format_tag = WAVE_FORMAT_IEEE_FLOAT if dtype.kind == "f" else WAVE_FORMAT_PCM
+        self._tmp = temp_path(path)
+        self._f = open(self._tmp, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        size = min(self.data_size, 0xFFFFFFFF - 36)
+        write_wav_header(
+            self._f, self.channels, self.sample_rate, self.dtype.itemsize, size, self._format_tag
+        )
+
+    def write(self, data):
+        data = np.ascontiguousarray(data, dtype=self.dtype)
+        self._f.write(memoryview(data.reshape(-1)).cast("B"))
+        self.data_size += data.nbytes
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._f.seek(0)
+        self._write_header()
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """放弃已写入的数据。"""
+        if not self._f.closed:
+            self._f.close()
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
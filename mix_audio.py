@@ -1,7 +1,11 @@
 import os
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from pydub import AudioSegment
+
+from engine import mixer, resample
+from engine.cache import PCMCache
+from engine.fingerprint import FingerprintIndex
+from task_panel import TaskPanel
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -12,7 +16,7 @@ class BatchMixerApp(ctk.CTk):
         super().__init__()
 
         self.title("🎧 批量音频混音工具")
-        self.geometry("600x460")
+        self.geometry("640x680")
         self.resizable(False, False)
 
         self.vocal_dir = ctk.StringVar()
@@ -21,6 +25,17 @@ class BatchMixerApp(ctk.CTk):
         self.status_text = ctk.StringVar(value="准备就绪")
         self.vocal_volume = ctk.DoubleVar(value=2.0)
         self.instr_volume = ctk.DoubleVar(value=-2.0)
+        self.limiter = ctk.BooleanVar(value=False)
+        self.workers = ctk.IntVar(value=os.cpu_count() or 1)
+        self.resume = ctk.BooleanVar(value=True)
+        self.normalize = ctk.BooleanVar(value=False)
+        self.target_lufs = ctk.StringVar(value="-16")
+        self.sample_rate = ctk.StringVar(value="44100")
+        self.hq_resample = ctk.BooleanVar(value=False)
+        self.streaming = ctk.BooleanVar(value=False)
+        self.pad = ctk.BooleanVar(value=False)
+        self.dedup = ctk.BooleanVar(value=False)
+        self.mix_success = 0
 
         # --- UI 部分 ---
         ctk.CTkLabel(self, text="人声音频文件夹路径：").pack(pady=(15, 5))
@@ -60,9 +75,57 @@ class BatchMixerApp(ctk.CTk):
             side="left", padx=5
         )
 
-        ctk.CTkButton(self, text="🚀 开始混音", command=self.start_batch_mix).pack(
-            pady=(20, 10)
+        option_frame = ctk.CTkFrame(self)
+        option_frame.pack()
+        ctk.CTkCheckBox(
+            option_frame, text="软限幅（防止削波失真）", variable=self.limiter
+        ).pack(side="left", padx=5)
+        ctk.CTkCheckBox(
+            option_frame, text="跳过已是最新的输出", variable=self.resume
+        ).pack(side="left", padx=5)
+        ctk.CTkLabel(option_frame, text="并发进程数：").pack(side="left")
+        ctk.CTkEntry(option_frame, textvariable=self.workers, width=50).pack(
+            side="left", padx=5
+        )
+
+        loudness_frame = ctk.CTkFrame(self)
+        loudness_frame.pack(pady=(5, 0))
+        ctk.CTkCheckBox(
+            loudness_frame, text="响度标准化（EBU R128，上方音量作为偏移）", variable=self.normalize
+        ).pack(side="left", padx=5)
+        ctk.CTkLabel(loudness_frame, text="目标 LUFS：").pack(side="left")
+        ctk.CTkEntry(loudness_frame, textvariable=self.target_lufs, width=60).pack(
+            side="left", padx=5
         )
+
+        format_frame = ctk.CTkFrame(self)
+        format_frame.pack(pady=(5, 0))
+        ctk.CTkLabel(format_frame, text="输出采样率：").pack(side="left", padx=(5, 0))
+        ctk.CTkOptionMenu(
+            format_frame, values=["44100", "48000"], variable=self.sample_rate, width=90
+        ).pack(side="left", padx=5)
+        ctk.CTkCheckBox(
+            format_frame, text="高质量重采样（较慢）", variable=self.hq_resample
+        ).pack(side="left", padx=5)
+
+        stream_frame = ctk.CTkFrame(self)
+        stream_frame.pack(pady=(5, 0))
+        ctk.CTkCheckBox(
+            stream_frame, text="流式混音（超长音频，低内存）", variable=self.streaming
+        ).pack(side="left", padx=5)
+        ctk.CTkCheckBox(
+            stream_frame, text="较短分轨补静音（不截断）", variable=self.pad
+        ).pack(side="left", padx=5)
+        ctk.CTkCheckBox(
+            stream_frame, text="重复录音只混一次", variable=self.dedup
+        ).pack(side="left", padx=5)
+
+        self.mix_button = ctk.CTkButton(
+            self, text="🚀 开始混音", command=self.start_batch_mix
+        )
+        self.mix_button.pack(pady=(20, 10))
+        self.task_panel = TaskPanel(self)
+        self.task_panel.pack(pady=5)
         ctk.CTkButton(
             self,
             text="🗑️ 清空所有_mix文件",
@@ -114,12 +177,7 @@ class BatchMixerApp(ctk.CTk):
             files = [vocal_file]
             base_folder = os.path.dirname(vocal_file)
         elif os.path.isdir(folder):
-            supported_ext = [".wav", ".mp3", ".flac"]
-            files = [
-                os.path.join(folder, f)
-                for f in os.listdir(folder)
-                if os.path.splitext(f)[1].lower() in supported_ext
-            ]
+            files = mixer.collect_vocal_files(folder)
             base_folder = folder
         else:
             messagebox.showerror("错误", "请选择人声音频文件或文件夹")
@@ -129,53 +187,76 @@ class BatchMixerApp(ctk.CTk):
             messagebox.showinfo("提示", "未找到任何人声音频文件")
             return
 
-        # 加载伴奏音频
         try:
-            instr_audio = (
-                AudioSegment.from_file(instr).set_frame_rate(44100).set_channels(2)
-            )
-        except Exception as e:
-            self.status_text.set(f"❌ 加载伴奏失败：{e}")
+            workers = int(self.workers.get())
+            if workers < 1:
+                raise ValueError
+        except Exception:
+            messagebox.showerror("输入错误", "请输入有效的并发进程数（正整数）")
             return
 
-        total = len(files)
-        success = 0
-        for i, f in enumerate(files, 1):
-            name, ext = os.path.splitext(os.path.basename(f))
-            if name.endswith("_mix"):
-                continue  # 跳过已处理文件
-
+        target_lufs = None
+        if self.normalize.get():
             try:
-                self.status_text.set(
-                    f"🔄 [{i}/{total}] 正在处理：{os.path.basename(f)}"
+                target_lufs = float(self.target_lufs.get())
+            except ValueError:
+                messagebox.showerror("输入错误", "请输入有效的目标响度（如 -16）")
+                return
+
+        job = mixer.BatchMixJob(
+            files,
+            instr,
+            self.vocal_volume.get(),
+            self.instr_volume.get(),
+            base_folder,
+            limiter=self.limiter.get(),
+            cache=PCMCache(),
+            workers=workers,
+            resume=self.resume.get(),
+            target_lufs=target_lufs,
+            fmt=resample.AudioFormat(int(self.sample_rate.get()), mixer.CHANNELS),
+            quality="hq" if self.hq_resample.get() else "fast",
+            streaming=self.streaming.get(),
+            pad=self.pad.get(),
+            dedup=FingerprintIndex() if self.dedup.get() else None,
+        )
+        self.mix_success = 0
+        self.mix_button.configure(state="disabled")
+        self.status_text.set(f"🔄 正在加载伴奏并分发 {job.total} 个文件...")
+        self.task_panel.run(job, self.on_mix_event, self.on_mix_done)
+
+    def on_mix_event(self, ev):
+        name = os.path.basename(ev.path)
+        if ev.error:
+            self.status_text.set(f"❌ [{ev.index}/{ev.total}] 错误处理 {name}：{ev.error}")
+        elif ev.duplicate_of:
+            self.status_text.set(
+                f"♻️ [{ev.index}/{ev.total}] {name} 与 {os.path.basename(ev.duplicate_of)} 相同，已复用其混音"
+            )
+        elif ev.skipped:
+            self.status_text.set(f"⏭️ [{ev.index}/{ev.total}] 已是最新：{name}")
+        else:
+            self.mix_success += 1
+            self.status_text.set(
+                f"✅ [{ev.index}/{ev.total}] 已完成：{os.path.basename(ev.output)}"
+            )
+            # 如果是单文件，弹窗提示
+            if ev.total == 1:
+                messagebox.showinfo(
+                    "混音完成", f"混音已完成，输出文件：\n{ev.output}"
                 )
-                self.update()
-
-                vocal = AudioSegment.from_file(f).set_frame_rate(44100).set_channels(2)
-                min_len = min(len(vocal), len(instr_audio))
-                vocal = vocal[:min_len] + self.vocal_volume.get()  # 提升人声音量
-                instr_trim = (
-                    instr_audio[:min_len] + self.instr_volume.get()
-                )  # 降低伴奏音量
-
-                mixed = instr_trim.overlay(vocal)
-                output_path = os.path.join(base_folder, f"{name}_mix.wav")
-                mixed.export(output_path, format="wav")
-
-                self.status_text.set(f"✅ 已完成：{name}_mix.wav")
-                self.update()
-                success += 1
-                # 如果是单文件，弹窗提示
-                if len(files) == 1:
-                    messagebox.showinfo(
-                        "混音完成", f"混音已完成，输出文件：\n{output_path}"
-                    )
-            except Exception as e:
-                self.status_text.set(f"❌ 错误处理 {f}：{e}")
-                self.update()
-
-        self.status_text.set(f"🎉 处理完成，共混音：{success} 个")
-        self.update()
+
+    def on_mix_done(self, job):
+        self.mix_button.configure(state="normal")
+        if job.error:
+            self.status_text.set(f"❌ 混音失败：{job.error}")
+        elif job.cancelled:
+            self.status_text.set(f"⏹ 已取消，已混音：{self.mix_success} 个")
+        else:
+            brief = job.metrics.brief()
+            self.status_text.set(
+                f"🎉 处理完成，共混音：{self.mix_success} 个" + (f"\n耗时分布：{brief}" if brief else "")
+            )
 
     def clean_mix_files(self):
         folder = self.vocal_dir.get().strip()
@@ -190,14 +271,9 @@ class BatchMixerApp(ctk.CTk):
             messagebox.showerror("错误", "请先选择有效的文件夹或文件用于清理")
             return
 
-        deleted = 0
-        for f in os.listdir(path_to_clean):
-            if f.endswith("_mix.wav"):
-                try:
-                    os.remove(os.path.join(path_to_clean, f))
-                    deleted += 1
-                except OSError as e:
-                    print(f"无法删除文件 {f}: {e}")
+        deleted, errors = mixer.clean_mix_files(path_to_clean)
+        for f, msg in errors:
+            print(f"无法删除文件 {f}: {msg}")
 
         self.status_text.set(f"🗑️ 已清除 {deleted} 个 *_mix.wav 文件")
         self.update()
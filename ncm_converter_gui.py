@@ -1,43 +1,37 @@
 import os
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from pathlib import Path
-import subprocess
-import shutil
+
+from engine.fingerprint import FingerprintIndex
+from engine.ncm import NcmBatchJob, find_ncm_files, has_ncmdump
+from engine.ncmsync import NcmSync
+from task_panel import TaskPanel
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
 
-def convert_ncm_file(ncm_path: str, output_dir: str):
-    try:
-        # 使用 ncmdump/ncm2mp3 等命令行工具（你也可以用 Python 实现）
-        result = subprocess.run(
-            ["ncmdump", ncm_path, "-o", output_dir],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        if result.returncode != 0:
-            raise RuntimeError(result.stderr.strip())
-        return True, result.stdout.strip()
-    except FileNotFoundError:
-        return False, "ncmdump' command not found. Please ensure it is installed and in your PATH."
-    except Exception as e:
-        return False, str(e)
-
-
 class NCMConverterApp(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         self.title("🎵 NCM 转换器")
-        self.geometry("600x450")
+        self.geometry("640x560")
         self.resizable(False, False)
 
         self.ncm_path = ctk.StringVar()
         self.output_dir = ctk.StringVar()
         self.status_text = ctk.StringVar(value="请选择 .ncm 文件或包含 .ncm 的目录")
+        self.concurrency = ctk.IntVar(value=os.cpu_count() or 4)
+        # 默认使用内置解密，ncmdump 仅作为可选后端
+        self.use_ncmdump = ctk.BooleanVar(value=False)
+        # 增量同步：只转换新增/变更的文件，可选清理孤立输出
+        self.sync_mode = ctk.BooleanVar(value=True)
+        self.prune = ctk.BooleanVar(value=False)
+        self.dedup = ctk.BooleanVar(value=False)
+        self.sync = None
+        self.success_count = 0
+        self.fail_count = 0
 
         ctk.CTkLabel(self, text="📂 NCM 文件或目录：").pack(pady=(20, 5))
         ctk.CTkEntry(self, textvariable=self.ncm_path, width=480).pack()
@@ -53,8 +47,30 @@ class NCMConverterApp(ctk.CTk):
             pady=5
         )
 
-        self.convert_button = ctk.CTkButton(self, text="🚀 开始转换", command=self.start_conversion)
-        self.convert_button.pack(pady=20)
+        self.ncmdump_checkbox = ctk.CTkCheckBox(
+            self, text="使用外部 ncmdump（默认使用内置解密）", variable=self.use_ncmdump
+        )
+        self.ncmdump_checkbox.pack()
+        sync_frame = ctk.CTkFrame(self)
+        sync_frame.pack(pady=5)
+        ctk.CTkCheckBox(
+            sync_frame, text="增量同步（跳过已转换的文件）", variable=self.sync_mode
+        ).pack(side="left", padx=5)
+        ctk.CTkCheckBox(
+            sync_frame, text="清理源文件已删除的输出", variable=self.prune
+        ).pack(side="left", padx=5)
+        ctk.CTkCheckBox(
+            sync_frame, text="同一首歌只转换一次", variable=self.dedup
+        ).pack(side="left", padx=5)
+
+        run_frame = ctk.CTkFrame(self)
+        run_frame.pack(pady=20)
+        ctk.CTkLabel(run_frame, text="并发数：").pack(side="left", padx=5)
+        ctk.CTkEntry(run_frame, textvariable=self.concurrency, width=50).pack(side="left")
+        self.convert_button = ctk.CTkButton(run_frame, text="🚀 开始转换", command=self.start_conversion)
+        self.convert_button.pack(side="left", padx=5)
+        self.task_panel = TaskPanel(self)
+        self.task_panel.pack()
 
         self.status_label = ctk.CTkLabel(
             self,
@@ -68,10 +84,9 @@ class NCMConverterApp(ctk.CTk):
         self.check_ncmdump()
 
     def check_ncmdump(self):
-        if not shutil.which("ncmdump"):
-            self.status_text.set("错误: 'ncmdump' 未找到. 请确保它已安装并在您的 PATH 中.")
-            self.convert_button.configure(state="disabled")
-            messagebox.showerror("错误", "'ncmdump' 未找到. 请确保它已安装并在您的 PATH 中.")
+        if not has_ncmdump():
+            self.use_ncmdump.set(False)
+            self.ncmdump_checkbox.configure(state="disabled", text="使用外部 ncmdump（未找到，使用内置解密）")
 
     def select_ncm_file(self):
         path = filedialog.askopenfilename(
@@ -98,13 +113,8 @@ class NCMConverterApp(ctk.CTk):
             messagebox.showwarning("⚠️ 缺少路径", "请指定 NCM 文件或目录 和 输出目录")
             return
 
-        ncm_files = []
-
-        if os.path.isfile(src) and src.endswith(".ncm"):
-            ncm_files = [src]
-        elif os.path.isdir(src):
-            ncm_files = [str(f) for f in Path(src).rglob("*.ncm")]
-        else:
+        ncm_files = find_ncm_files(src)
+        if ncm_files is None:
             messagebox.showerror("无效路径", "请选择 .ncm 文件或包含 .ncm 的目录")
             return
 
@@ -112,29 +122,73 @@ class NCMConverterApp(ctk.CTk):
             messagebox.showinfo("提示", "未找到任何 .ncm 文件")
             return
 
-        self.status_text.set(f"开始转换 {len(ncm_files)} 个文件...\n")
-        self.update()
-
-        success_count = 0
-        fail_count = 0
+        try:
+            concurrency = int(self.concurrency.get())
+            if concurrency < 1:
+                raise ValueError
+        except Exception:
+            messagebox.showerror("输入错误", "请输入有效的并发数（正整数）")
+            return
 
-        for i, file in enumerate(ncm_files, 1):
+        prefix = ""
+        if self.sync_mode.get():
+            try:
+                os.makedirs(out, exist_ok=True)
+                self.sync = NcmSync(src, out)
+                plan = self.sync.plan()
+                if self.prune.get() and plan.orphans:
+                    removed = self.sync.prune(plan.orphans)
+                    prefix += f"已清理 {removed} 个孤立输出。"
+            except Exception as e:
+                messagebox.showerror("同步索引错误", str(e))
+                return
+            ncm_files = plan.todo
+            prefix += f"未变化 {plan.unchanged} 个，"
+
+        self.status_text.set(f"{prefix}开始转换 {len(ncm_files)} 个文件...\n")
+        self.success_count = 0
+        self.fail_count = 0
+        backend = "ncmdump" if self.use_ncmdump.get() else "native"
+        dedup = FingerprintIndex() if self.dedup.get() else None
+        job = NcmBatchJob(ncm_files, out, concurrency, backend=backend, dedup=dedup)
+        self.convert_button.configure(state="disabled")
+        self.task_panel.run(job, self.on_ncm_event, self.on_conversion_done)
+
+    def on_ncm_event(self, ev):
+        if self.sync:
+            self.sync.record(ev)
+            # 定期落盘，中途取消或崩溃也不会丢失已完成的记录
+            if ev.index % 50 == 0:
+                self.sync.commit()
+        name = os.path.basename(ev.path)
+        if ev.success:
+            self.success_count += 1
+            self.status_text.set(f"正在转换 ({ev.index}/{ev.total}): {name}")
+        else:
+            self.fail_count += 1
+            self.status_text.set(f"❌ {name} 转换失败：{ev.message}")
+
+    def on_conversion_done(self, job):
+        if self.sync:
+            self.sync.commit()
+            self.sync.close()
+            self.sync = None
+
+        self.convert_button.configure(state="normal")
+        summary = f"成功：{self.success_count} 个，失败：{self.fail_count} 个。"
+        if job.duplicates:
+            summary += f"其中 {job.duplicates} 个与其他文件是同一首歌，已复用其输出。"
+        if job.cancelled:
+            self.status_text.set(f"⏹ 已取消。{summary}")
+        elif job.error:
+            self.status_text.set(f"❌ 转换出错：{job.error}\n{summary}")
+        else:
+            stats = job.stats
             self.status_text.set(
-                f"正在转换 ({i}/{len(ncm_files)}): {os.path.basename(file)}"
+                f"🎉 转换完成！{summary}\n"
+                f"用时 {stats.elapsed:.1f} 秒，{stats.files_per_sec:.1f} 个/秒，"
+                f"{stats.mb_per_sec:.1f} MB/秒\n耗时分布：{job.metrics.brief() or '无'}"
             )
-            self.update()
-
-            success, msg = convert_ncm_file(file, out)
-            if success:
-                success_count += 1
-            else:
-                fail_count += 1
-                self.status_text.set(f"❌ {os.path.basename(file)} 转换失败：{msg}")
-                self.update()
-
-        self.status_text.set(
-            f"🎉 转换完成！成功：{success_count} 个，失败：{fail_count} 个。"
-        )
 
 
 if __name__ == "__main__":
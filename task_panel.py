@@ -0,0 +1,98 @@
+import os
+
+import customtkinter as ctk
+
+# 设置后每个任务结束时把各阶段耗时写入该文件（.prom 为 Prometheus 文本格式，否则追加 JSON lines）
+METRICS_ENV = "AUDIO_TOOLS_METRICS"
+
+
+def format_seconds(sec):
+    sec = int(sec)
+    if sec >= 3600:
+        return f"{sec // 3600}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+    return f"{sec // 60:02d}:{sec % 60:02d}"
+
+
+class TaskPanel(ctk.CTkFrame):
+    """各 GUI 共用的后台任务面板：进度条、吞吐量 / 剩余时间显示和取消按钮。
+
+    run() 接收一个 engine.tasks.TaskRunner，用 after() 定时 poll()，
+    每轮只处理已到达的事件，主循环不会被阻塞。
+    """
+
+    def __init__(self, master, unit="个", interval=100, **kwargs):
+        super().__init__(master, **kwargs)
+        self.unit = unit
+        self.interval = interval
+        self.job = None
+        self.on_event = None
+        self.on_done = None
+
+        self.info_text = ctk.StringVar(value="")
+        self.progress = ctk.CTkProgressBar(self, width=360)
+        self.progress.set(0)
+        self.progress.pack(side="left", padx=5)
+        ctk.CTkLabel(self, textvariable=self.info_text, width=200).pack(side="left", padx=5)
+        self.cancel_button = ctk.CTkButton(
+            self, text="⏹ 取消", width=70, fg_color="red", state="disabled", command=self.cancel
+        )
+        self.cancel_button.pack(side="left", padx=5)
+
+    @property
+    def busy(self):
+        return self.job is not None
+
+    def run(self, job, on_event=None, on_done=None):
+        self.job = job
+        self.on_event = on_event
+        self.on_done = on_done
+        self.progress.set(0)
+        self.info_text.set("准备中...")
+        self.cancel_button.configure(state="normal")
+        if job.started_at is None:
+            job.start()
+        self.after(self.interval, self._poll)
+        return job
+
+    def cancel(self):
+        if self.job:
+            self.job.cancel()
+            self.info_text.set("正在取消...")
+            self.cancel_button.configure(state="disabled")
+
+    def _poll(self):
+        job = self.job
+        for ev in job.poll():
+            if self.on_event:
+                self.on_event(ev)
+
+        if job.total:
+            self.progress.set(min(1.0, job.completed / job.total))
+            text = f"{job.completed}/{job.total}  {job.rate():.1f} {self.unit}/秒"
+            eta = job.eta()
+            if eta is not None and not job.done:
+                text += f"  剩余 {format_seconds(eta)}"
+            if not job.is_cancelling:
+                self.info_text.set(text)
+        elif not job.is_cancelling:
+            self.info_text.set(f"处理中... {format_seconds(job.elapsed)}")
+
+        if not job.finished:
+            self.after(self.interval, self._poll)
+            return
+
+        self.job = None
+        self.cancel_button.configure(state="disabled")
+        if job.cancelled:
+            self.info_text.set(f"已取消（{format_seconds(job.elapsed)}）")
+        else:
+            self.progress.set(1)
+            self.info_text.set(f"完成，用时 {format_seconds(job.elapsed)}")
+        metrics_path = os.environ.get(METRICS_ENV)
+        if metrics_path:
+            try:
+                job.metrics.write(metrics_path, job=job.metrics_name)
+            except OSError:
+                pass  # 指标只用于调优，写不进去不影响任务结果
+        if self.on_done:
+            self.on_done(job)
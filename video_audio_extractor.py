@@ -1,8 +1,11 @@
 import os
-from moviepy.editor import VideoFileClip
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
+from engine import extractor
+from engine.tasks import FunctionTask
+from task_panel import TaskPanel
+
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
@@ -10,27 +13,51 @@ class VideoAudioExtractor(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("🎬 视频音频提取工具")
-        self.geometry("600x400")
+        self.geometry("640x600")
         self.resizable(False, False)
 
         self.video_path = ctk.StringVar()
         self.output_dir = ctk.StringVar()
         self.output_format = ctk.StringVar(value="mp3")
+        # 源音轨编码与输出格式兼容时直接复制，不重新编码
+        self.stream_copy = ctk.BooleanVar(value=True)
+        self.workers = ctk.IntVar(value=min(4, os.cpu_count() or 1))
+        self.tracks = ctk.StringVar()
+        self.ranges = ctk.StringVar()
         self.status_text = ctk.StringVar(value="准备就绪")
 
         # UI 组件
-        ctk.CTkLabel(self, text="选择视频文件：").pack(pady=15)
+        ctk.CTkLabel(self, text="选择视频文件或目录：").pack(pady=15)
         ctk.CTkEntry(self, textvariable=self.video_path, width=460).pack()
-        ctk.CTkButton(self, text="📂 浏览视频文件", command=self.select_video).pack(pady=5)
+        video_frame = ctk.CTkFrame(self)
+        video_frame.pack(pady=5)
+        ctk.CTkButton(video_frame, text="📂 浏览视频文件", command=self.select_video).pack(side="left", padx=5)
+        ctk.CTkButton(video_frame, text="📁 浏览视频目录", command=self.select_video_dir).pack(side="left", padx=5)
 
         ctk.CTkLabel(self, text="选择输出目录 (可选):").pack(pady=10)
         ctk.CTkEntry(self, textvariable=self.output_dir, width=460).pack()
         ctk.CTkButton(self, text="📂 浏览输出目录", command=self.select_output_dir).pack(pady=5)
 
         ctk.CTkLabel(self, text="选择导出音频格式：").pack(pady=10)
-        ctk.CTkOptionMenu(self, values=["mp3", "wav"], variable=self.output_format).pack()
-
-        ctk.CTkButton(self, text="🚀 提取音频", command=self.extract_audio).pack(pady=20)
+        ctk.CTkOptionMenu(self, values=list(extractor.OUTPUT_FORMATS), variable=self.output_format).pack()
+        ctk.CTkCheckBox(self, text="可能时直接复制音轨（不重新编码）", variable=self.stream_copy).pack(pady=5)
+        track_frame = ctk.CTkFrame(self)
+        track_frame.pack(pady=5)
+        ctk.CTkLabel(track_frame, text="音轨：").pack(side="left", padx=5)
+        ctk.CTkEntry(track_frame, textvariable=self.tracks, width=60, placeholder_text="0,1").pack(side="left")
+        ctk.CTkButton(track_frame, text="🔍 列出音轨", width=80, command=self.list_tracks).pack(side="left", padx=5)
+        ctk.CTkLabel(track_frame, text="时间段（秒）：").pack(side="left", padx=5)
+        ctk.CTkEntry(track_frame, textvariable=self.ranges, width=140, placeholder_text="0-30, 60-90").pack(side="left")
+
+        worker_frame = ctk.CTkFrame(self)
+        worker_frame.pack(pady=5)
+        ctk.CTkLabel(worker_frame, text="目录模式并发数：").pack(side="left", padx=5)
+        ctk.CTkEntry(worker_frame, textvariable=self.workers, width=50).pack(side="left", padx=5)
+
+        self.extract_button = ctk.CTkButton(self, text="🚀 提取音频", command=self.extract_audio)
+        self.extract_button.pack(pady=(20, 5))
+        self.task_panel = TaskPanel(self)
+        self.task_panel.pack(pady=5)
 
         ctk.CTkLabel(self, textvariable=self.status_text, text_color="green", wraplength=500).pack(pady=20)
 
@@ -39,6 +66,27 @@ class VideoAudioExtractor(ctk.CTk):
         if file:
             self.video_path.set(file)
 
+    def select_video_dir(self):
+        folder = filedialog.askdirectory(title="选择视频目录")
+        if folder:
+            self.video_path.set(folder)
+
+    def list_tracks(self):
+        video_file = self.video_path.get().strip()
+        if not os.path.isfile(video_file):
+            messagebox.showerror("错误", "请先选择一个有效的视频文件")
+            return
+        try:
+            streams = extractor.probe_audio_streams(video_file)
+        except Exception as e:
+            messagebox.showerror("错误", f"读取音轨失败:\n{e}")
+            return
+        lines = [
+            f"{k}: {st.codec}，{st.channels} 声道，{st.sample_rate} Hz，语言：{st.language or '未知'}"
+            for k, st in enumerate(streams)
+        ]
+        messagebox.showinfo("音轨列表", "\n".join(lines) or "没有音轨")
+
     def select_output_dir(self):
         folder = filedialog.askdirectory()
         if folder:
@@ -49,36 +97,96 @@ class VideoAudioExtractor(ctk.CTk):
         output_dir = self.output_dir.get().strip()
         out_format = self.output_format.get()
 
+        if os.path.isdir(video_file):
+            self.extract_directory(video_file, output_dir, out_format)
+            return
         if not os.path.isfile(video_file):
-            messagebox.showerror("错误", "请先选择一个有效的视频文件")
+            messagebox.showerror("错误", "请先选择一个有效的视频文件或目录")
             return
 
-        clip = None
         try:
-            self.status_text.set("🔄 正在处理，请稍候...")
-            self.update()
-
-            clip = VideoFileClip(video_file)
-            audio = clip.audio
+            tracks = extractor.parse_tracks(self.tracks.get())
+            ranges = extractor.parse_ranges(self.ranges.get())
+        except ValueError as e:
+            messagebox.showerror("输入错误", str(e))
+            return
 
-            base_name = os.path.splitext(os.path.basename(video_file))[0]
-            output_filename = f"{base_name}_audio.{out_format}"
-            
-            if output_dir:
-                out_path = os.path.join(output_dir, output_filename)
+        copy = self.stream_copy.get()
+        if tracks or ranges:
+            job = FunctionTask(
+                lambda task: extractor.extract_tracks(
+                    video_file, output_dir, out_format, tracks, ranges, copy
+                )
+            )
+        else:
+            job = FunctionTask(
+                lambda task: [extractor.extract_audio(video_file, output_dir, out_format, copy)]
+            )
+        self.extract_button.configure(state="disabled")
+        self.status_text.set("🔄 正在处理，请稍候...")
+        self.task_panel.run(job, on_done=self.on_single_done)
+
+    def on_single_done(self, job):
+        self.extract_button.configure(state="normal")
+        if job.error:
+            self.status_text.set(f"❌ 提取失败：{job.error}")
+            messagebox.showerror("错误", f"提取失败:\n{job.error}")
+        elif job.cancelled:
+            self.status_text.set("⏹ 已取消")
+        else:
+            out_paths = job.result
+            if len(out_paths) == 1:
+                self.status_text.set(f"✅ 提取完成：{os.path.basename(out_paths[0])}")
             else:
-                out_path = os.path.join(os.path.dirname(video_file), output_filename)
+                self.status_text.set(f"✅ 提取完成：{len(out_paths)} 个文件")
+            messagebox.showinfo("成功", "音频已提取并保存到:\n" + "\n".join(out_paths))
 
-            audio.write_audiofile(out_path)
+    def extract_directory(self, folder, output_dir, out_format):
+        try:
+            workers = int(self.workers.get())
+            if workers < 1:
+                raise ValueError
+        except Exception:
+            messagebox.showerror("输入错误", "请输入有效的并发数（正整数）")
+            return
 
-            self.status_text.set(f"✅ 提取完成：{os.path.basename(out_path)}")
-            messagebox.showinfo("成功", f"音频已提取并保存到:\n{out_path}")
-        except Exception as e:
-            self.status_text.set(f"❌ 提取失败：{e}")
-            messagebox.showerror("错误", f"提取失败:\n{e}")
-        finally:
-            if clip:
-                clip.close()
+        files = extractor.find_videos(folder)
+        if not files:
+            messagebox.showinfo("提示", "目录中未找到视频文件")
+            return
+
+        job = extractor.BatchExtractJob(
+            files,
+            output_dir or None,
+            out_format,
+            copy=self.stream_copy.get(),
+            workers=workers,
+            root=folder,
+        )
+        self.extract_button.configure(state="disabled")
+        self.status_text.set(f"🔄 正在提取 {len(files)} 个视频...")
+        self.task_panel.run(job, self.on_batch_event, self.on_batch_done)
+
+    def on_batch_event(self, ev):
+        name = os.path.basename(ev.path)
+        if ev.error:
+            self.status_text.set(f"❌ [{ev.index}/{ev.total}] {name} 提取失败：{ev.error}")
+        elif ev.skipped:
+            self.status_text.set(f"⏭️ [{ev.index}/{ev.total}] 已是最新：{name}")
+        else:
+            self.status_text.set(f"✅ [{ev.index}/{ev.total}] {name}（{ev.elapsed:.1f} 秒）")
+
+    def on_batch_done(self, job):
+        self.extract_button.configure(state="normal")
+        if job.error:
+            self.status_text.set(f"❌ 提取出错：{job.error}")
+            return
+        stats = job.stats
+        prefix = "⏹ 已取消。" if job.cancelled else "🎉 提取完成！"
+        self.status_text.set(
+            f"{prefix}成功：{stats.success} 个，跳过：{stats.skipped} 个，失败：{stats.failed} 个\n"
+            f"用时 {stats.elapsed:.1f} 秒，{stats.files_per_sec:.2f} 个/秒"
+        )
 
 if __name__ == "__main__":
     app = VideoAudioExtractor()
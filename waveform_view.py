@@ -0,0 +1,163 @@
+import tkinter as tk
+
+import customtkinter as ctk
+
+from task_panel import format_seconds
+
+
+class WaveformView(ctk.CTkFrame):
+    """基于 engine.peaks.PeakIndex 的波形预览：滚轮缩放，Shift+滚轮 / 右键拖动平移，左键拖动选择区间。
+
+    每次重绘只向索引请求画布宽度那么多列的 min/max，与文件长度无关。
+    on_select(开始秒, 结束秒) 在选区改变时调用。
+    """
+
+    MIN_SPAN = 0.05  # 最大放大倍数对应的可见时长（秒）
+
+    def __init__(self, master, width=600, height=120, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.index = None
+        self.view_start = 0.0
+        self.view_span = 0.0
+        self.selection = None
+        self._drag_from = None
+        self._pan_from = None
+
+        self.canvas = tk.Canvas(
+            self, width=width, height=height, bg="#1e1e1e", highlightthickness=0
+        )
+        self.canvas.pack(fill="both", expand=True)
+        self.info_text = ctk.StringVar(value="")
+        ctk.CTkLabel(self, textvariable=self.info_text).pack()
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self._on_release)
+        self.canvas.bind("<ButtonPress-3>", self._on_pan_start)
+        self.canvas.bind("<B3-Motion>", self._on_pan)
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Shift-MouseWheel>", self._on_shift_wheel)
+        # Linux 下滚轮为 Button-4 / Button-5
+        self.canvas.bind("<Button-4>", lambda e: self._zoom(0.8, e.x))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom(1.25, e.x))
+        self.canvas.bind("<Shift-Button-4>", lambda e: self._pan_pixels(-e.widget.winfo_width() // 10))
+        self.canvas.bind("<Shift-Button-5>", lambda e: self._pan_pixels(e.widget.winfo_width() // 10))
+
+    @property
+    def duration(self):
+        return self.index.duration if self.index else 0.0
+
+    def set_index(self, index):
+        self.index = index
+        self.view_start = 0.0
+        self.view_span = self.duration
+        self.selection = None
+        self.redraw()
+
+    def set_selection(self, start, end):
+        if self.index is None:
+            return
+        start, end = max(0.0, min(start, end)), min(self.duration, max(start, end))
+        self.selection = (start, end) if end > start else None
+        self.redraw()
+
+    # --- 坐标换算 ---
+
+    def _x_to_time(self, x):
+        width = max(1, self.canvas.winfo_width())
+        return self.view_start + self.view_span * min(max(x, 0), width) / width
+
+    def _time_to_x(self, t):
+        width = max(1, self.canvas.winfo_width())
+        return (t - self.view_start) / self.view_span * width if self.view_span else 0
+
+    def _clamp_view(self):
+        self.view_span = min(max(self.view_span, self.MIN_SPAN), self.duration)
+        self.view_start = min(max(self.view_start, 0.0), self.duration - self.view_span)
+
+    # --- 交互 ---
+
+    def _zoom(self, factor, x):
+        if not self.index:
+            return
+        anchor = self._x_to_time(x)
+        ratio = (anchor - self.view_start) / self.view_span if self.view_span else 0
+        self.view_span *= factor
+        self._clamp_view()
+        self.view_start = anchor - ratio * self.view_span
+        self._clamp_view()
+        self.redraw()
+
+    def _pan_pixels(self, dx):
+        if not self.index:
+            return
+        width = max(1, self.canvas.winfo_width())
+        self.view_start += dx * self.view_span / width
+        self._clamp_view()
+        self.redraw()
+
+    def _on_wheel(self, event):
+        self._zoom(0.8 if event.delta > 0 else 1.25, event.x)
+
+    def _on_shift_wheel(self, event):
+        step = self.canvas.winfo_width() // 10
+        self._pan_pixels(-step if event.delta > 0 else step)
+
+    def _on_pan_start(self, event):
+        self._pan_from = event.x
+
+    def _on_pan(self, event):
+        if self._pan_from is not None:
+            self._pan_pixels(self._pan_from - event.x)
+            self._pan_from = event.x
+
+    def _on_press(self, event):
+        if self.index:
+            self._drag_from = self._x_to_time(event.x)
+
+    def _on_drag(self, event):
+        if self._drag_from is not None:
+            self.set_selection(self._drag_from, self._x_to_time(event.x))
+
+    def _on_release(self, event):
+        if self._drag_from is None:
+            return
+        self._drag_from = None
+        if self.selection and self.on_select:
+            self.on_select(*self.selection)
+
+    # --- 绘制 ---
+
+    def redraw(self):
+        c = self.canvas
+        c.delete("all")
+        width, height = c.winfo_width(), c.winfo_height()
+        if not self.index or width < 2 or not self.view_span:
+            self.info_text.set("")
+            return
+
+        mid = height / 2
+        if self.selection:
+            x0, x1 = (self._time_to_x(t) for t in self.selection)
+            c.create_rectangle(x0, 0, x1, height, fill="#2f4f6f", outline="")
+
+        view_end = self.view_start + self.view_span
+        mins, maxs = self.index.peaks(self.view_start, view_end, width)
+        if len(mins):
+            # 索引按块对齐，列数可能少于像素数，按比例铺满画布
+            step = width / len(mins)
+            for i, (lo, hi) in enumerate(zip(mins.tolist(), maxs.tolist())):
+                x = i * step
+                c.create_rectangle(
+                    x, mid - hi * mid, x + max(step, 1), mid - lo * mid + 1,
+                    fill="#4fc3f7", outline="",
+                )
+        c.create_line(0, mid, width, mid, fill="#555555")
+
+        text = f"{format_seconds(self.view_start)} - {format_seconds(view_end)}"
+        if self.selection:
+            start, end = self.selection
+            text += f"    选区：{start:.2f} - {end:.2f} 秒"
+        self.info_text.set(text)